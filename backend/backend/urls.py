@@ -29,4 +29,5 @@ urlpatterns = [
     # CORRECTION: Do not call the function. Pass the function object (health)
     # The URL pattern should be '/health', not starting with a slash path('health', ...
     path('health/', views.health, name='health'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
\ No newline at end of file
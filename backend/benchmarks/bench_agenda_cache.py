@@ -0,0 +1,89 @@
+# benchmarks/bench_agenda_cache.py
+# Usage: python -m benchmarks.bench_agenda_cache [--users 200] [--events-per-user 50] [--ops 20000]
+# Replays a mix of "events" / "today" requests and event edits against a
+# scratch SQLite database, once with AGENDA_CACHE_BACKEND='none' and once
+# with the local cache, and reports agenda latency and the cache hit rate.
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--users', type=int, default=200)
+parser.add_argument('--events-per-user', type=int, default=50)
+parser.add_argument('--ops', type=int, default=20000)
+parser.add_argument('--write-ratio', type=float, default=0.05, help="Share of operations that edit an event")
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'agenda_cache_bench.sqlite3')
+settings.DEBUG = False
+django.setup()
+
+from django.core.management import call_command
+from django.utils import timezone
+from core import agenda_cache, views
+from core.metrics import counters, histograms
+from core.models import Event, EventManagerUser
+
+
+def seed():
+    call_command('migrate', verbosity=0)
+    now = timezone.now()
+    users = [EventManagerUser(phone_number=f"+1555{i:07d}", timezone=random.choice(['UTC', 'Africa/Lagos']))
+             for i in range(args.users)]
+    EventManagerUser.objects.bulk_create(users)
+    users = list(EventManagerUser.objects.all())
+    Event.objects.bulk_create([
+        Event(user=user, title=f"Event {i}", location=f"Room {i % 9}",
+              scheduled_time=now + timedelta(minutes=random.randint(60, 60 * 24 * 14)))
+        for user in users for i in range(args.events_per_user)
+    ])
+    return users
+
+
+def replay(users, backend):
+    settings.AGENDA_CACHE_BACKEND = backend
+    agenda_cache._agenda_cache = None
+    counters.reset()
+    histograms.reset()
+    rng = random.Random(7)
+    events = list(Event.objects.values_list('id', flat=True))
+    started = time.perf_counter()
+    for _ in range(args.ops):
+        user = rng.choice(users)
+        if rng.random() < args.write_ratio:
+            event = Event.objects.get(id=rng.choice(events))
+            event.title += '.'
+            event.save()
+        elif rng.random() < 0.5:
+            views.get_upcoming_events(user)
+        else:
+            views.get_todays_events(user)
+    elapsed = time.perf_counter() - started
+
+    stats = agenda_cache.stats()
+    for view in agenda_cache.VIEWS:
+        latency = stats['latency'][view]
+        print(f"{backend:<6} {view:<9} mean {latency['mean'] * 1000:6.3f} ms  p50 <= {latency['p50'] * 1000:6.3f} ms  "
+              f"p99 <= {latency['p99'] * 1000:6.3f} ms  ({latency['count']:,} requests)")
+    print(f"{backend:<6} total {elapsed:.2f}s for {args.ops:,} ops, hit rate {stats['hit_rate']:.1%}, "
+          f"{stats['invalidations']:,} invalidations")
+
+
+def main():
+    users = seed()
+    print(f"{args.users} users x {args.events_per_user} events, {args.write_ratio:.0%} writes")
+    replay(users, 'none')
+    replay(users, 'local')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_agenda_queries.py
+# Usage: python -m benchmarks.bench_agenda_queries [--events 2000000] [--users 2000]
+# Seeds a scratch SQLite database and compares the old agenda queries
+# (scheduled_time__date = today, no composite index) with the range queries
+# on the (user, scheduled_time) index.
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--events', type=int, default=2_000_000)
+parser.add_argument('--users', type=int, default=2000)
+parser.add_argument('--queries', type=int, default=200)
+args = parser.parse_args()
+
+from django.conf import settings
+
+db_path = os.path.join(tempfile.mkdtemp(), 'agenda_bench.sqlite3')
+settings.DATABASES['default']['NAME'] = db_path
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from core import agenda
+from core.models import EventManagerUser, Event
+
+INDEX_NAME = 'core_event_user_time_idx'
+
+
+def seed():
+    call_command('migrate', verbosity=0)
+    raw = sqlite3.connect(db_path)
+    now = datetime.now(dt_timezone.utc)
+    raw.executemany(
+        "INSERT INTO core_eventmanageruser (phone_number, created_at, language, timezone) VALUES (?, ?, 'en', ?)",
+        ((f"+1555{i:07d}", now.isoformat(), random.choice(['UTC', 'Africa/Lagos', 'America/New_York']))
+         for i in range(args.users)),
+    )
+    # Spread events over two years around today
+    rows = (
+        (random.randint(1, args.users), f"Event {i}",
+         (now + timedelta(minutes=random.randint(-525600, 525600))).isoformat(' '),
+         0, now.isoformat(' '), now.isoformat(' '))
+        for i in range(args.events)
+    )
+    raw.executemany(
+        "INSERT INTO core_event (user_id, title, scheduled_time, is_recurring, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)", rows,
+    )
+    raw.commit()
+    raw.execute("ANALYZE")
+    raw.close()
+
+
+def timed(fn, users):
+    timings = []
+    for user in users:
+        start = time.perf_counter()
+        list(fn(user))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, max(timings) * 1000
+
+
+def old_today(user):
+    return Event.objects.filter(user=user, scheduled_time__date=timezone.now().date()).order_by('scheduled_time')
+
+
+def new_today(user):
+    return agenda.events_between(user, *agenda.day_window(user))
+
+
+def upcoming(user):
+    return agenda.upcoming_events(user, limit=10)
+
+
+def report(label, users):
+    sample = users[0]
+    for name, fn in (("today (__date)", old_today), ("today (range)", new_today), ("upcoming", upcoming)):
+        median, worst = timed(fn, users)
+        plan = fn(sample).explain().replace('\n', '\n      ')
+        print(f"  {name:16s} median {median:7.2f} ms  max {worst:7.2f} ms")
+        print(f"      {plan}")
+
+
+def run():
+    started = time.perf_counter()
+    seed()
+    print(f"Seeded {args.events} events for {args.users} users in {time.perf_counter() - started:.1f}s ({db_path})")
+    users = random.sample(list(EventManagerUser.objects.all()), min(args.queries, args.users))
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX {INDEX_NAME}")
+    print("\nBefore: no composite index")
+    report("before", users)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE INDEX {INDEX_NAME} ON core_event (user_id, scheduled_time)")
+        cursor.execute("ANALYZE")
+    print("\nAfter: (user, scheduled_time) index")
+    report("after", users)
+
+
+if __name__ == "__main__":
+    run()
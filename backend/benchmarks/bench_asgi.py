@@ -0,0 +1,193 @@
+# benchmarks/bench_asgi.py
+# Usage: python -m benchmarks.bench_asgi [--messages 400] [--ai-latency 0.5] [--memory-mb 512]
+# How many webhook messages a fixed memory budget keeps in flight while
+# Gemini is slow. A burst of messages from distinct users (mostly "create"
+# messages that need Gemini, some agenda reads) is answered by:
+#   wsgi sync      --memory-mb / worker RSS sync workers, one request each
+#   wsgi gthread   the same workers with --threads threads each
+#   asgi           one process: whatsapp_webhook_async on a single event loop
+# WSGI workers are simulated by threads of this process, each serving one
+# request at a time through the sync view; a worker's memory is taken to be
+# this process's RSS once the app is loaded. Reports throughput, latency,
+# requests in flight and the estimated memory: workers x worker RSS plus
+# what the run itself added. Gemini is benchmarks.fake_ai.
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import resource
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--messages', type=int, default=400, help="Messages in the burst")
+parser.add_argument('--ai-latency', type=float, default=0.5, help="Mean fake Gemini latency, seconds")
+parser.add_argument('--memory-mb', type=int, default=512, help="Memory budget shared by all runs")
+parser.add_argument('--threads', type=int, default=4, help="Threads per gthread worker")
+parser.add_argument('--read-share', type=float, default=0.2, help="Share of agenda reads in the burst")
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'asgi_bench.sqlite3')
+settings.DATABASES['default']['OPTIONS'] = {'timeout': 30}
+settings.DEBUG = False
+settings.WEBHOOK_ASYNC_MODE = False
+# Every create message goes to Gemini, and no run sheds calls
+settings.FAST_PARSER_CONFIDENCE_THRESHOLD = 1.01
+settings.LLM_TIMEOUT = 60
+settings.LLM_MAX_IN_FLIGHT = args.messages
+settings.LLM_MAX_IN_FLIGHT_ASYNC = args.messages
+django.setup()
+logging.disable(logging.CRITICAL)
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.urls import clear_url_caches
+import backend.urls
+import core.urls
+from core.clients import ai_service_provider
+from benchmarks.fake_ai import fake_ai_service
+
+PAGE_MB = os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * PAGE_MB
+    except OSError:
+        # ru_maxrss is a peak, in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PeakRSS:
+    """Samples RSS in the background while a run is going"""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def burst(run_id):
+    messages = []
+    every = round(1 / args.read_share) if args.read_share else 0
+    for i in range(args.messages):
+        phone = f"+1{run_id}66{i:07d}"
+        if every and i % every == 0:
+            messages.append((phone, 'events'))
+        else:
+            messages.append((phone, f"Review {run_id}-{i} tomorrow at {i % 9 + 1}pm"))
+    return messages
+
+
+def form(phone, body):
+    return {'From': f"whatsapp:{phone}", 'Body': body}
+
+
+def wsgi(workers):
+    def run(messages):
+        latencies = []
+
+        def handle(message):
+            # One request at a time per simulated worker thread
+            client = Client()
+            started = time.perf_counter()
+            response = client.post('/webhook/whatsapp/', form(*message), secure=True)
+            latencies.append(time.perf_counter() - started)
+            connection.close()
+            return response.content.decode()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            replies = list(pool.map(handle, messages))
+        return replies, latencies
+    return run
+
+
+def asgi(messages):
+    async def main():
+        client = AsyncClient()
+        latencies = []
+
+        async def handle(message):
+            started = time.perf_counter()
+            response = await client.post('/webhook/whatsapp/', form(*message), secure=True)
+            latencies.append(time.perf_counter() - started)
+            return response.content.decode()
+
+        return await asyncio.gather(*(handle(message) for message in messages)), latencies
+    return asyncio.run(main())
+
+
+def use_view(async_view):
+    # core.urls picks the webhook view when it is imported
+    settings.WEBHOOK_ASYNC_VIEW = async_view
+    importlib.reload(core.urls)
+    importlib.reload(backend.urls)
+    clear_url_caches()
+
+
+def measure(label, run, async_view, processes, in_flight, worker_mb, run_id):
+    use_view(async_view)
+    messages = burst(run_id)
+    before = rss_mb()
+    with PeakRSS() as peak:
+        started = time.perf_counter()
+        replies, latencies = run(messages)
+        wall = time.perf_counter() - started
+    added = max(0.0, peak.peak - before)
+    errors = sum('Sorry, I encountered an error' in reply for reply in replies)
+    latencies.sort()
+    memory = processes * worker_mb + added
+    print(f"{label:<13} {processes:>5} {in_flight:>9} {memory:>7.0f} {added:>9.1f} {len(messages) / wall:>8.1f} "
+          f"{statistics.median(latencies) * 1000:>8.0f} {latencies[int(len(latencies) * 0.95)] * 1000:>8.0f} "
+          f"{errors:>6}")
+
+
+def main():
+    call_command('migrate', verbosity=0)
+    with ai_service_provider.override(fake_ai_service(latency=args.ai_latency, jitter=0.25)):
+        # Load every code path once so the worker size includes them
+        use_view(False)
+        Client().post('/webhook/whatsapp/', form('+10', 'Warm up tomorrow at 9am'), secure=True)
+        use_view(True)
+        asyncio.run(AsyncClient().post('/webhook/whatsapp/', form('+10', 'events'), secure=True))
+        worker_mb = rss_mb()
+        workers = max(1, int(args.memory_mb // worker_mb))
+
+        print(f"{args.messages} messages at once, fake Gemini {args.ai_latency * 1000:.0f}ms, "
+              f"{args.memory_mb}MB budget, worker RSS {worker_mb:.0f}MB -> {workers} WSGI workers")
+        print(f"{'server':<13} {'procs':>5} {'in flight':>9} {'est. MB':>7} {'run +MB':>9} {'msg/s':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+        measure('wsgi sync', wsgi(workers), False, workers, workers, worker_mb, 1)
+        gthreads = workers * args.threads
+        measure('wsgi gthread', wsgi(gthreads), False, workers, gthreads, worker_mb, 2)
+        measure('asgi', asgi, True, 1, args.messages, worker_mb, 3)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+# benchmarks/bench_catalog.py
+# Usage: python -m benchmarks.bench_catalog [--events 1000000] [--queries 2000] [--concurrency 8]
+# Writes a CSV feed of --events public events, most of them clustered
+# around --cities cities and the rest spread over the whole region, over
+# the next 60 days, and loads it with core.catalog.load_catalog. Then
+# --concurrency threads run "what's on near me" lookups (the nearest 5
+# within 10 km, over the next day or a weekend) from points in and around
+# the cities, answered by:
+#   bbox scan   latitude/longitude/time range filter, no geo index
+#   geohash     core.catalog.nearby over the (geohash, starts_at) index
+# Reports the load rate, lookups per second, latency percentiles and, for
+# the lookups both ran, whether they returned the same events. The geohash
+# lookups also run on a single thread, for their latency without contention.
+import argparse
+import csv
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--events', type=int, default=1000000)
+parser.add_argument('--cities', type=int, default=25)
+parser.add_argument('--queries', type=int, default=2000)
+parser.add_argument('--scan-queries', type=int, default=40, help="Lookups for the slow bbox scan")
+parser.add_argument('--concurrency', type=int, default=8)
+parser.add_argument('--radius-km', type=float, default=10.0)
+parser.add_argument('--limit', type=int, default=5)
+args = parser.parse_args()
+
+from django.conf import settings
+
+workdir = tempfile.mkdtemp()
+settings.DATABASES['default']['NAME'] = os.path.join(workdir, 'catalog_bench.sqlite3')
+settings.DATABASES['default']['OPTIONS'] = {'timeout': 30}
+settings.DEBUG = False
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from core import catalog
+from core.geohash import KM_PER_DEGREE, distance_km
+from core.metrics import counters
+from core.models import CatalogEvent
+
+# Cities and rural events inside this box (West Africa)
+REGION = (4.0, 14.0, -4.0, 14.0)
+KINDS = ['Concert', 'Art fair', 'Food market', 'Comedy night', 'Football match', 'Book reading', 'Tech meetup',
+         'Yoga in the park', 'Film screening', 'Church concert', 'Owambe', 'Fashion show']
+
+
+def scatter(rng, latitude, longitude, sigma_km):
+    return (latitude + rng.gauss(0, sigma_km) / KM_PER_DEGREE,
+            longitude + rng.gauss(0, sigma_km) / (KM_PER_DEGREE * math.cos(math.radians(latitude))))
+
+
+def write_feed(path, rng, cities, now):
+    with open(path, 'w', newline='') as feed:
+        writer = csv.writer(feed)
+        writer.writerow(['id', 'title', 'start', 'end', 'venue', 'lat', 'lon', 'category'])
+        for i in range(args.events):
+            if rng.random() < 0.8:
+                city = rng.choice(cities)
+                latitude, longitude = scatter(rng, *city, sigma_km=8)
+            else:
+                latitude, longitude = rng.uniform(*REGION[:2]), rng.uniform(*REGION[2:])
+            start = now + timedelta(minutes=rng.randrange(0, 60 * 24 * 60, 30))
+            kind = rng.choice(KINDS)
+            writer.writerow([f"e{i}", f"{kind} #{i}", start.isoformat(), (start + timedelta(hours=3)).isoformat(),
+                             f"Venue {i % 5000}", f"{latitude:.6f}", f"{longitude:.6f}", kind.split()[0].lower()])
+
+
+def lookups(rng, cities, now, count):
+    result = []
+    for _ in range(count):
+        if rng.random() < 0.7:
+            point = scatter(rng, *rng.choice(cities), sigma_km=5)
+        else:
+            point = (rng.uniform(*REGION[:2]), rng.uniform(*REGION[2:]))
+        if rng.random() < 0.5:
+            window = (now, now + timedelta(hours=24))
+        else:
+            start = now + timedelta(days=rng.randint(1, 50))
+            window = (start, start + timedelta(days=2))
+        result.append((point, window))
+    return result
+
+
+def bbox_scan(latitude, longitude, start, end):
+    dlat = args.radius_km / KM_PER_DEGREE
+    dlon = args.radius_km / (KM_PER_DEGREE * math.cos(math.radians(latitude)))
+    rows = CatalogEvent.objects.filter(
+        latitude__gte=latitude - dlat, latitude__lte=latitude + dlat,
+        longitude__gte=longitude - dlon, longitude__lte=longitude + dlon,
+        starts_at__gte=start, starts_at__lt=end,
+    ).only(*catalog.DISPLAY_FIELDS)
+    found = [(distance_km(latitude, longitude, row.latitude, row.longitude), row) for row in rows]
+    found = [item for item in found if item[0] <= args.radius_km]
+    found.sort(key=lambda item: (item[0], item[1].starts_at))
+    return found[:args.limit]
+
+
+def geohash(latitude, longitude, start, end):
+    return catalog.nearby(latitude, longitude, start, end, limit=args.limit, radius_km=args.radius_km)
+
+
+def run(label, lookup, queries, concurrency):
+    def one(query):
+        (latitude, longitude), (start, end) = query
+        try:
+            started = time.perf_counter()
+            found = lookup(latitude, longitude, start, end)
+            return time.perf_counter() - started, [event.pk for _, event in found]
+        finally:
+            connection.close()
+
+    counters.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, queries))
+    wall = time.perf_counter() - started
+    latencies = sorted(latency for latency, _ in results)
+    empty = sum(not ids for _, ids in results)
+    print(f"{label:<10} {concurrency:>7} {len(queries):>7} {len(queries) / wall:>9.0f} {statistics.median(latencies) * 1000:>8.2f} "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.2f} {latencies[int(len(latencies) * 0.99)] * 1000:>8.2f} "
+          f"{empty / len(queries):>7.0%}")
+    return [ids for _, ids in results]
+
+
+def main():
+    call_command('migrate', verbosity=0)
+    rng = random.Random(0)
+    now = timezone.now().replace(second=0, microsecond=0)
+    cities = [(rng.uniform(*REGION[:2]), rng.uniform(*REGION[2:])) for _ in range(args.cities)]
+
+    path = os.path.join(workdir, 'feed.csv')
+    write_feed(path, rng, cities, now)
+    with open(path, 'rb') as feed:
+        loaded = catalog.load_catalog(feed, name=path, source='bench')
+    print(f"loaded {loaded['loaded']} events in {loaded['seconds']:.1f}s "
+          f"({loaded['loaded'] / loaded['seconds']:,.0f}/s), {loaded['invalid']} invalid")
+    print(f"nearest {args.limit} within {args.radius_km:g} km")
+
+    queries = lookups(rng, cities, now, args.queries)
+    print(f"{'lookup':<10} {'threads':>7} {'queries':>7} {'per sec':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'empty':>7}")
+    scanned = run('bbox scan', bbox_scan, queries[:args.scan_queries], args.concurrency)
+    # One thread: the latency of a lookup on its own, without waiting on the GIL
+    run('geohash', geohash, queries, 1)
+    indexed = run('geohash', geohash, queries, args.concurrency)
+    stats = catalog.stats()
+    print(f"geohash: {stats['levels_per_query']:.2f} levels and {stats['candidates_per_query']:.0f} candidate rows "
+          f"per lookup")
+    same = sum(a == b for a, b in zip(scanned, indexed))
+    print(f"same events as the scan: {same}/{len(scanned)}")
+
+
+if __name__ == '__main__':
+    main()
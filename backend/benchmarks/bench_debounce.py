@@ -0,0 +1,84 @@
+# benchmarks/bench_debounce.py
+# Usage: python -m benchmarks.bench_debounce [--users 200] [--window 0.3]
+# Replays bursty WhatsApp traffic (an event typed across 1-4 quick messages,
+# then a pause) through MessageDebouncer and reports how many pipeline runs,
+# and so LLM parses, were saved and how much latency the window added.
+# Times are scaled down: gaps are drawn relative to --window.
+import argparse
+import os
+import random
+import threading
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from core import debounce
+from core.debounce import MessageDebouncer
+from core.metrics import counters, histograms
+
+FRAGMENTS = [
+    ["meeting with Ada", "tomorrow", "3pm at the office"],
+    ["dentist", "friday 10am"],
+    ["call mum on sunday at 6pm"],
+    ["team standup", "every weekday", "9am", "zoom"],
+    ["lunch with Tunde tomorrow at 1pm"],
+]
+
+
+def user_session(debouncer, phone, bursts, window, rng):
+    for _ in range(bursts):
+        for fragment in rng.choice(FRAGMENTS):
+            debouncer.submit({'from': phone, 'to': '', 'body': fragment, 'received_at': time.time()})
+            # Typing gap inside a burst: mostly well under the window
+            time.sleep(rng.uniform(0.1, 0.8) * window)
+        # Pause before the next request: always longer than the window
+        time.sleep(rng.uniform(2, 4) * window)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--bursts', type=int, default=5)
+    parser.add_argument('--window', type=float, default=0.3)
+    args = parser.parse_args()
+
+    flushed = []
+    lock = threading.Lock()
+
+    def flush(job):
+        with lock:
+            flushed.append(job)
+
+    counters.reset()
+    histograms.reset()
+    debouncer = MessageDebouncer(flush, window=args.window)
+    threads = [
+        threading.Thread(target=user_session, args=(debouncer, f"whatsapp:+1555{i:07d}", args.bursts,
+                                                    args.window, random.Random(i)))
+        for i in range(args.users)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    time.sleep(args.window * 4)
+    debouncer.flush_all()
+    elapsed = time.perf_counter() - started
+
+    stats = debounce.stats()
+    latency = stats['added_latency']
+    print(f"window:            {args.window:.2f}s (max wait {debouncer.max_wait:.2f}s), {elapsed:.1f}s run")
+    print(f"messages:          {stats['messages']:,}")
+    print(f"pipeline runs:     {len(flushed):,} (without debouncing: {stats['messages']:,})")
+    print(f"LLM calls saved:   {stats['llm_calls_saved']:,} ({stats['saved_rate']:.0%})")
+    print(f"added latency:     p50 <= {latency['p50'] * 1000:.0f}ms  p95 <= {latency['p95'] * 1000:.0f}ms  "
+          f"p99 <= {latency['p99'] * 1000:.0f}ms  max {latency['max'] * 1000:.0f}ms  "
+          f"(bucket bounds; window is {args.window * 1000:.0f}ms)")
+
+
+if __name__ == '__main__':
+    main()
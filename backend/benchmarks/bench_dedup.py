@@ -0,0 +1,109 @@
+# benchmarks/bench_dedup.py
+# Usage: python -m benchmarks.bench_dedup [--messages 300] [--twilio-timeout 1.0] [--slow-rate 0.15]
+# Replays Twilio's retry behaviour against the webhook: each message is
+# posted with its MessageSid, re-posted every --twilio-timeout seconds
+# while no answer has come back (up to --retries times), and a share of
+# answered messages is delivered once more (--redeliver). Fake Gemini
+# (benchmarks.fake_ai) has a slow tail that trips the timeout. Run without
+# and with the MessageSid dedup layer; reports Gemini calls, duplicate
+# Event rows, the duplicate rate and LLM calls saved.
+import argparse
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--messages', type=int, default=300)
+parser.add_argument('--concurrency', type=int, default=16, help="Messages in flight at once")
+parser.add_argument('--ai-latency', type=float, default=0.3, help="Mean fake Gemini latency, seconds")
+parser.add_argument('--slow-rate', type=float, default=0.15, help="Share of Gemini calls 5x slower")
+parser.add_argument('--twilio-timeout', type=float, default=1.0, help="Twilio's 15s, scaled down")
+parser.add_argument('--retries', type=int, default=3)
+parser.add_argument('--redeliver', type=float, default=0.05, help="Share of messages delivered twice")
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'dedup_bench.sqlite3')
+settings.DATABASES['default']['OPTIONS'] = {'timeout': 30}
+settings.DEBUG = False
+settings.WEBHOOK_ASYNC_MODE = False
+settings.FAST_PARSER_CONFIDENCE_THRESHOLD = 1.01
+settings.LLM_TIMEOUT = 30
+settings.LLM_MAX_IN_FLIGHT = 256
+django.setup()
+logging.disable(logging.CRITICAL)
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from core import webhook_dedup
+from core.clients import ai_service_provider
+from core.metrics import counters
+from core.models import Event
+from benchmarks.fake_ai import fake_ai_service
+
+
+def post(phone, body, sid):
+    try:
+        return Client().post('/webhook/whatsapp/', {'From': f"whatsapp:{phone}", 'Body': body, 'MessageSid': sid},
+                             secure=True).content.decode()
+    finally:
+        connection.close()
+
+
+def deliver(pool, phone, body, sid, redeliver):
+    """Post like Twilio: retry while unanswered, sometimes deliver again"""
+    attempts = [pool.submit(post, phone, body, sid)]
+    for _ in range(args.retries):
+        done, _pending = wait(attempts, timeout=args.twilio_timeout)
+        if done:
+            break
+        attempts.append(pool.submit(post, phone, body, sid))
+    wait(attempts)
+    if redeliver:
+        post(phone, body, sid)
+    return len(attempts) + redeliver
+
+
+def run(label, backend, run_id):
+    settings.WEBHOOK_DEDUP_BACKEND = backend
+    webhook_dedup._webhook_dedup = None
+    counters.reset()
+    service = fake_ai_service(latency=args.ai_latency, slow_rate=args.slow_rate, slow_factor=5, seed=run_id)
+    every = round(1 / args.redeliver) if args.redeliver else 0
+    before = Event.objects.count()
+    started = time.perf_counter()
+    with ai_service_provider.override(service), \
+            ThreadPoolExecutor(max_workers=args.concurrency * (args.retries + 1)) as pool, \
+            ThreadPoolExecutor(max_workers=args.concurrency) as twilio:
+        posts = sum(twilio.map(
+            lambda i: deliver(pool, f"+1{run_id}77{i:07d}", f"Review {run_id}-{i} tomorrow at {i % 9 + 1}pm",
+                              f"SM{run_id}{i:030d}", bool(every) and i % every == 0),
+            range(args.messages)))
+    wall = time.perf_counter() - started
+    created = Event.objects.count() - before
+    stats = webhook_dedup.stats()
+    print(f"{label:<10} {posts:>6} {service.client.models.calls:>7} {created:>7} {created - args.messages:>6} "
+          f"{stats['duplicate_rate']:>8.1%} {stats['llm_calls_saved']:>6} {wall:>8.2f}")
+
+
+def main():
+    call_command('migrate', verbosity=0)
+    print(f"{args.messages} messages, fake Gemini {args.ai_latency * 1000:.0f}ms with {args.slow_rate:.0%} 5x slower, "
+          f"Twilio retry after {args.twilio_timeout:g}s (up to {args.retries}), {args.redeliver:.0%} delivered twice")
+    print(f"{'dedup':<10} {'posts':>6} {'gemini':>7} {'events':>7} {'dupes':>6} {'dup rate':>8} {'saved':>6} "
+          f"{'seconds':>8}")
+    run('none', 'none', 1)
+    run('local', 'local', 2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_fast_parser.py
+# Usage: python -m benchmarks.bench_fast_parser  (from the backend/ directory)
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from django.conf import settings
+from core.fast_parser import fast_parser
+
+# Mix of the shapes we see in production, including ones that must go to the LLM
+corpus = [
+    "dentist tomorrow at 3pm",
+    "team sync friday 10:30",
+    "create meeting tomorrow at 2pm",
+    "call mom 9am",
+    "gym saturday 7am",
+    "Dinner at Luigi's march 3 8pm",
+    "pay rent in 3 days",
+    "lunch with Sam at 1",
+    "Schedule a quick follow-up meeting with the team next Tuesday at 4pm at the conference room.",
+    "Google Meet training session this Friday 2 PM, meeting link is meet.google.com/abc-defg-hij",
+    "Zoom call for the Project Kickoff on Monday at 10:30 AM. Link: https://zoom.us/j/123?pwd=xyz. Meeting ID: 123 456 7890.",
+    "Remind me about dinner tonight, don't forget the wine!",
+    "standup mon-fri 9am",
+    "book club every second thursday",
+]
+
+
+def run(iterations=2000):
+    threshold = settings.FAST_PARSER_CONFIDENCE_THRESHOLD
+    timings = []
+    accepted = 0
+    for _ in range(iterations):
+        for message in corpus:
+            start = time.perf_counter()
+            result = fast_parser.parse(message)
+            timings.append(time.perf_counter() - start)
+            if result and result['confidence'] >= threshold:
+                accepted += 1
+
+    total = iterations * len(corpus)
+    timings.sort()
+    print(f"Messages parsed:   {total}")
+    print(f"Accepted (>= {threshold}): {accepted / total:.1%} of corpus -> LLM calls avoided")
+    print(f"p50: {statistics.median(timings) * 1e6:.1f} µs")
+    print(f"p99: {timings[int(total * 0.99)] * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    run()
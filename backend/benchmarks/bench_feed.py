@@ -0,0 +1,96 @@
+# benchmarks/bench_feed.py
+# Usage: python -m benchmarks.bench_feed [--events 2000] [--requests 50]
+# Serves one user's ICS feed through the Django test client from a scratch
+# SQLite database and reports requests/sec for
+#   cold: fragment cache emptied before every request (everything rendered)
+#   hot:  fragment cache warm, full body streamed
+#   304:  client revalidates with If-None-Match and nothing changed
+#   edit: one event edited between requests (one fragment re-rendered)
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--events', type=int, default=2000)
+parser.add_argument('--requests', type=int, default=50)
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'feed_bench.sqlite3')
+settings.DEBUG = False
+django.setup()
+
+from django.core.management import call_command
+from django.test import Client
+from django.utils import timezone
+from core import feeds
+from core.models import Event, EventManagerUser
+
+
+def seed():
+    call_command('migrate', verbosity=0)
+    user = EventManagerUser.objects.create(phone_number='+15550000001', timezone='Africa/Lagos')
+    now = timezone.now()
+    Event.objects.bulk_create([
+        Event(
+            user=user,
+            title=f"Event {i} with a reasonably descriptive title",
+            scheduled_time=now + timedelta(minutes=random.randint(-43200, 259200)),
+            location=f"Room {i % 40}",
+            notes="Agenda: review, planning, questions. " * 3,
+            is_recurring=i % 50 == 0,
+            recurrence_pattern='FREQ=WEEKLY;BYDAY=MO,WE' if i % 50 == 0 else None,
+        )
+        for i in range(args.events)
+    ])
+    return user, feeds.ensure_feed_token(user)
+
+
+def measure(label, request, before=None):
+    sizes = []
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        if before:
+            before()
+        response = request()
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        sizes.append(len(body))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<6} {args.requests / elapsed:8.1f} req/s  {elapsed / args.requests * 1000:7.2f} ms/req  "
+          f"status {response.status_code}  body {sizes[-1] / 1024:.0f} KiB")
+
+
+def main():
+    user, token = seed()
+    client = Client()
+    url = f"/calendar/{token}.ics"
+    renderer = feeds.get_feed_renderer()
+
+    def get(**headers):
+        return lambda: client.get(url, secure=True, **headers)
+
+    print(f"{args.events:,} events, {args.requests} requests per scenario")
+    measure('cold', get(), before=renderer.backend.clear)
+    measure('hot', get())
+    etag = client.get(url, secure=True)['ETag']
+    measure('304', get(HTTP_IF_NONE_MATCH=etag))
+
+    events = list(Event.objects.filter(user=user)[:args.requests])
+
+    def edit_one():
+        event = events.pop()
+        event.title += ' (moved)'
+        event.save()
+    measure('edit', get(), before=edit_one)
+
+
+if __name__ == '__main__':
+    main()
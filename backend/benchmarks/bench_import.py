@@ -0,0 +1,103 @@
+# benchmarks/bench_import.py
+# Usage: python -m benchmarks.bench_import [--events 1000000] [--format ics] [--batch-size 2000]
+# Writes a synthetic calendar file, imports it into a scratch SQLite database
+# through core.importer and reports throughput and resident memory. Importing the
+# same file a second time measures the all-duplicates path.
+import argparse
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--events', type=int, default=1_000_000)
+parser.add_argument('--format', choices=['ics', 'csv'], default='ics')
+parser.add_argument('--batch-size', type=int, default=2000)
+parser.add_argument('--skip-reimport', action='store_true')
+args = parser.parse_args()
+
+from django.conf import settings
+
+workdir = tempfile.mkdtemp()
+db_path = os.path.join(workdir, 'import_bench.sqlite3')
+settings.DATABASES['default']['NAME'] = db_path
+# DEBUG keeps the SQL of the last 9000 queries (each a 2000-row INSERT here)
+settings.DEBUG = False
+django.setup()
+
+from django.core.management import call_command
+from core.importer import import_calendar
+from core.models import EventManagerUser
+
+ZONES = ['Africa/Lagos', 'Europe/London', 'America/New_York']
+
+
+def write_ics(path, count):
+    start = datetime(2026, 1, 1, 8, 0)
+    with open(path, 'w', newline='') as out:
+        out.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//bench//EN\r\n")
+        for i in range(count):
+            when = start + timedelta(minutes=17 * i)
+            out.write(
+                "BEGIN:VEVENT\r\n"
+                f"UID:{i}@bench\r\n"
+                f"SUMMARY:Imported event {i}\r\n"
+                f"DTSTART;TZID={ZONES[i % 3]}:{when:%Y%m%dT%H%M%S}\r\n"
+                f"LOCATION:Room {i % 40}\r\n"
+                f"DESCRIPTION:Synthetic event number {i} with a description long enough to be folded \r\n"
+                " across two physical lines\r\n"
+                + ("RRULE:FREQ=WEEKLY;COUNT=4\r\n" if i % 1000 == 0 else "")
+                + "END:VEVENT\r\n"
+            )
+        out.write("END:VCALENDAR\r\n")
+
+
+def write_csv(path, count):
+    start = datetime(2026, 1, 1, 8, 0)
+    with open(path, 'w', newline='') as out:
+        out.write("Subject,Start Date,Start Time,Timezone,Location,Description\r\n")
+        for i in range(count):
+            when = start + timedelta(minutes=17 * i)
+            out.write(f"Imported event {i},{when:%m/%d/%Y},{when:%I:%M %p},{ZONES[i % 3]},Room {i % 40},"
+                      f"\"Synthetic event number {i}, from CSV\"\r\n")
+
+
+def max_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_import(user, path):
+    with open(path, 'rb') as fileobj:
+        return import_calendar(user, fileobj, name=path, batch_size=args.batch_size)
+
+
+def report(label, result):
+    rate = (result['created'] + result['duplicates']) / result['seconds']
+    print(f"{label:<10} created {result['created']:>9,}  duplicates {result['duplicates']:>9,}  "
+          f"invalid {result['invalid']:>4}  {result['seconds']:6.1f}s  {rate:>8,.0f} events/s  "
+          f"max RSS {max_rss_mib():.0f} MiB")
+
+
+def main():
+    call_command('migrate', verbosity=0)
+    user = EventManagerUser.objects.create(phone_number='+15550000001', timezone='Africa/Lagos')
+
+    path = os.path.join(workdir, f"calendar.{args.format}")
+    started = time.perf_counter()
+    (write_ics if args.format == 'ics' else write_csv)(path, args.events)
+    print(f"generated {args.events:,} events ({os.path.getsize(path) / 2**20:.0f} MiB {args.format}) "
+          f"in {time.perf_counter() - started:.1f}s, batch size {args.batch_size}")
+
+    print(f"max RSS before import: {max_rss_mib():.0f} MiB")
+    report('import', run_import(user, path))
+    if not args.skip_reimport:
+        report('re-import', run_import(user, path))
+
+
+if __name__ == '__main__':
+    main()
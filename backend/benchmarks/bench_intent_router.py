@@ -0,0 +1,95 @@
+# benchmarks/bench_intent_router.py
+# Usage: python -m benchmarks.bench_intent_router  (from the backend/ directory)
+import re
+import time
+
+from core import intent_router
+
+# (message, expected intent)
+labelled_corpus = [
+    ("hi", intent_router.MENU),
+    ("help", intent_router.MENU),
+    ("events", intent_router.EVENTS),
+    ("what do i have coming up", intent_router.EVENTS),
+    ("show my schedule", intent_router.EVENTS),
+    ("today", intent_router.TODAY),
+    ("what's on my agenda", intent_router.TODAY),
+    ("cancel", intent_router.CANCEL),
+    ("when is my dentist appointment?", intent_router.SEARCH),
+    ("search yoga", intent_router.SEARCH),
+    ("what's on near me tonight?", intent_router.NEARBY),
+    ("any events nearby this weekend", intent_router.NEARBY),
+    ("dentist tomorrow at 3pm", intent_router.CREATE),
+    ("team sync friday 10:30", intent_router.CREATE),
+    ("create meeting tomorrow at 2pm", intent_router.CREATE),
+    ("Schedule a quick follow-up meeting with the team next Tuesday at 4pm", intent_router.CREATE),
+    ("lunch with Sam at 1 on thursday", intent_router.CREATE),
+    ("remind me to call mom", intent_router.CREATE),
+    ("birthday party on may 3", intent_router.CREATE),
+    # Chit-chat that must not reach the LLM
+    ("can we chat later", intent_router.UNKNOWN),
+    ("maybe some other time", intent_router.UNKNOWN),
+    ("that is a great idea", intent_router.UNKNOWN),
+    ("what are you", intent_router.UNKNOWN),
+    ("thanks a lot mate", intent_router.UNKNOWN),
+    ("I am not sure about that", intent_router.UNKNOWN),
+    ("I have 2 kids and 3 dogs", intent_router.UNKNOWN),
+    ("what is the weather like", intent_router.UNKNOWN),
+    ("nice to meet you", intent_router.UNKNOWN),
+    ("that sounds good", intent_router.UNKNOWN),
+]
+
+
+def legacy_classify(message):
+    """The keyword cascade process_message used before the router"""
+    message_lower = message.lower().strip()
+    if message_lower in ['hi', 'hello', 'hey', 'start', 'help', 'menu']:
+        return intent_router.MENU
+    elif any(keyword in message_lower for keyword in ['events', 'upcoming', 'schedule', 'plans', 'what do i have']):
+        return intent_router.EVENTS
+    elif any(keyword in message_lower for keyword in ['today', "today's", 'agenda']):
+        return intent_router.TODAY
+    elif any(keyword in message_lower for keyword in ['cancel', 'clear', 'stop']):
+        return intent_router.CANCEL
+    time_date_words = [
+        'tomorrow', 'today', 'monday', 'tuesday', 'wednesday', 'thursday',
+        'friday', 'saturday', 'sunday', 'week', 'month', 'year',
+        'at', 'am', 'pm', 'morning', 'afternoon', 'evening', 'night',
+        'january', 'february', 'march', 'april', 'may', 'june', 'july',
+        'august', 'september', 'october', 'november', 'december'
+    ]
+    has_time = re.search(r'\b(\d{1,2}(:\d{2})?\s*(am|pm)?)\b', message_lower)
+    has_date_word = any(word in message_lower for word in time_date_words)
+    if (has_time or has_date_word) and len(message.split()) >= 3:
+        return intent_router.CREATE
+    if any(keyword in message_lower for keyword in ['create', 'schedule', 'appointment', 'meeting', 'remind', 'set up']):
+        return intent_router.CREATE
+    return intent_router.UNKNOWN
+
+
+def measure(classify, iterations=5000):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message, _expected in labelled_corpus:
+            classify(message)
+    per_message = (time.perf_counter() - start) / (iterations * len(labelled_corpus))
+
+    wrong = [(m, e, classify(m)) for m, e in labelled_corpus if classify(m) != e]
+    negatives = [m for m, e in labelled_corpus if e != intent_router.CREATE]
+    false_llm = [m for m in negatives if classify(m) == intent_router.CREATE]
+    return per_message, wrong, len(false_llm) / len(negatives)
+
+
+def run():
+    for name, classify in (("legacy cascade", legacy_classify), ("compiled router", intent_router.classify)):
+        per_message, wrong, false_positive_rate = measure(classify)
+        print(f"{name}:")
+        print(f"  {per_message * 1e6:.2f} µs/message")
+        print(f"  accuracy: {1 - len(wrong) / len(labelled_corpus):.0%}")
+        print(f"  false positives routed to the LLM: {false_positive_rate:.0%}")
+        for message, expected, got in wrong:
+            print(f"    {message!r}: expected {expected}, got {got}")
+
+
+if __name__ == "__main__":
+    run()
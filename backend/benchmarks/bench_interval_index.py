@@ -0,0 +1,131 @@
+# benchmarks/bench_interval_index.py
+# Usage: python -m benchmarks.bench_interval_index [--events 5000] [--series 20] [--queries 2000]
+# One user with a long history of one-off events (--events spread over the
+# past two years and the coming month) plus --series recurring series, then
+# random conflict checks (one hour at a random time in the next month) and
+# "free tomorrow" lookups, answered by:
+#   history scan   every event of the user loaded and tested in Python
+#   range query    occurrences_between() for the range, per query
+#   index          core.interval_index, built once then bisected
+# Reports microseconds and database queries per lookup, and checks that
+# all three agree.
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--events', type=int, default=5000, help="One-off events in the user's history")
+parser.add_argument('--series', type=int, default=20, help="Recurring series")
+parser.add_argument('--queries', type=int, default=2000)
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'interval_bench.sqlite3')
+settings.DEBUG = False
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from core import agenda
+from core.interval_index import LOOKBACK, IntervalIndexes, build_index, event_duration
+from core.cache_backends import LocalLRUBackend
+from core.models import Event, EventManagerUser
+from core.occurrences import ensure_materialized, hot_horizon
+
+RULES = ['FREQ=DAILY', 'FREQ=WEEKLY;BYDAY=MO,WE,FR', 'FREQ=WEEKLY;BYDAY=TU', 'FREQ=MONTHLY;BYMONTHDAY=1']
+
+
+def populate(now):
+    rng = random.Random(0)
+    user = EventManagerUser.objects.create(phone_number='+15550000001')
+    events = []
+    for i in range(args.events):
+        # Mostly history, about a tenth in the coming month
+        offset = rng.uniform(-730, 0) if rng.random() < 0.9 else rng.uniform(0, 30)
+        start = (now + timedelta(days=offset)).replace(minute=rng.choice([0, 30]), second=0, microsecond=0)
+        events.append(Event(user=user, title=f"Event {i}", scheduled_time=start,
+                            duration_minutes=rng.choice([None, 30, 45, 90])))
+    Event.objects.bulk_create(events, batch_size=1000)
+    for i in range(args.series):
+        start = (now - timedelta(days=rng.uniform(0, 365))).replace(hour=rng.randint(7, 19), minute=0,
+                                                                     second=0, microsecond=0)
+        Event.objects.create(user=user, title=f"Series {i}", scheduled_time=start, is_recurring=True,
+                             recurrence_pattern=rng.choice(RULES), duration_minutes=30)
+    ensure_materialized(user, hot_horizon(now), now)
+    return user
+
+
+def scan_conflicts(user, start, end):
+    tz = agenda.user_timezone(user)
+    found = []
+    for event in Event.objects.filter(user=user):
+        for starts_at in agenda.iter_occurrences(event, start - timedelta(days=1), end, tz):
+            if starts_at < end and starts_at + event_duration(event) > start:
+                found.append(event.pk)
+    return sorted(found)
+
+
+def range_conflicts(user, start, end):
+    index_like = [(o.start, o.start + event_duration(o.event), o.event.pk)
+                  for o in agenda.occurrences_between(user, start - timedelta(days=1), end)]
+    return sorted(pk for s, e, pk in index_like if s < end and e > start)
+
+
+def index_conflicts(indexes):
+    def lookup(user, start, end):
+        return sorted(item[2] for item in indexes.get(user, start, end).overlapping(start, end))
+    return lookup
+
+
+def measure(label, lookup, user, ranges):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        results = [lookup(user, start, end) for start, end in ranges]
+        elapsed = time.perf_counter() - started
+    print(f"{label:<15} {elapsed / len(ranges) * 1e6:>10.1f} {len(queries) / len(ranges):>9.2f}")
+    return results
+
+
+def main():
+    call_command('migrate', verbosity=0)
+    now = timezone.now()
+    user = populate(now)
+    rng = random.Random(1)
+    hours = [now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=rng.randint(2, 24 * 28))
+             for _ in range(args.queries)]
+    conflict_ranges = [(start, start + timedelta(hours=1)) for start in hours]
+    indexes = IntervalIndexes(LocalLRUBackend(16))
+
+    total = Event.objects.filter(user=user).count()
+    print(f"{total} events ({args.series} recurring), {args.queries} lookups")
+    print(f"{'conflict check':<15} {'us/lookup':>10} {'queries':>9}")
+    scan = measure('history scan', scan_conflicts, user, conflict_ranges[:max(1, args.queries // 20)])
+    ranged = measure('range query', range_conflicts, user, conflict_ranges)
+    indexed = measure('index', index_conflicts(indexes), user, conflict_ranges)
+    agree = scan == indexed[:len(scan)] and ranged == indexed
+    print(f"results agree: {agree}")
+
+    tomorrow = agenda.day_window(user, 1, now)[0]
+    day = (tomorrow + timedelta(hours=8), tomorrow + timedelta(hours=20))
+    minimum = timedelta(minutes=30)
+    print(f"\n{'free tomorrow':<15} {'us/lookup':>10} {'queries':>9}")
+    measure('range query', lambda u, s, e: build_index(u, s - LOOKBACK, e).free_slots(s, e, minimum), user,
+            [day] * 200)
+    measure('index', lambda u, s, e: indexes.free_slots(u, s, e, minimum), user, [day] * args.queries)
+    index = indexes.get(user, *day)
+    print(f"index entries: {len(index)}, longest {index.max_length / 60:.0f} min")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_llm_client.py
+# Usage: python -m benchmarks.bench_llm_client [--messages 400] [--concurrency 16] [--ai-latency 0.2]
+# Calls EventAIService.parse_event_message from concurrent threads against
+# benchmarks.fake_ai under three fault profiles (healthy, a slow tail where
+# 5% of calls take 10x longer, and a full outage) and compares a direct,
+# unguarded client with core.llm_client.GuardedLLMClient with and without
+# hedging. Reports caller-side latency and what the guard decided.
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--messages', type=int, default=400)
+parser.add_argument('--concurrency', type=int, default=16)
+parser.add_argument('--ai-latency', type=float, default=0.2, help="Mean fake Gemini latency, seconds")
+parser.add_argument('--timeout', type=float, default=1.0, help="Guard deadline, seconds")
+parser.add_argument('--hedge-after', type=float, default=0.4)
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'llm_bench.sqlite3')
+settings.DEBUG = False
+# Every message is unique, but keep the parse cache out of the picture anyway
+settings.PARSE_CACHE_BACKEND = 'none'
+django.setup()
+# Fault profiles log an error or warning per message
+logging.disable(logging.CRITICAL)
+
+from core.llm_client import CircuitBreaker, GuardedLLMClient
+from core.metrics import counters
+from benchmarks.fake_ai import fake_ai_service
+
+PROFILES = {
+    'healthy': {},
+    'slow tail': {'slow_rate': 0.05, 'slow_factor': 10},
+    'outage': {'error_rate': 1.0},
+}
+
+DECISIONS = ('llm.timeouts', 'llm.errors', 'llm.rejected_saturated', 'llm.rejected_open',
+             'llm.breaker_opened', 'llm.hedges', 'llm.hedge_wins', 'llm.fallbacks')
+
+
+class Unguarded:
+    """The previous behaviour: call Gemini directly and wait"""
+
+    def call(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+def guarded(hedge_after=0.0):
+    return GuardedLLMClient(timeout=args.timeout, max_in_flight=args.concurrency * 2,
+                            breaker=CircuitBreaker(5, reset_timeout=60), hedge_after=hedge_after)
+
+
+# A fresh guard (pool and breaker) per run
+GUARDS = {
+    'direct': Unguarded,
+    'guarded': guarded,
+    'hedged': lambda: guarded(args.hedge_after),
+}
+
+
+def run(profile, guard):
+    service = fake_ai_service(latency=args.ai_latency, seed=3, **PROFILES[profile])
+    service.guard = guard
+    counters.reset()
+
+    def one(index):
+        started = time.perf_counter()
+        try:
+            result = service.parse_event_message(f"Standup {index} tomorrow at 9am")
+        except Exception:
+            result = None
+        return time.perf_counter() - started, result is not None and result.get('datetime') is not None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.messages)))
+    wall = time.perf_counter() - started
+    if isinstance(guard, GuardedLLMClient):
+        guard.shutdown(wait=True)
+
+    latencies = sorted(seconds for seconds, _ in results)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    decisions = ', '.join(f"{name.split('.', 1)[1]} {counters.get(name)}" for name in DECISIONS if counters.get(name))
+    print(f"  {profile:<10} p50 {cuts[49] * 1000:7.0f}  p99 {cuts[98] * 1000:7.0f}  max {latencies[-1] * 1000:7.0f} ms  "
+          f"{sum(ok for _, ok in results) / len(results):6.1%} answered  "
+          f"{service.client.models.calls:4d} Gemini calls  {wall:5.1f}s  {decisions}")
+
+
+def main():
+    print(f"{args.messages} messages, concurrency {args.concurrency}, fake Gemini {args.ai_latency * 1000:.0f}ms, "
+          f"deadline {args.timeout * 1000:.0f}ms, hedge after {args.hedge_after * 1000:.0f}ms")
+    for name, build in GUARDS.items():
+        print(name)
+        for profile in PROFILES:
+            run(profile, build())
+
+
+if __name__ == '__main__':
+    main()
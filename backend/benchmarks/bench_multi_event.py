@@ -0,0 +1,70 @@
+# benchmarks/bench_multi_event.py
+# Usage: python -m benchmarks.bench_multi_event [--events 3 5 10] [--ai-latency 0.8]
+# Creates the same schedule twice through EventCreationService against
+# benchmarks.fake_ai: pasted as one message (one AI call, one bulk INSERT)
+# and sent one event per message, and reports AI calls, DB queries and time.
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--events', type=int, nargs='+', default=[3, 5, 10])
+parser.add_argument('--ai-latency', type=float, default=0.8, help="Fake Gemini latency, seconds")
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'multi_event_bench.sqlite3')
+settings.DEBUG = False
+settings.PARSE_CACHE_BACKEND = 'none'
+# Compare AI round trips only: single events the fast path could take are
+# out of scope here
+settings.FAST_PARSER_CONFIDENCE_THRESHOLD = 1.01
+django.setup()
+logging.disable(logging.CRITICAL)
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core.clients import ai_service_provider
+from core.event_creator import EventCreationService
+from core.models import Event, EventManagerUser
+from benchmarks.fake_ai import fake_ai_service
+
+ITEMS = ["standup monday at 9", "retro thursday at 4", "1:1 with Sam friday at 2", "planning tuesday at 11",
+         "demo wednesday at 3", "lunch with Ada saturday at 1", "gym sunday at 7", "review monday at 3",
+         "board call tuesday at 5", "offsite friday at 10"]
+
+
+def create(user, messages):
+    service = fake_ai_service(latency=args.ai_latency, jitter=0.0)
+    with ai_service_provider.override(service), CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for message in messages:
+            EventCreationService(user).process_event_creation(message)
+        elapsed = time.perf_counter() - started
+    return service.client.models.calls, len(queries), elapsed
+
+
+def main():
+    call_command('migrate', verbosity=0)
+    print(f"fake Gemini {args.ai_latency * 1000:.0f}ms")
+    print(f"{'events':>6}  {'mode':<10} {'AI calls':>8} {'queries':>8} {'seconds':>8} {'created':>8}")
+    for count in args.events:
+        items = (ITEMS * (count // len(ITEMS) + 1))[:count]
+        for mode, messages in (('pasted', [', '.join(items)]), ('one by one', items)):
+            user = EventManagerUser.objects.create(phone_number=f"+1555{count:04d}{len(messages):03d}")
+            calls, queries, elapsed = create(user, messages)
+            print(f"{count:>6}  {mode:<10} {calls:>8} {queries:>8} {elapsed:>8.2f} "
+                  f"{Event.objects.filter(user=user).count():>8}")
+
+
+if __name__ == '__main__':
+    main()
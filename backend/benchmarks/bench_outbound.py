@@ -0,0 +1,111 @@
+# benchmarks/bench_outbound.py
+# Usage: python -m benchmarks.bench_outbound [--messages 2000] [--senders 4] [--concurrency 32]
+# Sends the same batch of WhatsApp messages to benchmarks.fake_twilio, which
+# adds latency, fails a share of requests with 503 and answers 429 above a
+# per-sender rate limit, through:
+#   one by one   the previous path: sequential, a new connection per message, no retries
+#   threads      OutboundSender: pooled connections, per-sender buckets, retries
+#   no limiter   OutboundSender with the buckets effectively off (429s and retries)
+#   asyncio      AsyncOutboundSender on aiohttp
+# and reports delivered messages per second, failures, retries, 429s and
+# TCP connections opened.
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--messages', type=int, default=2000)
+parser.add_argument('--one-by-one', type=int, default=200, help="Messages for the sequential baseline")
+parser.add_argument('--senders', type=int, default=4, help="Sender numbers the batch is spread over")
+parser.add_argument('--concurrency', type=int, default=32)
+parser.add_argument('--latency', type=float, default=0.02, help="Fake Twilio response delay, seconds")
+parser.add_argument('--error-rate', type=float, default=0.02, help="Share of requests answered 503")
+parser.add_argument('--rate-limit', type=float, default=80, help="Fake Twilio limit per sender, msg/s")
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'outbound_bench.sqlite3')
+settings.DEBUG = False
+django.setup()
+logging.disable(logging.CRITICAL)
+
+from core.metrics import counters
+from core.outbound import AsyncOutboundSender, OutboundSender, RetryPolicy
+from benchmarks.fake_twilio import FakeTwilioServer
+
+SENDERS = [f"whatsapp:+1415000{i:04d}" for i in range(args.senders)]
+
+
+def batch(count):
+    return [(f"whatsapp:+1555{i:07d}", f"Reminder {i}: standup in 15 minutes", SENDERS[i % len(SENDERS)])
+            for i in range(count)]
+
+
+def retry_policy():
+    # Backoff scaled to the fake's latency rather than to a real outage
+    return RetryPolicy(max_retries=4, base=0.05, cap=1.0)
+
+
+def one_by_one(server, messages):
+    failed = 0
+    for to, body, from_ in messages:
+        try:
+            server.client(pooled=False).messages.create(from_=from_, to=to, body=body)
+        except Exception:
+            failed += 1
+    return failed
+
+
+def threads(rate):
+    def run(server, messages):
+        sender = OutboundSender(lambda: client, max_workers=args.concurrency, rate_per_second=rate,
+                                max_pending=args.concurrency * 4, retry=retry_policy())
+        client = server.client(pool_size=args.concurrency)
+        futures = [sender.submit(*message) for message in messages]
+        sender.shutdown()
+        return sum(future.exception() is not None for future in futures)
+    return run
+
+
+def asyncio_sender(server, messages):
+    async def main():
+        sender = AsyncOutboundSender(lambda: server.async_client(args.concurrency), concurrency=args.concurrency,
+                                     rate_per_second=args.rate_limit, retry=retry_policy())
+        try:
+            results = await sender.send_many(messages)
+        finally:
+            await sender.aclose()
+        return sum(isinstance(result, Exception) for result in results)
+    return asyncio.run(main())
+
+
+def measure(label, run, count):
+    counters.reset()
+    with FakeTwilioServer(latency=args.latency, error_rate=args.error_rate, rate_limit=args.rate_limit) as server:
+        started = time.perf_counter()
+        failed = run(server, batch(count))
+        elapsed = time.perf_counter() - started
+    print(f"{label:<11} {count:>6} {server.received / elapsed:>9.1f} {failed:>7} {counters.get('outbound.retries'):>8} "
+          f"{server.throttled:>6} {server.connections:>6} {elapsed:>8.2f}")
+
+
+def main():
+    print(f"fake Twilio {args.latency * 1000:.0f}ms, {args.error_rate:.0%} 503s, {args.rate_limit:g} msg/s per sender, "
+          f"{args.senders} senders, concurrency {args.concurrency}")
+    print(f"{'path':<11} {'msgs':>6} {'msg/s':>9} {'failed':>7} {'retries':>8} {'429s':>6} {'conns':>6} {'seconds':>8}")
+    measure('one by one', one_by_one, args.one_by_one)
+    measure('threads', threads(args.rate_limit), args.messages)
+    measure('no limiter', threads(1e9), args.messages)
+    measure('asyncio', asyncio_sender, args.messages)
+
+
+if __name__ == '__main__':
+    main()
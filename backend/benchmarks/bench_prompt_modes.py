@@ -0,0 +1,93 @@
+# benchmarks/bench_prompt_modes.py
+# Usage:
+#   python -m benchmarks.bench_prompt_modes [--rounds 20] [--chatter-rate 0.02]
+#   GOOGLE_API_KEY=... python -m benchmarks.bench_prompt_modes --live --rounds 1
+#
+# Runs the same messages through EventAIService in LLM_PROMPT_MODE 'legacy'
+# and 'structured' and compares prompt/output tokens per call, latency,
+# JSON parse failures and how often the user would be asked to clarify.
+# Offline (the default) Gemini is benchmarks.fake_ai: token counts are
+# estimates, latency is only our own overhead plus --ai-latency, and legacy
+# parse failures come from --chatter-rate. --live calls the real API and
+# reports its usage_metadata.
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--rounds', type=int, default=20, help="Passes over the message corpus per mode")
+parser.add_argument('--live', action='store_true', help="Call the real Gemini API (needs GOOGLE_API_KEY)")
+parser.add_argument('--ai-latency', type=float, default=0.0, help="Fake Gemini latency, seconds")
+parser.add_argument('--chatter-rate', type=float, default=0.02,
+                    help="Share of fake legacy replies with prose around the JSON")
+args = parser.parse_args()
+
+if not args.live:
+    os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'prompt_bench.sqlite3')
+settings.DEBUG = False
+settings.PARSE_CACHE_BACKEND = 'none'
+django.setup()
+logging.disable(logging.CRITICAL)
+
+from core.ai_service import EventAIService
+from core.metrics import counters
+from benchmarks.bench_fast_parser import corpus
+from benchmarks.fake_ai import fake_ai_service
+
+MODES = ('legacy', 'structured')
+
+
+def measure(service, mode):
+    service.prompt_mode = mode
+    counters.reset()
+    latencies = []
+    clarifications = 0
+    for _ in range(args.rounds):
+        for message in corpus:
+            started = time.perf_counter()
+            result = service.parse_event_message(message)
+            latencies.append(time.perf_counter() - started)
+            clarifications += bool(result.get('needs_clarification'))
+
+    calls = counters.get('llm.calls')
+    latencies.sort()
+    return {
+        'calls': calls,
+        'prompt_tokens': counters.get('llm.prompt_tokens') / calls,
+        'output_tokens': counters.get('llm.output_tokens') / calls,
+        'thinking_tokens': counters.get('llm.thinking_tokens') / calls,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'parse_failures': counters.get('llm.parse_failures') / calls,
+        'clarifications': clarifications / len(latencies),
+    }
+
+
+def main():
+    if args.live:
+        service = EventAIService()
+    else:
+        service = fake_ai_service(latency=args.ai_latency, jitter=0.0, chatter_rate=args.chatter_rate)
+    source = 'live Gemini' if args.live else 'fake Gemini, estimated tokens'
+    print(f"{len(corpus)} messages x {args.rounds} rounds per mode ({source})")
+    print(f"{'mode':<11} {'prompt tok':>10} {'output tok':>10} {'thinking':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'parse fail':>10} {'clarify':>8}")
+    for mode in MODES:
+        row = measure(service, mode)
+        print(f"{mode:<11} {row['prompt_tokens']:>10.0f} {row['output_tokens']:>10.0f} {row['thinking_tokens']:>9.0f} "
+              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['parse_failures']:>10.1%} {row['clarifications']:>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
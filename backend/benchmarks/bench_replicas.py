@@ -0,0 +1,170 @@
+# benchmarks/bench_replicas.py
+# Usage: python -m benchmarks.bench_replicas [--replicas 2] [--lag 0.5] [--users 120] [--concurrency 8]
+# A SQLite multi-file stand-in for a primary with streaming replicas: the
+# replicas are separate files that a background thread refreshes from the
+# primary every --lag seconds (sqlite3 backup). Virtual users post "create"
+# messages to the webhook and immediately ask for "events", while reader
+# threads keep asking for agendas. Three runs:
+#   primary only       core.db_router with no replicas
+#   replicas           agenda reads on replicas, no read-your-writes
+#   read-your-writes   replicas, with writers kept on the primary for a while
+# Reports throughput, latency, stale reads (an "events" reply missing the
+# event the user just created) and where agenda reads went. The agenda cache
+# is off so every agenda reply reads the database.
+import argparse
+import itertools
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--replicas', type=int, default=2)
+parser.add_argument('--lag', type=float, default=0.5, help="Seconds between replica refreshes")
+parser.add_argument('--users', type=int, default=120, help="Writing users per run")
+parser.add_argument('--rounds', type=int, default=4, help="Create-then-read rounds per writing user")
+parser.add_argument('--concurrency', type=int, default=8, help="Writer threads")
+parser.add_argument('--readers', type=int, default=4, help="Threads only asking for agendas")
+args = parser.parse_args()
+
+from django.conf import settings
+
+directory = tempfile.mkdtemp()
+PRIMARY = os.path.join(directory, 'primary.sqlite3')
+REPLICAS = {f'replica{i}': os.path.join(directory, f'replica{i}.sqlite3') for i in range(1, args.replicas + 1)}
+
+
+def sqlite_database(path):
+    return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, 'OPTIONS': {'timeout': 30}}
+
+
+settings.DATABASES = {'default': sqlite_database(PRIMARY),
+                      **{alias: sqlite_database(path) for alias, path in REPLICAS.items()}}
+settings.DEBUG = False
+settings.WEBHOOK_ASYNC_MODE = False
+settings.AGENDA_CACHE_BACKEND = 'none'
+django.setup()
+logging.disable(logging.CRITICAL)
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from core import db_router
+from core.metrics import counters
+
+
+def replicate():
+    source = sqlite3.connect(PRIMARY, timeout=30)
+    for path in REPLICAS.values():
+        target = sqlite3.connect(path, timeout=30)
+        source.backup(target)
+        target.close()
+    source.close()
+
+
+def replicator(stop):
+    while not stop.wait(args.lag):
+        replicate()
+
+
+def configure(replicas, sticky_seconds):
+    db_router._replicas = replicas
+    db_router._cycle = itertools.cycle(replicas)
+    settings.DB_STICKY_SECONDS = sticky_seconds
+    db_router._sticky = None
+
+
+def post(client, phone, body):
+    started = time.perf_counter()
+    response = client.post('/webhook/whatsapp/', {'From': f"whatsapp:{phone}", 'Body': body}, secure=True)
+    return response.content.decode(), time.perf_counter() - started
+
+
+def run(label, run_id):
+    counters.reset()
+    latencies, stale, errors = [], 0, 0
+    lock = threading.Lock()
+    done = threading.Event()
+    writers = [f"+1{run_id}55{i:07d}" for i in range(args.users)]
+
+    def record(reply, seconds):
+        nonlocal errors
+        with lock:
+            latencies.append(seconds)
+            errors += 'Sorry, I encountered an error' in reply
+
+    def writer(phones):
+        nonlocal stale
+        client = Client()
+        try:
+            for phone in phones:
+                for round_ in range(args.rounds):
+                    tag = f"r{run_id}u{phone[-4:]}k{round_}"
+                    record(*post(client, phone, f"Review {tag} tomorrow at {round_ + 1}pm"))
+                    reply, seconds = post(client, phone, 'events')
+                    record(reply, seconds)
+                    with lock:
+                        stale += tag.lower() not in reply.lower()
+        finally:
+            connection.close()
+
+    def reader(seed):
+        client = Client()
+        rng = random.Random(seed)
+        try:
+            while not done.is_set():
+                record(*post(client, rng.choice(writers), rng.choice(['events', 'today'])))
+        finally:
+            connection.close()
+
+    shards = [writers[i::args.concurrency] for i in range(args.concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency + args.readers) as pool:
+        readers = [pool.submit(reader, seed) for seed in range(args.readers)]
+        list(pool.map(writer, shards))
+        done.set()
+        for future in readers:
+            future.result()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    checks = args.users * args.rounds
+    print(f"{label:<17} {len(latencies) / wall:>8.1f} {statistics.median(latencies) * 1000:>8.1f} "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.1f} {stale:>5}/{checks:<5} {errors:>6} "
+          f"{counters.get('db.replica_reads'):>9} {counters.get('db.sticky_reads'):>8}")
+
+
+def main():
+    call_command('migrate', verbosity=0)
+    replicate()
+    stop = threading.Event()
+    thread = threading.Thread(target=replicator, args=(stop,), daemon=True)
+    thread.start()
+    print(f"{args.replicas} SQLite replicas refreshed every {args.lag * 1000:.0f}ms, {args.users} writing users x "
+          f"{args.rounds} rounds, {args.concurrency} writer + {args.readers} reader threads")
+    print(f"{'run':<17} {'msg/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'stale reads':>11} {'errors':>6} "
+          f"{'replica':>9} {'sticky':>8}")
+    try:
+        configure([], 0)
+        run('primary only', 1)
+        configure(sorted(REPLICAS), 0)
+        run('replicas', 2)
+        configure(sorted(REPLICAS), args.lag * 4)
+        run('read-your-writes', 3)
+    finally:
+        stop.set()
+        thread.join()
+
+
+if __name__ == '__main__':
+    main()
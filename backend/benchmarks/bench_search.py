@@ -0,0 +1,128 @@
+# benchmarks/bench_search.py
+# Usage: python -m benchmarks.bench_search [--events 200000] [--users 1000] [--heavy 50000] [--queries 500]
+# Seeds --events events over --users users, plus one heavy user with
+# --heavy events, with titles, locations and notes drawn from a synthetic
+# vocabulary. Then runs the same random searches (one or two words, some
+# cut to a prefix) for typical users and for the heavy user, answered by:
+#   icontains   core.search.scan_events, every term against every column
+#   full-text   core.search.fulltext_events, FTS5 on SQLite
+# Reports milliseconds per search, the share of searches with a match, and
+# the share of returned events with a search term in the title (icontains
+# returns the soonest matches, full-text the best ranked).
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--events', type=int, default=200000, help="Events over the typical users")
+parser.add_argument('--users', type=int, default=1000)
+parser.add_argument('--heavy', type=int, default=50000, help="Events of the one heavy user")
+parser.add_argument('--queries', type=int, default=500)
+parser.add_argument('--limit', type=int, default=5)
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'search_bench.sqlite3')
+settings.DEBUG = False
+django.setup()
+
+from django.core.management import call_command
+from django.utils import timezone
+from core import search
+from core.models import Event, EventManagerUser
+
+KINDS = ['Dentist', 'Doctor', 'Gym', 'Yoga', 'Standup', 'Team sync', 'Lunch', 'Dinner', 'Call', 'Review',
+         'Interview', 'Birthday', 'Flight', 'Piano lesson', 'Haircut', 'Football', 'Book club', 'Therapy']
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'to', 'vi', 'be', 'do', 'fa', 'gu', 'ha', 'ji', 'pe', 'zo']
+
+
+def vocabulary(rng, size=4000):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(rng, words, now):
+    users = EventManagerUser.objects.bulk_create(
+        [EventManagerUser(phone_number=f"+1555{i:07d}") for i in range(args.users + 1)])
+    heavy, typical = users[0], users[1:]
+
+    def event(user):
+        return Event(
+            user=user,
+            title=f"{rng.choice(KINDS)} with {rng.choice(words).title()}",
+            scheduled_time=now + timedelta(minutes=rng.randint(-60 * 24 * 365, 60 * 24 * 90)),
+            location=rng.choice(words).title() + ' ' + rng.choice(['Clinic', 'Office', 'Park', 'Hall', 'Cafe'])
+            if rng.random() < 0.6 else None,
+            notes=' '.join(rng.choice(words) for _ in range(rng.randint(0, 25))) or None,
+        )
+
+    started = time.perf_counter()
+    batch = []
+    owners = [heavy] * args.heavy + [rng.choice(typical) for _ in range(args.events)]
+    for user in owners:
+        batch.append(event(user))
+        if len(batch) == 5000:
+            Event.objects.bulk_create(batch)
+            batch = []
+    Event.objects.bulk_create(batch)
+    return heavy, typical, time.perf_counter() - started
+
+
+def queries(rng, words):
+    result = []
+    for _ in range(args.queries):
+        terms = [rng.choice([rng.choice(KINDS).split()[0].lower(), rng.choice(words)])
+                 for _ in range(rng.choice([1, 1, 2]))]
+        # A third of the searches type only the start of the word
+        result.append([term[:max(3, len(term) - 2)] if rng.random() < 0.33 else term for term in terms])
+    return result
+
+
+def measure(label, find, searches, users, rng, now):
+    latencies, found, returned, in_title = [], 0, 0, 0
+    for terms in searches:
+        user = rng.choice(users)
+        started = time.perf_counter()
+        events = find(user, terms, args.limit, now)
+        latencies.append(time.perf_counter() - started)
+        found += bool(events)
+        returned += len(events)
+        in_title += sum(any(term in event.title.lower() for term in terms) for event in events)
+    latencies.sort()
+    print(f"  {label:<11} {statistics.mean(latencies) * 1000:>8.2f} {latencies[int(len(latencies) * 0.95)] * 1000:>8.2f} "
+          f"{found / len(searches):>8.0%} {in_title / max(1, returned):>9.0%}")
+
+
+def main():
+    call_command('migrate', verbosity=0)
+    if not search.fulltext_available('default'):
+        raise SystemExit("This SQLite has no FTS5")
+    rng = random.Random(0)
+    words = vocabulary(rng)
+    now = timezone.now()
+    heavy, typical, seconds = seed(rng, words, now)
+    total = args.events + args.heavy
+    print(f"{total} events seeded in {seconds:.1f}s ({total / seconds:.0f}/s with the FTS5 triggers), "
+          f"{args.queries} searches, top {args.limit}")
+    searches = queries(rng, words)
+    for label, users in ((f"typical user (~{args.events // args.users} events)", typical),
+                         (f"heavy user ({args.heavy} events)", [heavy])):
+        print(f"{label}\n  {'':<11} {'mean ms':>8} {'p95 ms':>8} {'found':>8} {'in title':>9}")
+        measure('icontains', search.scan_events, searches, users, random.Random(1), now)
+        measure('full-text', search.fulltext_events, searches, users, random.Random(1), now)
+
+
+if __name__ == '__main__':
+    main()
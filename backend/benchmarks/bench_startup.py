@@ -0,0 +1,67 @@
+# benchmarks/bench_startup.py
+# Usage: python -m benchmarks.bench_startup [--runs 5] [--max-seconds 1.5]
+# Measures import-to-ready time for backend.wsgi in fresh interpreters:
+# importing the WSGI module and loading the URLconf (which imports every view).
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import time
+start = time.perf_counter()
+import backend.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(time.perf_counter() - start)
+"""
+
+
+def measure(runs):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='backend.settings')
+    # Startup must not depend on credentials being present
+    env.pop('GOOGLE_API_KEY', None)
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def loaded_sdks():
+    """Report whether the heavy SDKs were imported during startup"""
+    probe = PROBE + "import sys; print('google.genai' in sys.modules, 'twilio.rest' in sys.modules)"
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='backend.settings')
+    env.pop('GOOGLE_API_KEY', None)
+    result = subprocess.run([sys.executable, '-c', probe], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="Exit non-zero when the median exceeds this budget")
+    args = parser.parse_args()
+
+    timings = measure(args.runs)
+    median = statistics.median(timings)
+    print(f"backend.wsgi import-to-ready: median {median * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms over {args.runs} runs")
+    print(f"google.genai / twilio.rest imported at startup: {loaded_sdks()}")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"REGRESSION: startup exceeds {args.max_seconds:.2f}s budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,276 @@
+# benchmarks/bench_webhook.py
+# Usage:
+#   python -m benchmarks.bench_webhook [--messages 2000] [--concurrency 8] [--ai-latency 0.05]
+#   python -m benchmarks.bench_webhook --output results.json
+#   python -m benchmarks.bench_webhook --save-baseline benchmarks/baselines/webhook.json
+#   python -m benchmarks.bench_webhook --baseline benchmarks/baselines/webhook.json --fail-on-regression
+#
+# Drives whatsapp_webhook end to end with synthetic Twilio form posts from
+# concurrent virtual users, fully offline: Gemini is replaced by
+# benchmarks.fake_ai (real EventAIService, fake client with injected latency)
+# and the synchronous TwiML reply needs no Twilio. Reports latency
+# percentiles, throughput, DB queries per message and time spent in write
+# statements (on SQLite this is mostly waiting for the write lock), overall
+# and per intent, and compares them against a stored baseline.
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--messages', type=int, default=2000)
+parser.add_argument('--concurrency', type=int, default=8)
+parser.add_argument('--users', type=int, default=200)
+parser.add_argument('--ai-latency', type=float, default=0.05, help="Mean fake Gemini latency, seconds")
+parser.add_argument('--output', help="Write results as JSON to this path ('-' for stdout)")
+parser.add_argument('--baseline', help="Compare against results stored at this path")
+parser.add_argument('--save-baseline', help="Store these results as the new baseline")
+parser.add_argument('--tolerance', type=float, default=0.25,
+                    help="Allowed relative slowdown for timing metrics before flagging a regression")
+parser.add_argument('--fail-on-regression', action='store_true')
+args = parser.parse_args()
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'webhook_bench.sqlite3')
+settings.DEBUG = False
+settings.WEBHOOK_ASYNC_MODE = False
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from core import intent_router
+from core.clients import ai_service_provider
+from benchmarks.fake_ai import fake_ai_service
+
+# One conversation script per virtual user, replayed in a loop; {n} makes
+# each message unique so the parse cache does not hide AI calls
+SCRIPTS = [
+    ["menu", "events", "today"],
+    ["Dentist tomorrow at 3pm", "events"],
+    ["Dinner with friend {n} tonight, don't forget the wine", "today"],
+    ["Zoom call for project kickoff {n} on monday at 10:30 AM, link https://zoom.us/j/{n}"],
+    ["meeting {n}", "tomorrow at 4pm", "events"],
+    ["Team sync {n} every monday at 9am", "cancel"],
+]
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# Metrics compared against the baseline: (path, higher is worse, timing metric)
+COMPARED = [
+    (('latency_ms', 'p50'), True, True),
+    (('latency_ms', 'p95'), True, True),
+    (('latency_ms', 'p99'), True, True),
+    (('throughput_per_s',), False, True),
+    (('db', 'queries_per_message'), True, False),
+    (('db', 'writes_per_message'), True, False),
+    (('db', 'write_wait_ms_per_message'), True, True),
+]
+
+
+class QueryRecorder:
+    """connection.execute_wrapper counting queries and time inside write statements"""
+
+    def __init__(self):
+        self.queries = 0
+        self.writes = 0
+        self.write_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        if not sql.lstrip().upper().startswith(WRITE_PREFIXES):
+            return execute(sql, params, many, context)
+        self.writes += 1
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.write_seconds += time.perf_counter() - started
+
+
+def percentiles(values):
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return {'p50': value, 'p95': value, 'p99': value, 'mean': value}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98], 'mean': statistics.fmean(values)}
+
+
+def run():
+    call_command('migrate', verbosity=0)
+    service = fake_ai_service(latency=args.ai_latency)
+    samples = []
+    samples_lock = threading.Lock()
+    counter = iter(range(args.messages))
+    counter_lock = threading.Lock()
+
+    def next_index():
+        with counter_lock:
+            return next(counter, None)
+
+    def worker(worker_id):
+        client = Client()
+        users = range(worker_id, args.users, args.concurrency)
+        step = 0
+        try:
+            while True:
+                index = next_index()
+                if index is None:
+                    return
+                user = users[step % len(users)]
+                script = SCRIPTS[user % len(SCRIPTS)]
+                body = script[(step // len(users)) % len(script)].format(n=index)
+                step += 1
+
+                recorder = QueryRecorder()
+                started = time.perf_counter()
+                with connection.execute_wrapper(recorder):
+                    response = client.post('/webhook/whatsapp/', {
+                        'From': f"whatsapp:+1555{user:07d}",
+                        'To': 'whatsapp:+14155238886',
+                        'Body': body,
+                        'MessageSid': f"SM{index:032d}",
+                    }, secure=True)
+                elapsed = time.perf_counter() - started
+                with samples_lock:
+                    samples.append({
+                        'intent': intent_router.classify(body),
+                        'seconds': elapsed,
+                        'queries': recorder.queries,
+                        'writes': recorder.writes,
+                        'write_seconds': recorder.write_seconds,
+                        'ok': response.status_code == 200 and b'Sorry, I encountered an error' not in response.content,
+                    })
+        finally:
+            connection.close()
+
+    with ai_service_provider.override(service), open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(worker, range(args.concurrency)))
+        wall = time.perf_counter() - started
+
+    return summarize(samples, wall, service.client.models.calls)
+
+
+def summarize(samples, wall, llm_calls):
+    def block(rows):
+        return {
+            'messages': len(rows),
+            'latency_ms': {k: v * 1000 for k, v in percentiles([row['seconds'] for row in rows]).items()},
+            'queries_per_message': statistics.fmean(row['queries'] for row in rows),
+            'writes_per_message': statistics.fmean(row['writes'] for row in rows),
+            'write_wait_ms_per_message': statistics.fmean(row['write_seconds'] for row in rows) * 1000,
+        }
+
+    overall = block(samples)
+    by_intent = defaultdict(list)
+    for row in samples:
+        by_intent[row['intent']].append(row)
+    return {
+        'config': {
+            'messages': args.messages, 'concurrency': args.concurrency, 'users': args.users,
+            'ai_latency_s': args.ai_latency, 'database': connection.vendor,
+        },
+        'messages': len(samples),
+        'errors': sum(not row['ok'] for row in samples),
+        'wall_seconds': wall,
+        'throughput_per_s': len(samples) / wall,
+        'llm_calls': llm_calls,
+        'latency_ms': overall['latency_ms'],
+        'db': {
+            'queries_per_message': overall['queries_per_message'],
+            'writes_per_message': overall['writes_per_message'],
+            'write_wait_ms_per_message': overall['write_wait_ms_per_message'],
+            'write_wait_ms_p99': percentiles([row['write_seconds'] * 1000 for row in samples])['p99'],
+        },
+        'by_intent': {intent: block(rows) for intent, rows in sorted(by_intent.items())},
+    }
+
+
+def lookup(results, path):
+    for key in path:
+        results = results[key]
+    return results
+
+
+def compare(results, baseline):
+    """List of (metric, baseline, current, change, regressed)"""
+    rows = []
+    for path, higher_is_worse, timing in COMPARED:
+        try:
+            before, after = lookup(baseline, path), lookup(results, path)
+        except KeyError:
+            continue
+        change = (after - before) / before if before else 0.0
+        worse = change if higher_is_worse else -change
+        # Query counts only move with cache interleaving: a few percent is a real change
+        allowed = args.tolerance if timing else 0.05
+        rows.append(('.'.join(path), before, after, change, worse > allowed))
+    return rows
+
+
+def report(results):
+    latency = results['latency_ms']
+    print(f"{results['messages']:,} messages, concurrency {args.concurrency}, fake AI {args.ai_latency * 1000:.0f}ms, "
+          f"{results['errors']} errors, {results['llm_calls']} LLM calls")
+    print(f"throughput {results['throughput_per_s']:.1f} msg/s  latency p50 {latency['p50']:.1f}ms  "
+          f"p95 {latency['p95']:.1f}ms  p99 {latency['p99']:.1f}ms")
+    db = results['db']
+    print(f"db: {db['queries_per_message']:.2f} queries/msg, {db['writes_per_message']:.2f} writes/msg, "
+          f"write wait {db['write_wait_ms_per_message']:.2f}ms/msg (p99 {db['write_wait_ms_p99']:.1f}ms)")
+    print(f"{'intent':<10} {'msgs':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'writes':>7}")
+    for intent, row in results['by_intent'].items():
+        print(f"{intent:<10} {row['messages']:>6} {row['latency_ms']['p50']:>8.1f} {row['latency_ms']['p95']:>8.1f} "
+              f"{row['latency_ms']['p99']:>8.1f} {row['queries_per_message']:>8.2f} {row['writes_per_message']:>7.2f}")
+
+
+def main():
+    results = run()
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        report(results)
+        if args.output:
+            with open(args.output, 'w') as out:
+                json.dump(results, out, indent=2)
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {args.baseline} (tolerance {args.tolerance:.0%}):", file=sys.stderr)
+        if baseline.get('config') != results['config']:
+            print(f"  warning: baseline ran with {baseline.get('config')}", file=sys.stderr)
+        for metric, before, after, change, bad in compare(results, baseline):
+            regressed |= bad
+            print(f"  {metric:<32} {before:>10.2f} -> {after:>10.2f}  {change:+7.1%}  {'REGRESSION' if bad else 'ok'}",
+                  file=sys.stderr)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or '.', exist_ok=True)
+        with open(args.save_baseline, 'w') as out:
+            json.dump(results, out, indent=2)
+            out.write('\n')
+
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
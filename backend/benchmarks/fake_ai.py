@@ -0,0 +1,128 @@
+# benchmarks/fake_ai.py
+# An offline stand-in for the Gemini client behind EventAIService. The real
+# service code (prompt building, JSON cleanup, datetime parsing, parse cache)
+# still runs; only generate_content is replaced by a latency-injecting fake
+# that answers from the local fast-path parser, one event per comma,
+# semicolon or line separated part of a pasted schedule. It can also inject
+# a slow tail (`slow_rate` of calls take `slow_factor` times longer) and
+# errors (`error_rate`, or every call while `outage` is set). Without a response
+# schema it answers like the legacy prompt does, in a ```json fence and now
+# and then (`chatter_rate`) with a sentence in front that breaks json.loads.
+# Token counts in usage_metadata are estimates (4 characters per token).
+# client.aio.models.generate_content is the same fake as a coroutine, for
+# the async webhook path.
+# Usage:
+#
+#     with ai_service_provider.override(fake_ai_service(latency=0.8)):
+#         ...
+import asyncio
+import json
+import os
+import re
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from core.fast_parser import fast_parser
+
+MESSAGE_RE = re.compile(r'(?:User message|Message):\s*(.*)\Z', re.S)
+SEPARATOR_RE = re.compile(r'[,;\n]')
+
+
+class FakeGeminiError(Exception):
+    pass
+
+
+class FakeModels:
+    def __init__(self, latency: float, jitter: float, seed: int = 0, error_rate: float = 0.0,
+                 slow_rate: float = 0.0, slow_factor: float = 10.0, chatter_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.chatter_rate = chatter_rate
+        self.outage = False
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def generate_content(self, model, contents, config=None):
+        delay, fail, chatter = self._draw()
+        time.sleep(delay)
+        return self._respond(contents, config, fail, chatter)
+
+    async def agenerate_content(self, model, contents, config=None):
+        delay, fail, chatter = self._draw()
+        await asyncio.sleep(delay)
+        return self._respond(contents, config, fail, chatter)
+
+    def _draw(self):
+        """(delay, fail, chatter) for the next call"""
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._random.gauss(self.latency, self.latency * self.jitter))
+            if self._random.random() < self.slow_rate:
+                delay *= self.slow_factor
+            fail = self.outage or self._random.random() < self.error_rate
+            chatter = self._random.random() < self.chatter_rate
+        return delay, fail, chatter
+
+    def _respond(self, contents, config, fail, chatter):
+        if fail:
+            raise FakeGeminiError("503 UNAVAILABLE")
+        match = MESSAGE_RE.search(contents)
+        message = match.group(1).strip() if match else contents
+        if getattr(config, 'response_schema', None) is None:
+            text = f"```json\n{json.dumps(self.answer(message))}\n```"
+            if chatter:
+                text = f"Sure! Here is the event I found:\n{text}"
+        else:
+            text = json.dumps({'events': self.answer_all(message)})
+        prompt = (getattr(config, 'system_instruction', None) or '') + contents
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4,
+                                thoughts_token_count=0)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    @classmethod
+    def answer_all(cls, message: str) -> list:
+        """One answer per comma/semicolon/line separated part when several parts carry a date or time"""
+        parts = [part.strip() for part in SEPARATOR_RE.split(message) if part.strip()]
+        if len(parts) > 1 and sum(fast_parser.parse(part) is not None for part in parts) > 1:
+            return [cls.answer(part) for part in parts]
+        return [cls.answer(message)]
+
+    @staticmethod
+    def answer(message: str) -> dict:
+        parsed = fast_parser.parse(message)
+        if parsed is None or len(message.split()) < 2:
+            return {
+                "title": message or None, "datetime": None, "location": None, "notes": None,
+                "recurrence": None, "confidence": 0.3, "needs_clarification": True,
+                "clarification_question": "When is it?",
+            }
+        when = parsed['datetime']
+        return {
+            "title": parsed['title'],
+            "datetime": when.strftime('%Y-%m-%d %H:%M:%S') if when else None,
+            "location": parsed.get('location'),
+            "notes": parsed.get('notes'),
+            "recurrence": parsed.get('recurrence'),
+            "confidence": 0.9 if when else 0.4,
+            "needs_clarification": when is None,
+            "clarification_question": None if when else "What time?",
+        }
+
+
+def fake_ai_service(latency: float = 0.8, jitter: float = 0.25, seed: int = 0, **faults):
+    """A real EventAIService whose Gemini client is replaced by FakeModels"""
+    os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+    from core.ai_service import EventAIService
+    service = EventAIService()
+    models = FakeModels(latency, jitter, seed, **faults)
+    service.client = SimpleNamespace(
+        models=models,
+        aio=SimpleNamespace(models=SimpleNamespace(generate_content=models.agenerate_content)),
+    )
+    return service
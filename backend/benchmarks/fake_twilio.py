@@ -0,0 +1,159 @@
+# benchmarks/fake_twilio.py
+# A local stand-in for api.twilio.com so outbound paths can be load tested
+# without sending real messages. It can answer a share of requests with 503
+# (`error_rate`), enforce a per-sender-number rate limit with 429s like
+# Twilio does (`rate_limit` messages per second per From), and counts the
+# TCP connections clients open. Usage from a benchmark:
+#
+#     with FakeTwilioServer() as server:
+#         with twilio_client_provider.override(server.client()):
+#             ...
+#
+# server.async_client() returns an aiohttp-based client for the same server;
+# build it inside the event loop that uses it.
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from twilio.http.async_http_client import AsyncTwilioHttpClient
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+from core.clients import size_connection_pool
+from core.outbound import SenderBuckets
+
+TWILIO_API = 'https://api.twilio.com'
+ACCOUNT_SID = 'AC' + '0' * 32
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # One handler per TCP connection, however many requests it carries
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        server = self.server
+        sender = form.get('From', [''])[0]
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+            failed = server.random.random() < server.error_rate
+        if server.buckets and server.buckets.get(sender).reserve():
+            with server.lock:
+                server.throttled += 1
+            return self._reply(429, {'code': 20429, 'message': 'Too Many Requests', 'status': 429})
+        if failed:
+            return self._reply(503, {'code': 20503, 'message': 'Service Unavailable', 'status': 503})
+        with server.lock:
+            server.received += 1
+        self._reply(201, {
+            'sid': 'SM' + uuid.uuid4().hex,
+            'to': form.get('To', [''])[0],
+            'from': sender,
+            'body': form.get('Body', [''])[0],
+            'status': 'queued',
+        })
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _LocalHttpClient(TwilioHttpClient):
+    """Twilio's HTTP client with api.twilio.com rewritten to the fake server"""
+
+    def __init__(self, base_url, pool_connections=True):
+        super().__init__(pool_connections=pool_connections)
+        self.base_url = base_url
+
+    def request(self, method, url, *args, **kwargs):
+        return super().request(method, url.replace(TWILIO_API, self.base_url), *args, **kwargs)
+
+
+class _LocalAsyncHttpClient(AsyncTwilioHttpClient):
+    def __init__(self, base_url):
+        super().__init__(pool_connections=False)
+        self.base_url = base_url
+
+    async def request(self, method, url, *args, **kwargs):
+        return await super().request(method, url.replace(TWILIO_API, self.base_url), *args, **kwargs)
+
+
+class FakeTwilioServer:
+    """Accepts Messages.create calls on localhost and answers 201 with a SID"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, rate_limit: float = None, seed: int = 0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 128
+        self.httpd.latency = latency
+        self.httpd.error_rate = error_rate
+        self.httpd.buckets = SenderBuckets(rate_limit) if rate_limit else None
+        self.httpd.random = random.Random(seed)
+        self.httpd.received = 0
+        self.httpd.requests = 0
+        self.httpd.throttled = 0
+        self.httpd.connections = 0
+        self.httpd.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def received(self):
+        """Messages accepted (201)"""
+        return self.httpd.received
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def throttled(self):
+        return self.httpd.throttled
+
+    @property
+    def connections(self):
+        return self.httpd.connections
+
+    def client(self, pool_size: int = None, pooled: bool = True):
+        """Sync client; pooled=False opens a new connection per request"""
+        http_client = _LocalHttpClient(self.url, pool_connections=pooled)
+        if pooled and pool_size:
+            size_connection_pool(http_client, pool_size)
+        return Client(ACCOUNT_SID, 'token', http_client=http_client)
+
+    def async_client(self, pool_size: int = 32):
+        from aiohttp import ClientSession, TCPConnector
+        http_client = _LocalAsyncHttpClient(self.url)
+        http_client.session = ClientSession(connector=TCPConnector(limit=pool_size))
+        return Client(ACCOUNT_SID, 'token', http_client=http_client)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
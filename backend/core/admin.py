@@ -1,9 +1,9 @@
 from django.contrib import admin
-from .models import EventManagerUser, Event
+from .models import CatalogEvent, EventManagerUser, Event
 
 @admin.register(EventManagerUser)
 class EventManagerUserAdmin(admin.ModelAdmin):
-    list_display = ['phone_number', 'name', 'created_at']
+    list_display = ['phone_number', 'name', 'timezone', 'created_at']
     search_fields = ['phone_number', 'name']
 
 @admin.register(Event)
@@ -11,4 +11,11 @@ class EventAdmin(admin.ModelAdmin):
     list_display = ['title', 'user', 'scheduled_time', 'location', 'is_recurring']
     list_filter = ['scheduled_time', 'is_recurring']
     search_fields = ['title', 'location']
-    date_hierarchy = 'scheduled_time'
\ No newline at end of file
+    date_hierarchy = 'scheduled_time'
+
+@admin.register(CatalogEvent)
+class CatalogEventAdmin(admin.ModelAdmin):
+    list_display = ['title', 'source', 'starts_at', 'venue', 'category']
+    list_filter = ['source', 'category']
+    search_fields = ['title', 'venue']
+    readonly_fields = ['geohash', 'starts_on']
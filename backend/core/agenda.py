@@ -0,0 +1,137 @@
+# core/agenda.py
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import islice
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.utils import timezone
+from .models import Event, EventOccurrence
+from .occurrences import ensure_materialized, hot_horizon, occurrence_window
+from .recurrence import iter_occurrences
+
+# Agenda windows are half-open [start, end) datetime ranges computed in the
+# user's timezone, so queries hit the (user, scheduled_time) index directly
+# instead of wrapping the column in a date function.
+
+# One entry of an agenda: a one-off event, or one occurrence of a series
+Occurrence = namedtuple('Occurrence', ['start', 'event'])
+
+
+def user_timezone(user):
+    """The user's zone, falling back to the active Django timezone"""
+    try:
+        return ZoneInfo(user.timezone) if getattr(user, 'timezone', None) else timezone.get_current_timezone()
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.get_current_timezone()
+
+
+def local_now(user, now=None):
+    return timezone.localtime(now or timezone.now(), user_timezone(user))
+
+
+def _local_midnight(day, tz):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()), tz)
+
+
+def day_window(user, offset: int = 0, now=None):
+    """[start, end) of the user's local day, offset days from today"""
+    tz = user_timezone(user)
+    day = local_now(user, now).date() + timedelta(days=offset)
+    return _local_midnight(day, tz), _local_midnight(day + timedelta(days=1), tz)
+
+
+def week_window(user, now=None):
+    """From the start of today until the end of the user's local Sunday"""
+    tz = user_timezone(user)
+    today = local_now(user, now).date()
+    return _local_midnight(today, tz), _local_midnight(today + timedelta(days=7 - today.weekday()), tz)
+
+
+def next_days_window(user, days: int, now=None):
+    """From now until the end of the user's local day, days ahead"""
+    now = local_now(user, now)
+    return now, _local_midnight(now.date() + timedelta(days=days + 1), user_timezone(user))
+
+
+def window_for(user, view: str, days: int = 7, now=None):
+    """Resolve 'today' / 'tomorrow' / 'week' / 'next_days' to a [start, end) range"""
+    if view == 'today':
+        return day_window(user, 0, now)
+    if view == 'tomorrow':
+        return day_window(user, 1, now)
+    if view == 'week':
+        return week_window(user, now)
+    if view == 'next_days':
+        return next_days_window(user, days, now)
+    raise ValueError(f"Unknown agenda view: {view}")
+
+
+def events_between(user, start, end):
+    """Events in [start, end), ordered by time"""
+    return Event.objects.filter(
+        user=user,
+        scheduled_time__gte=start,
+        scheduled_time__lt=end,
+    ).order_by('scheduled_time')
+
+
+def upcoming_events(user, limit: int = 10, now=None):
+    return Event.objects.filter(
+        user=user,
+        scheduled_time__gte=now or timezone.now(),
+    ).order_by('scheduled_time')[:limit]
+
+
+def occurrences_between(user, start, end, now=None):
+    """One-off events and recurring occurrences in [start, end), merged by time
+
+    Inside the hot window occurrences come from the materialized table;
+    outside it each series is expanded lazily, so no series is ever
+    loaded into memory as a whole.
+    """
+    one_offs = (
+        Occurrence(event.scheduled_time, event)
+        for event in events_between(user, start, end).filter(is_recurring=False).iterator()
+    )
+
+    if start >= occurrence_window(now)[0] and ensure_materialized(user, end, now):
+        recurring = (
+            Occurrence(row.starts_at, row.event)
+            for row in EventOccurrence.objects.filter(
+                user=user, starts_at__gte=start, starts_at__lt=end,
+            ).select_related('event').order_by('starts_at').iterator()
+        )
+    else:
+        tz = user_timezone(user)
+        series = Event.objects.filter(user=user, is_recurring=True, scheduled_time__lt=end)
+        recurring = heapq.merge(
+            *(_series_occurrences(event, start, end, tz) for event in series.iterator()),
+            key=lambda occurrence: occurrence.start,
+        )
+
+    return heapq.merge(one_offs, recurring, key=lambda occurrence: occurrence.start)
+
+
+def _series_occurrences(event, start, end, tz):
+    for starts_at in iter_occurrences(event, start, end, tz):
+        yield Occurrence(starts_at, event)
+
+
+def upcoming_occurrences(user, limit: int = 10, now=None):
+    """The next `limit` entries from now; recurring ones within the hot window"""
+    now = now or timezone.now()
+    one_offs = [
+        Occurrence(event.scheduled_time, event)
+        for event in Event.objects.filter(
+            user=user, is_recurring=False, scheduled_time__gte=now,
+        ).order_by('scheduled_time')[:limit]
+    ]
+    horizon = hot_horizon(now)
+    ensure_materialized(user, horizon, now)
+    recurring = [
+        Occurrence(row.starts_at, row.event)
+        for row in EventOccurrence.objects.filter(
+            user=user, starts_at__gte=now, starts_at__lt=horizon,
+        ).select_related('event').order_by('starts_at')[:limit]
+    ]
+    return list(islice(heapq.merge(one_offs, recurring, key=lambda occurrence: occurrence.start), limit))
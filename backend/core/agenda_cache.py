@@ -0,0 +1,132 @@
+# core/agenda_cache.py
+import threading
+import time
+from django.conf import settings
+from django.utils import timezone
+from .agenda import day_window, local_now
+from .cache_backends import DjangoCacheBackend, LocalLRUBackend
+from .metrics import counters, histograms, ratio
+
+# Rendered "events" / "today" replies, one entry per (user, view). Entries
+# are dropped by core.signals whenever one of the user's events is saved or
+# deleted, and carry the user's local date so they never outlive the day
+# they were rendered for. With several processes, use the 'django' backend
+# on a shared cache: the local one only sees this process's invalidations
+# (AGENDA_CACHE_TTL bounds how stale another process's entry can get).
+# Each user also has a version, bumped by every invalidation: a render that
+# started before an invalidation carries the old version and is neither
+# stored nor served.
+
+VIEWS = ('upcoming', 'today')
+# Cache hits take microseconds, so the latency buckets start far below the defaults
+LATENCY_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+class AgendaCache:
+    """Memoizes rendered agenda text per user and view for the user's local day"""
+
+    def __init__(self, backend, ttl: float = 300):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(user_id, view: str) -> str:
+        return f"agenda:{user_id}:{view}"
+
+    @staticmethod
+    def version_key(user_id) -> str:
+        return f"agenda:{user_id}:version"
+
+    def get_or_render(self, user, view: str, render, now=None):
+        """Cached text for `view`, or render(user) -> (text, valid_until) and store it
+
+        `valid_until` lets a view expire earlier than midnight, e.g. when its
+        first listed event starts; None means the end of the local day.
+        """
+        started = time.perf_counter()
+        now = now or timezone.now()
+        today = local_now(user, now).date().isoformat()
+        key, version_key = self.make_key(user.pk, view), self.version_key(user.pk)
+
+        cached = self.backend.get_many([key, version_key])
+        entry, version = cached.get(key), cached.get(version_key, 0)
+        if entry is not None and entry[0] == today and entry[1] > now.timestamp() and entry[3] == version:
+            counters.incr('agenda_cache.hits')
+            text = entry[2]
+        else:
+            counters.incr('agenda_cache.misses')
+            text, valid_until = render(user)
+            midnight = day_window(user, 0, now)[1]
+            expires = min(midnight, valid_until) if valid_until else midnight
+            timeout = min(self.ttl, (expires - now).total_seconds())
+            if self.backend.get(version_key) != cached.get(version_key):
+                # Invalidated while rendering: the text may predate the change
+                counters.incr('agenda_cache.stale_renders')
+            elif timeout > 0:
+                self.backend.set(key, (today, expires.timestamp(), text, version), timeout)
+
+        histograms.get(f"agenda.{view}.seconds", LATENCY_BOUNDS).observe(time.perf_counter() - started)
+        return text
+
+    def invalidate(self, user_id):
+        version_key = self.version_key(user_id)
+        # Kept past the entries' TTL; the entries are dropped too, so a version is never reused
+        self.backend.set(version_key, (self.backend.get(version_key) or 0) + 1, self.ttl * 2)
+        for view in VIEWS:
+            self.backend.delete(self.make_key(user_id, view))
+        counters.incr('agenda_cache.invalidations')
+
+
+class _NoCache:
+    """AGENDA_CACHE_BACKEND = 'none': always render"""
+
+    def get(self, key):
+        return None
+
+    def get_many(self, keys):
+        return {}
+
+    def set(self, key, value, timeout):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+def build_agenda_cache():
+    backend = getattr(settings, 'AGENDA_CACHE_BACKEND', 'local')
+    ttl = getattr(settings, 'AGENDA_CACHE_TTL', 300)
+    if backend == 'local':
+        return AgendaCache(LocalLRUBackend(getattr(settings, 'AGENDA_CACHE_MAX_ENTRIES', 10000)), ttl)
+    if backend == 'django':
+        return AgendaCache(DjangoCacheBackend(getattr(settings, 'AGENDA_CACHE_ALIAS', 'default')), ttl)
+    if backend == 'none':
+        return AgendaCache(_NoCache(), ttl)
+    raise ValueError(f"Unknown AGENDA_CACHE_BACKEND: {backend}")
+
+
+_agenda_cache = None
+_lock = threading.Lock()
+
+
+def get_agenda_cache():
+    """Return the process-wide agenda cache"""
+    global _agenda_cache
+    if _agenda_cache is None:
+        with _lock:
+            if _agenda_cache is None:
+                _agenda_cache = build_agenda_cache()
+    return _agenda_cache
+
+
+def stats() -> dict:
+    hits = counters.get('agenda_cache.hits')
+    misses = counters.get('agenda_cache.misses')
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': ratio(hits, hits + misses),
+        'invalidations': counters.get('agenda_cache.invalidations'),
+        'stale_renders': counters.get('agenda_cache.stale_renders'),
+        'latency': {view: histograms.get(f"agenda.{view}.seconds", LATENCY_BOUNDS).snapshot() for view in VIEWS},
+    }
@@ -0,0 +1,102 @@
+# core/ai_cache.py
+import copy
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.utils import timezone
+from .cache_backends import LocalLRUBackend, DjangoCacheBackend
+from .metrics import counters, ratio
+
+
+class ParseCache:
+    """Memoizes parse_events results per normalized message and day"""
+
+    def __init__(self, backend, ttl: int = 86400):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        return ' '.join(message.lower().split()).strip(' .!?')
+
+    def make_key(self, message: str, today_date: str, tz_name: str = None) -> str:
+        # The LLM resolves "tomorrow at 3pm" against today_date in the sender's
+        # timezone, so both are part of the key
+        tz_name = tz_name or timezone.get_current_timezone_name()
+        digest = hashlib.sha1(self.normalize(message).encode('utf-8')).hexdigest()
+        return f"parse:{tz_name}:{today_date}:{digest}"
+
+    def get(self, message: str, now=None):
+        now = timezone.localtime(now or timezone.now())
+        payload = self.backend.get(self.make_key(message, now.strftime("%Y-%m-%d")))
+        if payload is None:
+            counters.incr('parse_cache.misses')
+            return None
+        counters.incr('parse_cache.hits')
+        return self._thaw(payload)
+
+    def set(self, message: str, events: list, now=None):
+        now = timezone.localtime(now or timezone.now())
+        # Expire at day rollover: tomorrow "tomorrow" means something else
+        midnight = timezone.make_aware(
+            datetime.combine(now.date() + timedelta(days=1), datetime.min.time()),
+            timezone.get_current_timezone(),
+        )
+        timeout = min(self.ttl, (midnight - now).total_seconds())
+        if timeout <= 0:
+            return
+        self.backend.set(self.make_key(message, now.strftime("%Y-%m-%d")), self._freeze(events), timeout)
+
+    @staticmethod
+    def _freeze(events: list) -> list:
+        frozen = copy.deepcopy(events)
+        for event_data in frozen:
+            if isinstance(event_data.get('datetime'), datetime):
+                event_data['datetime'] = event_data['datetime'].isoformat()
+        return frozen
+
+    @staticmethod
+    def _thaw(payload) -> list:
+        # Never hand out the cached dicts themselves; callers mutate results
+        events = copy.deepcopy(payload)
+        if isinstance(events, dict):
+            # Written by a process still caching single events
+            events = [events]
+        for event_data in events:
+            if event_data.get('datetime'):
+                event_data['datetime'] = timezone.localtime(datetime.fromisoformat(event_data['datetime']))
+        return events
+
+
+def build_parse_cache():
+    """Build the cache selected by PARSE_CACHE_BACKEND, or None when disabled"""
+    backend = getattr(settings, 'PARSE_CACHE_BACKEND', 'local')
+    ttl = getattr(settings, 'PARSE_CACHE_TTL', 86400)
+    if backend == 'none':
+        return None
+    if backend == 'local':
+        return ParseCache(LocalLRUBackend(getattr(settings, 'PARSE_CACHE_MAX_ENTRIES', 1024)), ttl)
+    if backend == 'django':
+        return ParseCache(DjangoCacheBackend(getattr(settings, 'PARSE_CACHE_ALIAS', 'default')), ttl)
+    raise ValueError(f"Unknown PARSE_CACHE_BACKEND: {backend}")
+
+
+_parse_cache = None
+_lock = threading.Lock()
+
+
+def get_parse_cache():
+    """Return the process-wide parse cache (None when disabled)"""
+    global _parse_cache
+    if _parse_cache is None:
+        with _lock:
+            if _parse_cache is None:
+                _parse_cache = build_parse_cache() or False
+    return _parse_cache or None
+
+
+def stats() -> dict:
+    hits = counters.get('parse_cache.hits')
+    misses = counters.get('parse_cache.misses')
+    return {'hits': hits, 'misses': misses, 'hit_rate': ratio(hits, hits + misses)}
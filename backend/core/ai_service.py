@@ -1,23 +1,89 @@
 # core/ai_service.py
-from google import genai
 import os
 import json
 import re
 from datetime import datetime
+from django.conf import settings
 from django.utils import timezone
 import logging
+from .metrics import counters, span
+from .ai_cache import get_parse_cache
+from .fast_parser import fast_parser
+from .llm_client import LLMUnavailable, get_llm_client
 
 logger = logging.getLogger(__name__)
 
+CODE_FENCE_RE = re.compile(r'```(?:json)?\s*')
+
+MODEL = 'gemini-2.5-flash'
+
+# LLM_PROMPT_MODE = 'structured': this instruction is sent unchanged as the
+# system instruction and the reply is constrained by EVENTS_SCHEMA, so only
+# the current time and the message vary between calls. The reply lists
+# every event found, so a pasted schedule takes one call.
+STRUCTURED_INSTRUCTION = (
+    "Extract every calendar event from the user's message, one item per event; "
+    "a repeating event is one item with a recurrence. "
+    "datetime: YYYY-MM-DD HH:MM:SS in the user's local time, resolved against 'Now'; "
+    "midday if no time is given, the soonest matching date if no date is given, null if there is no date or time. "
+    "duration_minutes: the length if stated or implied by an end time. "
+    "location: the full meeting URL if there is one, else the place. "
+    "notes: meeting ID, passcode or other details. "
+    "recurrence: an RRULE such as FREQ=WEEKLY;BYDAY=MO,WE for repeating events. "
+    "confidence: 0 to 1. Set needs_clarification and ask one short clarification_question when unsure. "
+    "Use null for anything not stated."
+)
+
+EVENT_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'title': {'type': 'STRING', 'nullable': True},
+        'datetime': {'type': 'STRING', 'nullable': True},
+        'duration_minutes': {'type': 'INTEGER', 'nullable': True},
+        'location': {'type': 'STRING', 'nullable': True},
+        'notes': {'type': 'STRING', 'nullable': True},
+        'recurrence': {'type': 'STRING', 'nullable': True},
+        'confidence': {'type': 'NUMBER'},
+        'needs_clarification': {'type': 'BOOLEAN'},
+        'clarification_question': {'type': 'STRING', 'nullable': True},
+    },
+    'required': ['title', 'datetime', 'confidence', 'needs_clarification'],
+    'property_ordering': ['title', 'datetime', 'duration_minutes', 'location', 'notes', 'recurrence', 'confidence',
+                          'needs_clarification', 'clarification_question'],
+}
+
+EVENTS_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'events': {'type': 'ARRAY', 'items': EVENT_SCHEMA}},
+    'required': ['events'],
+}
+
 class EventAIService:
     def __init__(self):
         api_key = os.getenv('GOOGLE_API_KEY')
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable is required")
 
-        self.client = genai.Client(api_key=api_key)
+        # Imported here: google.genai is slow to import and only needed once parsing
+        from google import genai
+        # The HTTP timeout frees abandoned calls; the guard's deadline is what callers wait for
+        timeout_ms = int(getattr(settings, 'LLM_TIMEOUT', 10.0) * 2000)
+        self.client = genai.Client(api_key=api_key, http_options=genai.types.HttpOptions(timeout=timeout_ms))
+        self.guard = get_llm_client()
         
-        # System prompt for event parsing - UPDATED FOR LINK EXTRACTION AND NOTES
+        self.prompt_mode = getattr(settings, 'LLM_PROMPT_MODE', 'structured')
+        if self.prompt_mode not in ('structured', 'legacy'):
+            raise ValueError(f"Unknown LLM_PROMPT_MODE: {self.prompt_mode}")
+        # Built once: nothing in it changes between calls. Extraction needs no thinking tokens.
+        self.structured_config = genai.types.GenerateContentConfig(
+            system_instruction=STRUCTURED_INSTRUCTION,
+            response_mime_type='application/json',
+            response_schema=genai.types.Schema.model_validate(EVENTS_SCHEMA),
+            temperature=0,
+            thinking_config=genai.types.ThinkingConfig(thinking_budget=0),
+        )
+        
+        # LLM_PROMPT_MODE = 'legacy': formatted per call and sent inline with the message
         self.system_instruction = """
         You are an expert event parser specializing in meeting schedules. Extract event details from the user's message and return ONLY valid JSON.
         
@@ -29,6 +95,7 @@ class EventAIService:
             "datetime": "YYYY-MM-DD HH:MM:SS or null if not specified",
             "location": "Location (e.g., meeting link, physical address) or null",
             "notes": "Any extra details like meeting ID, password, or general instructions. Or null.",
+            "recurrence": "RRULE such as FREQ=WEEKLY;BYDAY=MO,WE or FREQ=DAILY;COUNT=5 for repeating events, or null",
             "confidence": 0.8,
             "needs_clarification": false,
             "clarification_question": "What needs clarification or null"
@@ -44,9 +111,60 @@ class EventAIService:
     
     def parse_event_message(self, message: str) -> dict:
         """Parse natural language message into structured event data"""
+        return self.parse_events(message)[0]
+    
+    def parse_events(self, message: str) -> list:
+        """Parse a message into one or more events with a single AI call
+
+        Never empty: a message with nothing to schedule yields one entry that
+        asks for clarification. The legacy prompt always yields one event.
+        """
+        # Resends and Twilio retries hit the cache instead of Gemini
+        cached = self._cached_events(message)
+        if cached is not None:
+            return cached
         
+        # Get current date/time for context (in the active, i.e. user's, timezone)
+        now = timezone.localtime()
+        contents, config = self._build_request(message, now)
+        try:
+            counters.incr('llm.calls')
+            with span('llm_call'):
+                response = self.guard.call(
+                    self.client.models.generate_content,
+                    model=MODEL,
+                    contents=contents,
+                    config=config
+                )
+        except Exception as e:
+            return self._failed_call(message, e)
+        return self._events_from_response(message, response, config, now)
+    
+    async def aparse_events(self, message: str) -> list:
+        """parse_events for async views, awaiting Gemini on the event loop"""
+        cached = self._cached_events(message)
+        if cached is not None:
+            return cached
+        
+        now = timezone.localtime()
+        contents, config = self._build_request(message, now)
+        try:
+            counters.incr('llm.calls')
+            with span('llm_call'):
+                response = await self.guard.acall(
+                    self.client.aio.models.generate_content,
+                    model=MODEL,
+                    contents=contents,
+                    config=config
+                )
+        except Exception as e:
+            return self._failed_call(message, e)
+        return self._events_from_response(message, response, config, now)
+    
+    @staticmethod
+    def _default_error_response() -> dict:
         # Default error response - UPDATED with 'notes' field
-        default_error_response = {
+        return {
             "title": None,
             "datetime": None,
             "location": None,
@@ -55,29 +173,28 @@ class EventAIService:
             "needs_clarification": True,
             "clarification_question": "I'm having trouble understanding. Could you be more specific?"
         }
-        
+    
+    @staticmethod
+    def _cached_events(message: str):
+        parse_cache = get_parse_cache()
+        return parse_cache.get(message) if parse_cache else None
+    
+    def _failed_call(self, message: str, error: Exception) -> list:
+        """Answer for a call that did not return a response"""
+        if isinstance(error, LLMUnavailable):
+            logger.warning("Gemini unavailable (%s), answering locally", error.reason)
+            return [self._degraded_response(message, self._default_error_response())]
+        logger.error(f"AI service error: {error}")
+        return [self._default_error_response()]
+    
+    def _events_from_response(self, message: str, response, config, now) -> list:
+        """Events from a generate_content response, cached for `message`"""
+        default_error_response = self._default_error_response()
         try:
-            # Get current date/time for context
-            now = timezone.now()
-            current_date = now.strftime("%Y-%m-%d")
-            current_time = now.strftime("%H:%M:%S")
-            
-            # Format system instruction with current context
-            system_prompt = self.system_instruction.format(
-                today_date=current_date,
-                current_time=current_time
-            )
-
-            # Create full prompt
-            full_prompt = f"{system_prompt}\n\nUser message: {message}"
-
-            # Generate content using the correct API
-            response = self.client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=full_prompt
-            )
+            self._record_usage(response)
             
-            print(f"Response object: {response}")
+            # Debug output is lazy: nothing is formatted unless DEBUG is enabled
+            logger.debug("Response object: %s", response)
             
             # Extract text from response
             response_text = ""
@@ -94,43 +211,73 @@ class EventAIService:
             # Fallback
             if not response_text or not response_text.strip():
                 logger.error("Empty response from AI")
-                print("❌ Empty response from AI")
-                return default_error_response
+                return [default_error_response]
 
-            print(f"🤖 AI Raw Response: {response_text}")
+            logger.debug("AI raw response: %s", response_text)
 
-            # Clean the response - remove markdown code blocks if present
-            response_text = re.sub(r'```json\s*|\s*```', '', response_text).strip()
-            
-            # Also remove any markdown formatting
-            response_text = re.sub(r'```\s*', '', response_text).strip()
-
-            print(f"Cleaned response text: '{response_text}'")
-            
-            # Parse JSON response
-            event_data = json.loads(response_text)
-            
-            # Convert datetime string to timezone-aware datetime object
-            if event_data.get('datetime') and event_data['datetime'] != 'null':
-                event_data['datetime'] = self._parse_datetime_string(event_data['datetime'])
-            else:
-                event_data['datetime'] = None
+            with span('llm_parse'):
+                # Schema-constrained replies are bare JSON; legacy ones may come fenced
+                if config is None:
+                    response_text = CODE_FENCE_RE.sub('', response_text).strip()
+                    events = [json.loads(response_text)]
+                else:
+                    events = json.loads(response_text)['events'] or [default_error_response]
+                
+                # Convert datetime strings to timezone-aware datetime objects
+                for event_data in events:
+                    if event_data.get('datetime') and event_data['datetime'] != 'null':
+                        event_data['datetime'] = self._parse_datetime_string(event_data['datetime'])
+                    else:
+                        event_data['datetime'] = None
             
-            print(f"📊 Parsed Event Data: {event_data}")
-            return event_data
+            logger.debug("Parsed events: %s", events)
+            parse_cache = get_parse_cache()
+            if parse_cache:
+                parse_cache.set(message, events, now)
+            return events
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse AI response as JSON: {response_text if 'response_text' in locals() else 'N/A'}")
-            print(f"❌ JSON Parse Error: {e}")
-            return default_error_response
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            counters.incr('llm.parse_failures')
+            logger.error(f"Failed to parse AI response as JSON ({e}): "
+                         f"{response_text if 'response_text' in locals() else 'N/A'}")
+            return [default_error_response]
         except AttributeError as e:
             logger.error(f"Attribute error accessing response: {e}")
-            print(f"❌ Attribute Error: {e}")
-            return default_error_response
+            return [default_error_response]
         except Exception as e:
             logger.error(f"AI service error: {e}")
-            print(f"❌ AI Service Error: {e}")
-            return default_error_response
+            return [default_error_response]
+    
+    def _build_request(self, message: str, now):
+        """(contents, config) for generate_content in the configured prompt mode"""
+        if self.prompt_mode == 'structured':
+            return f"Now: {now:%Y-%m-%d %H:%M:%S %A}\nMessage: {message}", self.structured_config
+        system_prompt = self.system_instruction.format(
+            today_date=now.strftime("%Y-%m-%d"),
+            current_time=now.strftime("%H:%M:%S")
+        )
+        return f"{system_prompt}\n\nUser message: {message}", None
+    
+    @staticmethod
+    def _record_usage(response):
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is None:
+            return
+        counters.incr('llm.prompt_tokens', usage.prompt_token_count or 0)
+        counters.incr('llm.output_tokens', usage.candidates_token_count or 0)
+        counters.incr('llm.thinking_tokens', usage.thoughts_token_count or 0)
+    
+    def _degraded_response(self, message: str, default_error_response: dict) -> dict:
+        """Best local answer while Gemini is slow or down; never cached"""
+        counters.incr('llm.fallbacks')
+        event_data = fast_parser.parse(message)
+        if event_data and event_data.get('title') and event_data['confidence'] >= 0.6:
+            return event_data
+        return {
+            **default_error_response,
+            "clarification_question": "I'm a little slow right now. Could you send it as a title, "
+                                      "day and time, e.g. 'Dentist tomorrow at 3pm'?",
+        }
     
     def _parse_datetime_string(self, datetime_str: str):
         """Convert datetime string to timezone-aware datetime object"""
@@ -157,12 +304,9 @@ class EventAIService:
                     continue
             
             # If none of the formats work, return None
-            print(f"❌ Could not parse datetime string: {datetime_str}")
+            logger.warning(f"Could not parse datetime string: {datetime_str}")
             return None
             
         except Exception as e:
             logger.error(f"Error parsing datetime string: {e}")
             return None
-
-# Global instance
-ai_service = EventAIService()
\ No newline at end of file
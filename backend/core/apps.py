@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+        from . import feeds, metrics, search, signals  # noqa: F401
+        metrics.configure(enabled=getattr(settings, 'METRICS_ENABLED', True))
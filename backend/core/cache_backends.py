@@ -0,0 +1,97 @@
+# core/cache_backends.py
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import caches
+
+
+class LocalLRUBackend:
+    """Bounded in-process dict with LRU eviction and per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key, value, timeout: float) -> bool:
+        """Set only if the key is absent or expired; True if it was set"""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self._entries[key] = (now + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def get_many(self, keys) -> dict:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, mapping: dict, timeout: float):
+        for key, value in mapping.items():
+            self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend:
+    """Shared backend on top of the Django cache framework"""
+
+    def __init__(self, alias: str = 'default'):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout: float):
+        self.cache.set(key, value, timeout=max(1, int(timeout)))
+
+    def add(self, key, value, timeout: float) -> bool:
+        return self.cache.add(key, value, timeout=max(1, int(timeout)))
+
+    def get_many(self, keys) -> dict:
+        return self.cache.get_many(keys)
+
+    def set_many(self, mapping: dict, timeout: float):
+        self.cache.set_many(mapping, timeout=max(1, int(timeout)))
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
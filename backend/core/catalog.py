@@ -0,0 +1,261 @@
+# core/catalog.py
+import csv
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .geohash import KM_PER_DEGREE, covered_km, distance_km, encode, neighbourhood
+from .importer import text_lines
+from .metrics import counters, ratio
+from .models import CatalogEvent
+
+logger = logging.getLogger(__name__)
+
+# Public happenings for "what's on near me". nearby() reads the 3x3 block
+# of geohash cells around the user, starting with cells about a kilometre
+# across; for each day of the time window each cell is one range of the
+# (starts_on, geohash, ...) index, so neither the rest of the map nor the
+# rest of the calendar is scanned. It moves
+# to coarser cells only while it cannot yet prove which events are the
+# nearest: an event within covered_km() of the user is always in the block,
+# so once enough events lie that close, nothing farther can beat them.
+# Feeds are loaded in batches of upserts keyed by (source, external_id):
+# reloading a feed updates its rows in place.
+
+PRECISION = 9  # Stored geohashes, cells of about 5 m
+START_PRECISION = 6  # First search level, cells of about 1.2 x 0.6 km
+DISPLAY_FIELDS = ('title', 'starts_at', 'venue', 'category', 'url', 'latitude', 'longitude')
+
+FEED_COLUMNS = {
+    'external_id': ('id', 'external_id', 'uid', 'event_id'),
+    'title': ('title', 'name', 'summary'),
+    'starts_at': ('start', 'starts_at', 'start_time', 'dtstart'),
+    'ends_at': ('end', 'ends_at', 'end_time', 'dtend'),
+    'venue': ('venue', 'location', 'place'),
+    'category': ('category', 'type'),
+    'url': ('url', 'link'),
+    'latitude': ('latitude', 'lat'),
+    'longitude': ('longitude', 'lon', 'lng'),
+}
+UPDATE_FIELDS = ['title', 'starts_at', 'ends_at', 'venue', 'category', 'url', 'latitude', 'longitude', 'geohash',
+                 'starts_on', 'updated_at']
+
+
+def nearby(latitude: float, longitude: float, start, end, limit: int = None, radius_km: float = None) -> list:
+    """Up to `limit` (distance_km, CatalogEvent) starting in [start, end) within `radius_km`, nearest first"""
+    limit = limit or getattr(settings, 'CATALOG_MAX_RESULTS', 5)
+    radius_km = radius_km or getattr(settings, 'CATALOG_RADIUS_KM', 10)
+    counters.incr('catalog.queries')
+    # Coarse cells reach far beyond the radius: clip them to its bounding box
+    lat_span = radius_km / KM_PER_DEGREE
+    lon_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    box = Q(latitude__gte=latitude - lat_span, latitude__lte=latitude + lat_span,
+            longitude__gte=longitude - lon_span, longitude__lte=longitude + lon_span)
+    days = _utc_days(start, end)
+    found = []
+    for precision in range(START_PRECISION, 0, -1):
+        cells = Q()
+        for cell in neighbourhood(latitude, longitude, precision):
+            # The days and a prefix as a range in every term: each one is an index seek
+            cells |= Q(starts_on__in=days, geohash__gte=cell, geohash__lt=cell + '~')
+        rows = CatalogEvent.objects.filter(
+            cells, box, starts_at__gte=start, starts_at__lt=end,
+        ).order_by().values_list('id', 'latitude', 'longitude', 'starts_at')
+        counters.incr('catalog.levels')
+        found = []
+        for event_id, event_lat, event_lon, starts_at in rows:
+            distance = distance_km(latitude, longitude, event_lat, event_lon)
+            if distance <= radius_km:
+                found.append((distance, starts_at, event_id))
+        counters.incr('catalog.candidates', len(found))
+        covered = covered_km(latitude, precision)
+        if covered >= radius_km or sum(distance <= covered for distance, _, _ in found) >= limit:
+            break
+    if not found:
+        counters.incr('catalog.no_results')
+        return []
+    nearest = heapq.nsmallest(limit, found)
+    events = CatalogEvent.objects.only(*DISPLAY_FIELDS).in_bulk([event_id for _, _, event_id in nearest])
+    return [(distance, events[event_id]) for distance, _, event_id in nearest if event_id in events]
+
+
+def _utc_days(start, end) -> list:
+    """UTC dates of [start, end)"""
+    first = start.astimezone(dt_timezone.utc).date()
+    last = (end - timedelta(microseconds=1)).astimezone(dt_timezone.utc).date()
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def detect_format(name: str = '', first_line: str = '') -> str:
+    if name.lower().endswith(('.jsonl', '.ndjson', '.json')) or first_line.lstrip().startswith('{'):
+        return 'jsonl'
+    return 'csv'
+
+
+def iter_jsonl(lines):
+    """Yield one raw record per JSON line"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {'line': number, 'error': f"invalid JSON ({e.msg})"}
+            continue
+        if not isinstance(record, dict):
+            yield {'line': number, 'error': "not a JSON object"}
+            continue
+        record['line'] = number
+        yield record
+
+
+def iter_csv(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        row['line'] = reader.line_num
+        yield row
+
+
+def _parse_time(value, tz):
+    parsed = datetime.fromisoformat(str(value).strip())
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, tz)
+
+
+def normalize(raw: dict, default_tz) -> dict:
+    """Validate a raw feed record into CatalogEvent field values; raises ValueError when unusable"""
+    if raw.get('error'):
+        raise ValueError(raw['error'])
+    keys = {str(key).strip().lower().replace(' ', '_'): key for key in raw}
+
+    def get(field):
+        for alias in FEED_COLUMNS[field]:
+            if alias in keys:
+                value = raw[keys[alias]]
+                value = value.strip() if isinstance(value, str) else value
+                if value not in (None, ''):
+                    return value
+        return None
+
+    title = get('title')
+    if not title:
+        raise ValueError("missing title")
+    if not get('starts_at'):
+        raise ValueError("missing start time")
+    starts_at = _parse_time(get('starts_at'), default_tz)
+    ends_at = _parse_time(get('ends_at'), default_tz) if get('ends_at') else None
+    try:
+        latitude, longitude = float(get('latitude')), float(get('longitude'))
+    except (TypeError, ValueError):
+        raise ValueError("missing or invalid latitude/longitude")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError(f"coordinates out of range ({latitude}, {longitude})")
+
+    external_id = get('external_id')
+    if external_id is None:
+        # Feeds without ids: the same event always gets the same one
+        key = f"{title}|{starts_at.isoformat()}|{latitude:.5f},{longitude:.5f}"
+        external_id = hashlib.sha1(key.encode()).hexdigest()
+    return {
+        'external_id': str(external_id)[:255],
+        'title': str(title)[:255],
+        'starts_at': starts_at,
+        'ends_at': ends_at,
+        'venue': str(get('venue'))[:255] if get('venue') else None,
+        'category': str(get('category'))[:64] if get('category') else None,
+        'url': str(get('url'))[:500] if get('url') else None,
+        'latitude': latitude,
+        'longitude': longitude,
+        'geohash': encode(latitude, longitude, PRECISION),
+        'starts_on': starts_at.astimezone(dt_timezone.utc).date(),
+    }
+
+
+class CatalogLoader:
+    """Streams raw feed records into CatalogEvent rows, one upsert per batch"""
+
+    MAX_ERRORS_REPORTED = 20
+
+    def __init__(self, source: str, batch_size: int = None, default_tz=None):
+        self.source = source
+        self.batch_size = batch_size or getattr(settings, 'CATALOG_BATCH_SIZE', 5000)
+        self.default_tz = default_tz or timezone.get_default_timezone()
+
+    def run(self, raw_records) -> dict:
+        result = {'loaded': 0, 'invalid': 0, 'errors': [], 'seconds': 0.0}
+        started = time.perf_counter()
+        # Keyed by external_id: a batch may not upsert the same row twice
+        batch = {}
+        for raw in raw_records:
+            try:
+                fields = normalize(raw, self.default_tz)
+            except ValueError as e:
+                result['invalid'] += 1
+                if len(result['errors']) < self.MAX_ERRORS_REPORTED:
+                    result['errors'].append(f"line {raw.get('line')}: {e}")
+                continue
+            batch[fields['external_id']] = fields
+            if len(batch) >= self.batch_size:
+                self._write(batch, result)
+                batch = {}
+        if batch:
+            self._write(batch, result)
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    def _write(self, batch, result):
+        rows = [CatalogEvent(source=self.source, **fields) for fields in batch.values()]
+        with transaction.atomic():
+            CatalogEvent.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['source', 'external_id'], update_fields=UPDATE_FIELDS,
+            )
+        result['loaded'] += len(rows)
+        counters.incr('catalog.loaded', len(rows))
+
+
+def load_catalog(fileobj, name: str = '', source: str = None, fmt: str = None, batch_size: int = None,
+                 default_tz=None) -> dict:
+    """Load a CSV or JSON-lines feed file object; returns counts"""
+    lines = iter(text_lines(fileobj))
+    first_line = next(lines, '')
+    fmt = fmt or detect_format(name, first_line)
+    stream = _chain_first(first_line, lines)
+    source = source or os.path.splitext(os.path.basename(name))[0] or 'feed'
+    records = iter_jsonl(stream) if fmt == 'jsonl' else iter_csv(stream)
+    result = CatalogLoader(source, batch_size, default_tz).run(records)
+    logger.info(f"Loaded {result['loaded']} catalog event(s) from {source} "
+                f"({result['invalid']} invalid) in {result['seconds']:.1f}s")
+    return result
+
+
+def prune_catalog(now=None) -> int:
+    """Delete happenings that are over; those without an end time are over once started"""
+    now = now or timezone.now()
+    deleted, _ = CatalogEvent.objects.filter(
+        Q(ends_at__lt=now) | Q(ends_at__isnull=True, starts_at__lt=now)
+    ).delete()
+    return deleted
+
+
+def _chain_first(first_line, lines):
+    if first_line:
+        yield first_line
+    yield from lines
+
+
+def stats() -> dict:
+    queries = counters.get('catalog.queries')
+    return {
+        'queries': queries,
+        'levels_per_query': ratio(counters.get('catalog.levels'), queries),
+        'candidates_per_query': ratio(counters.get('catalog.candidates'), queries),
+        'no_results': counters.get('catalog.no_results'),
+        'loaded': counters.get('catalog.loaded'),
+    }
@@ -0,0 +1,108 @@
+# core/clients.py
+import os
+import threading
+from contextlib import contextmanager
+
+
+class LazyClient:
+    """Per-process singleton built on first use
+
+    Nothing is constructed at import time, so manage.py commands, migrations
+    and tests never import google.genai or the Twilio REST SDK unless they
+    actually use them. Instances are dropped in forked children (gunicorn
+    --preload), which then build their own connections.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._override = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def get(self):
+        if self._override is not None:
+            return self._override
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def set_factory(self, factory):
+        """Swap the factory (e.g. for a stub) and drop any built instance"""
+        with self._lock:
+            self._factory = factory
+            self._instance = None
+
+    @contextmanager
+    def override(self, instance):
+        """Temporarily serve a given instance, e.g. a test stub"""
+        previous, self._override = self._override, instance
+        try:
+            yield instance
+        finally:
+            self._override = previous
+
+    def reset(self):
+        with self._lock:
+            self._instance = None
+
+    def _after_fork(self):
+        # The parent's lock may have been held mid-construction at fork time
+        self._lock = threading.Lock()
+        self._instance = None
+
+
+def _build_ai_service():
+    from .ai_service import EventAIService
+    return EventAIService()
+
+
+def size_connection_pool(http_client, size: int):
+    """Keep up to `size` idle keep-alive connections per host on a TwilioHttpClient
+
+    requests' default pool holds 10, so busier senders would keep opening
+    and discarding connections.
+    """
+    from requests.adapters import HTTPAdapter
+    adapter = HTTPAdapter(pool_maxsize=size)
+    http_client.session.mount('https://', adapter)
+    http_client.session.mount('http://', adapter)
+    return http_client
+
+
+def _build_twilio_client():
+    from django.conf import settings
+    from twilio.http.http_client import TwilioHttpClient
+    from twilio.rest import Client
+    http_client = TwilioHttpClient(timeout=getattr(settings, 'OUTBOUND_HTTP_TIMEOUT', 10))
+    size_connection_pool(http_client, getattr(settings, 'OUTBOUND_POOL_SIZE', 32))
+    return Client(os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'), http_client=http_client)
+
+
+def build_async_twilio_client(pool_size: int = 32):
+    """Twilio client on aiohttp with a bounded connection pool
+
+    Must be called inside the event loop that will use it. Not a LazyClient:
+    an aiohttp session cannot be shared between loops.
+    """
+    from aiohttp import ClientSession, TCPConnector
+    from django.conf import settings
+    from twilio.http.async_http_client import AsyncTwilioHttpClient
+    from twilio.rest import Client
+    http_client = AsyncTwilioHttpClient(pool_connections=False, timeout=getattr(settings, 'OUTBOUND_HTTP_TIMEOUT', 10))
+    http_client.session = ClientSession(connector=TCPConnector(limit=pool_size))
+    return Client(os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'), http_client=http_client)
+
+
+ai_service_provider = LazyClient(_build_ai_service)
+twilio_client_provider = LazyClient(_build_twilio_client)
+
+
+def get_ai_service():
+    return ai_service_provider.get()
+
+
+def get_twilio_client():
+    return twilio_client_provider.get()
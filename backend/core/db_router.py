@@ -0,0 +1,135 @@
+# core/db_router.py
+import contextvars
+import itertools
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from .cache_backends import DjangoCacheBackend, LocalLRUBackend
+from .metrics import counters
+
+# Read replicas are the DATABASES aliases named replica*. Reads go to the
+# primary ('default') unless they run inside replica_reads(), which the
+# agenda replies and the calendar feed use; all writes go to the primary.
+# A user who just wrote is kept on the primary for DB_STICKY_SECONDS
+# (read-your-writes), so "events" right after creating one never comes from
+# a replica that has not caught up. The window should exceed replica lag.
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+_replicas = None
+_cycle = None
+
+
+def replica_aliases() -> list:
+    global _replicas, _cycle
+    if _replicas is None:
+        _replicas = sorted(alias for alias in settings.DATABASES if alias.startswith('replica'))
+        _cycle = itertools.cycle(_replicas)
+    return _replicas
+
+
+class StickyWrites:
+    """Users who wrote within the last `window` seconds"""
+
+    def __init__(self, backend, window: float):
+        self.backend = backend
+        self.window = window
+
+    @staticmethod
+    def make_key(user_id) -> str:
+        return f"dbsticky:{user_id}"
+
+    def mark(self, user_id):
+        if self.window > 0:
+            self.backend.set(self.make_key(user_id), True, self.window)
+
+    def is_sticky(self, user_id) -> bool:
+        return self.backend.get(self.make_key(user_id)) is not None
+
+
+def build_sticky_writes():
+    window = getattr(settings, 'DB_STICKY_SECONDS', 5.0)
+    alias = getattr(settings, 'DB_STICKY_CACHE_ALIAS', '')
+    # Several web processes need a shared cache, or a write in one is not seen by the others
+    backend = DjangoCacheBackend(alias) if alias else LocalLRUBackend(getattr(settings, 'SESSION_STORE_MAX_USERS', 10000))
+    return StickyWrites(backend, window)
+
+
+_sticky = None
+_lock = threading.Lock()
+
+
+def get_sticky_writes():
+    global _sticky
+    if _sticky is None:
+        with _lock:
+            if _sticky is None:
+                _sticky = build_sticky_writes()
+    return _sticky
+
+
+def note_write(user_id):
+    """Keep `user_id`'s replica reads on the primary for the sticky window"""
+    if replica_aliases():
+        get_sticky_writes().mark(user_id)
+
+
+def choose_read_alias(user_id=None):
+    """A replica for the next block of reads, or None (the primary) for a user who just wrote"""
+    if not replica_aliases():
+        return None
+    if user_id is not None and get_sticky_writes().is_sticky(user_id):
+        counters.incr('db.sticky_reads')
+        return None
+    counters.incr('db.replica_reads')
+    return next(_cycle)
+
+
+@contextmanager
+def reading_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+def replica_reads(user_id=None):
+    """Route the reads in this block to one replica, or to the primary for a user who just wrote
+
+    The whole block reads from the same database, so a render never mixes
+    two replicas at different positions.
+    """
+    return reading_from(choose_read_alias(user_id))
+
+
+def iterate_reading_from(alias, iterable):
+    """Yield from `iterable` with every step reading from `alias`
+
+    For lazily consumed bodies such as StreamingHttpResponse, which are
+    iterated after the view has returned.
+    """
+    iterator = iter(iterable)
+    while True:
+        with reading_from(alias):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+class PrimaryReplicaRouter:
+    """DATABASE_ROUTERS entry: replica reads only inside replica_reads()"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
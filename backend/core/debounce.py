@@ -0,0 +1,169 @@
+# core/debounce.py
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from . import intent_router
+from .metrics import counters, histograms, ratio
+
+logger = logging.getLogger(__name__)
+
+# Commands are answered right away instead of waiting out the window
+IMMEDIATE_INTENTS = (
+    intent_router.MENU, intent_router.EVENTS, intent_router.TODAY, intent_router.CANCEL, intent_router.SUBSCRIBE,
+    intent_router.FREE, intent_router.SEARCH, intent_router.NEARBY,
+)
+
+
+class _Burst:
+    __slots__ = ('jobs', 'first_at', 'deadline', 'generation')
+
+    def __init__(self, now):
+        self.jobs = []
+        self.first_at = now
+        self.deadline = now
+        self.generation = 0
+
+
+class MessageDebouncer:
+    """Coalesces messages a phone number sends in quick succession
+
+    "meeting with Ada" / "tomorrow" / "3pm at the office" arrive as three
+    webhooks; they are buffered per phone number and handed to `flush` as a
+    single job once the number has been quiet for `window` seconds (or
+    `max_wait` after the first message), so one parse and one reply cover
+    the whole burst. Buffers live in this process only.
+    """
+
+    def __init__(self, flush, window: float = 2.0, max_wait: float = None):
+        self.flush = flush
+        self.window = window
+        self.max_wait = max_wait if max_wait is not None else window * 3
+        self._bursts = {}
+        self._timers = []  # (deadline, generation, phone) min-heap, stale entries skipped
+        self._sequence = itertools.count(1)  # unique per message, so stale timers never match
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, job: dict):
+        """Buffer an inbound job ({'from', 'to', 'body', 'received_at'})"""
+        counters.incr('debounce.messages')
+        intent = intent_router.classify(job['body'])
+        phone = job['from']
+
+        if intent in IMMEDIATE_INTENTS:
+            with self._cond:
+                burst = self._bursts.pop(phone, None)
+            if burst and intent == intent_router.CANCEL:
+                # The user gave up on what they were typing
+                counters.incr('debounce.discarded', len(burst.jobs))
+            elif burst:
+                self._emit(burst)
+            self._emit_one(job)
+            return
+
+        now = time.monotonic()
+        with self._cond:
+            burst = self._bursts.get(phone)
+            if burst is None:
+                burst = self._bursts[phone] = _Burst(now)
+            burst.jobs.append(job)
+            burst.generation = next(self._sequence)
+            burst.deadline = min(now + self.window, burst.first_at + self.max_wait)
+            heapq.heappush(self._timers, (burst.deadline, burst.generation, phone))
+            self._cond.notify()
+        self._ensure_thread()
+
+    def flush_all(self):
+        """Emit every buffered burst now (shutdown, tests)"""
+        with self._cond:
+            bursts = list(self._bursts.values())
+            self._bursts.clear()
+            self._timers.clear()
+        for burst in bursts:
+            self._emit(burst)
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(burst.jobs) for burst in self._bursts.values())
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._cond:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='message-debouncer', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if self._timers and self._timers[0][0] <= now:
+                        _deadline, generation, phone = heapq.heappop(self._timers)
+                        burst = self._bursts.get(phone)
+                        if burst is None or burst.generation != generation:
+                            continue  # superseded by a later message
+                        del self._bursts[phone]
+                        break
+                    self._cond.wait(self._timers[0][0] - now if self._timers else None)
+            self._emit(burst)
+
+    def _emit(self, burst):
+        jobs = burst.jobs
+        if len(jobs) == 1:
+            self._emit_one(jobs[0])
+            return
+        merged = dict(jobs[0])
+        merged['body'] = ' '.join(job['body'] for job in jobs if job['body'])
+        merged['to'] = jobs[-1].get('to') or jobs[0].get('to')
+        merged['parts'] = len(jobs)
+        counters.incr('debounce.calls_saved', len(jobs) - 1)
+        self._emit_one(merged, jobs)
+
+    def _emit_one(self, job, parts=None):
+        now = time.time()
+        for part in parts or (job,):
+            histograms.observe('debounce.added_latency', now - part.get('received_at', now))
+        counters.incr('debounce.flushes')
+        try:
+            self.flush(job)
+        except Exception as e:
+            logger.error(f"Error flushing debounced message for {job.get('from')}: {e}")
+
+
+_debouncer = None
+_lock = threading.Lock()
+
+
+def get_debouncer(flush):
+    """Return the process-wide debouncer, or None when MESSAGE_DEBOUNCE_SECONDS is 0"""
+    global _debouncer
+    window = getattr(settings, 'MESSAGE_DEBOUNCE_SECONDS', 0)
+    if not window:
+        return None
+    if _debouncer is None:
+        with _lock:
+            if _debouncer is None:
+                _debouncer = MessageDebouncer(
+                    flush, window=window, max_wait=getattr(settings, 'MESSAGE_DEBOUNCE_MAX_WAIT', None),
+                )
+    return _debouncer
+
+
+def stats() -> dict:
+    """Pipeline runs (and so LLM parses) saved by coalescing, and the latency it added"""
+    messages = counters.get('debounce.messages')
+    saved = counters.get('debounce.calls_saved')
+    return {
+        'messages': messages,
+        'flushes': counters.get('debounce.flushes'),
+        'llm_calls_saved': saved,
+        'saved_rate': ratio(saved, messages),
+        'discarded': counters.get('debounce.discarded'),
+        'added_latency': histograms.get('debounce.added_latency').snapshot(),
+    }
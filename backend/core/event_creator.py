@@ -1,20 +1,37 @@
 # core/event_creator.py
 from .models import Event, EventManagerUser
-from .ai_service import ai_service
+from .clients import get_ai_service
+from .fast_parser import fast_parser
+from .metrics import counters, span
+from .session_store import get_session_store
+from .recurrence import RecurrenceRule
+from .interval_index import get_interval_indexes
+from .signals import events_bulk_created
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
+# A pasted schedule is created in one go, up to this many events
+MAX_EVENTS_PER_MESSAGE = 20
+
 class EventCreationService:
     def __init__(self, user):
         self.user = user
+        self.sessions = get_session_store()
     
-    def process_event_creation(self, message: str) -> str:
-        """Process event creation flow with AI assistance"""
+    def process_event_creation(self, message: str, conversation_state: dict = None) -> str:
+        """Process event creation flow with AI assistance
+
+        `conversation_state` is the user's state when the caller has already read it.
+        """
         
         # Check if we're in the middle of an event creation conversation
-        conversation_state = self.user.current_conversation_state or {}
+        if conversation_state is None:
+            conversation_state = self.sessions.get_state(self.user) or {}
         
         if conversation_state.get('creating_event'):
             return self._continue_event_creation(message, conversation_state)
@@ -24,21 +41,23 @@ class EventCreationService:
     def _start_event_creation(self, message: str) -> str:
         """Start new event creation with AI parsing"""
         
-        # Use AI to parse the event details
-        event_data = ai_service.parse_event_message(message)
+        # Try the local parser first, AI only when it isn't confident
+        events = self._parse_events(message)
+        if len(events) > 1:
+            return self._create_events_from_data(events)
+        event_data = events[0]
         
         if event_data['confidence'] < 0.6 or event_data['needs_clarification']:
             # Ask for clarification
             clarification = event_data.get('clarification_question', 
                                          "Could you provide more details about the event?")
             
-            # Save conversation state
-            self.user.current_conversation_state = {
+            # Save conversation state (session store only, no DB write)
+            self.sessions.set_state(self.user, {
                 'creating_event': True,
                 'pending_event': event_data,
                 'step': 'clarification'
-            }
-            self.user.save()
+            })
             
             return f"🤔 {clarification}"
         
@@ -54,11 +73,11 @@ class EventCreationService:
             
             # Re-parse with the new information
             combined_message = f"{pending_event.get('title', 'Event')} {message}"
-            event_data = ai_service.parse_event_message(combined_message)
+            event_data = self._parse_message(combined_message)
             
             if event_data['confidence'] >= 0.6 and not event_data['needs_clarification']:
                 # Clear conversation state
-                self.user.clear_conversation_state()
+                self.sessions.clear_state(self.user)
                 return self._create_event_from_data(event_data)
             else:
                 # Still need clarification
@@ -66,50 +85,261 @@ class EventCreationService:
                                              "I'm still not sure. Could you be more specific?")
                 
                 # Update pending event data if AI provided better context
-                self.user.current_conversation_state = {
+                self.sessions.set_state(self.user, {
                     'creating_event': True,
                     'pending_event': event_data,
                     'step': 'clarification'
-                }
-                self.user.save()
+                })
 
                 return f"🤔 {clarification}"
         
         # Default: clear state and start over
-        self.user.clear_conversation_state()
+        self.sessions.clear_state(self.user)
+        return "Let's try again. What event would you like to create?"
+    
+    # Async counterparts for the async webhook: Gemini and the INSERTs are
+    # awaited, the decisions are the same as above
+    
+    async def aprocess_event_creation(self, message: str, conversation_state: dict = None) -> str:
+        if conversation_state is None:
+            conversation_state = await self.sessions.aget_state(self.user) or {}
+        if conversation_state.get('creating_event'):
+            return await self._acontinue_event_creation(message, conversation_state)
+        return await self._astart_event_creation(message)
+    
+    async def _astart_event_creation(self, message: str) -> str:
+        events = await self._aparse_events(message)
+        if len(events) > 1:
+            return await self._acreate_events_from_data(events)
+        event_data = events[0]
+        
+        if event_data['confidence'] < 0.6 or event_data['needs_clarification']:
+            clarification = event_data.get('clarification_question',
+                                           "Could you provide more details about the event?")
+            await self.sessions.aset_state(self.user, self._clarification_state(event_data))
+            return f"🤔 {clarification}"
+        
+        return await self._acreate_event_from_data(event_data)
+    
+    async def _acontinue_event_creation(self, message: str, conversation_state: dict) -> str:
+        if conversation_state.get('step') == 'clarification':
+            pending_event = conversation_state['pending_event']
+            combined_message = f"{pending_event.get('title', 'Event')} {message}"
+            event_data = (await self._aparse_events(combined_message))[0]
+            
+            if event_data['confidence'] >= 0.6 and not event_data['needs_clarification']:
+                await self.sessions.aclear_state(self.user)
+                return await self._acreate_event_from_data(event_data)
+            
+            clarification = event_data.get('clarification_question',
+                                           "I'm still not sure. Could you be more specific?")
+            await self.sessions.aset_state(self.user, self._clarification_state(event_data))
+            return f"🤔 {clarification}"
+        
+        await self.sessions.aclear_state(self.user)
         return "Let's try again. What event would you like to create?"
     
+    @staticmethod
+    def _clarification_state(event_data: dict) -> dict:
+        return {
+            'creating_event': True,
+            'pending_event': event_data,
+            'step': 'clarification'
+        }
+    
+    def _parse_message(self, message: str) -> dict:
+        """Parse with the deterministic fast path, falling back to Gemini"""
+        return self._parse_events(message)[0]
+    
+    def _parse_events(self, message: str) -> list:
+        """Every event in the message: the fast path handles single events only"""
+        fast = self._fast_parse(message)
+        return [fast] if fast else get_ai_service().parse_events(message)
+    
+    async def _aparse_events(self, message: str) -> list:
+        fast = self._fast_parse(message)
+        return [fast] if fast else await get_ai_service().aparse_events(message)
+    
+    @staticmethod
+    def _fast_parse(message: str):
+        """The local parse when it is confident enough to skip Gemini, else None"""
+        event_data = fast_parser.parse(message)
+        if event_data and event_data['confidence'] >= settings.FAST_PARSER_CONFIDENCE_THRESHOLD:
+            counters.incr('fast_parser.hits')
+            counters.incr('llm.calls_avoided')
+            return event_data
+        return None
+    
+    @staticmethod
+    def _is_complete(event_data: dict) -> bool:
+        return bool(event_data.get('title') and event_data.get('datetime')
+                    and event_data.get('confidence', 0) >= 0.6 and not event_data.get('needs_clarification'))
+    
+    def _create_events_from_data(self, events: list) -> str:
+        """Create every complete event in one INSERT and summarize them in one reply"""
+        ready, skipped = self._select_events(events)
+        created = []
+        if ready:
+            new_events = [Event(**self._event_fields(event_data)) for event_data in ready]
+            try:
+                with span('db_write'), transaction.atomic():
+                    created = Event.objects.bulk_create(new_events)
+            except Exception as e:
+                logger.error(f"Error creating events: {e}")
+                return "❌ Sorry, I couldn't create those events. Please try again with different details."
+            # bulk_create sends no post_save
+            events_bulk_created.send(sender=Event, user=self.user, events=created)
+            counters.incr('events.bulk_created', len(created))
+        return self._created_events_reply(events, created, skipped)
+    
+    async def _acreate_events_from_data(self, events: list) -> str:
+        ready, skipped = self._select_events(events)
+        created = []
+        if ready:
+            new_events = [Event(**self._event_fields(event_data)) for event_data in ready]
+            try:
+                # A single multi-row INSERT, atomic on its own
+                with span('db_write'):
+                    created = await Event.objects.abulk_create(new_events)
+            except Exception as e:
+                logger.error(f"Error creating events: {e}")
+                return "❌ Sorry, I couldn't create those events. Please try again with different details."
+            await events_bulk_created.asend(sender=Event, user=self.user, events=created)
+            counters.incr('events.bulk_created', len(created))
+        # The reply looks up conflicts, which may read the database
+        return await sync_to_async(self._created_events_reply)(events, created, skipped)
+    
+    def _select_events(self, events: list):
+        """(ready, skipped): complete, de-duplicated events and the ones that need more detail"""
+        ready, skipped, seen = [], [], set()
+        for event_data in events[:MAX_EVENTS_PER_MESSAGE]:
+            if not self._is_complete(event_data):
+                skipped.append(event_data)
+                continue
+            key = (event_data['title'].lower(), event_data['datetime'])
+            if key not in seen:
+                seen.add(key)
+                ready.append(event_data)
+        return ready, skipped
+    
+    def _created_events_reply(self, events: list, created: list, skipped: list) -> str:
+        lines = []
+        if created:
+            plural = 's' if len(created) > 1 else ''
+            lines.append(f"✅ *{len(created)} event{plural} created!* 🎉\n")
+            for event in sorted(created, key=lambda e: e.scheduled_time):
+                time_str = timezone.localtime(event.scheduled_time).strftime('%a, %b %d at %I:%M %p')
+                location_str = f" at {event.location}" if event.location else ""
+                repeat_str = " 🔁" if event.is_recurring else ""
+                conflict_note = self._conflict_note(event)
+                conflict_str = f"\n  ⚠️ Overlaps with {conflict_note}" if conflict_note else ""
+                lines.append(f"• *{event.title}* — {time_str}{location_str}{repeat_str}{conflict_str}")
+        
+        if skipped:
+            lines.append("\n🤔 I couldn't schedule these, please send each on its own with a day and time:"
+                         if created else "🤔 I found several events but couldn't pin them down. "
+                                         "Please send each on its own with a day and time:")
+            for event_data in skipped:
+                lines.append(f"• {event_data.get('title') or 'Untitled'}")
+        
+        if len(events) > MAX_EVENTS_PER_MESSAGE:
+            lines.append(f"\n⚠️ Only the first {MAX_EVENTS_PER_MESSAGE} events were read.")
+        if created:
+            lines.append("\nUse 'events' to see all your upcoming events!")
+        return "\n".join(lines)
+    
     def _create_event_from_data(self, event_data: dict) -> str:
         """Create event from parsed data and return response message"""
+        problem = self._missing_details(event_data)
+        if problem:
+            return problem
         try:
-            # Validate required fields
-            if not event_data.get('title'):
-                return "❌ I couldn't determine the event title. Please try again with a clearer description."
-            
-            # In a real-world scenario, you might relax this if the user is just asking for a reminder without a specific time
-            if not event_data.get('datetime'):
-                return "❌ I couldn't determine the event time. Please specify when this should happen."
-            
             # Create the event
-            event = Event.objects.create(
-                user=self.user,
-                title=event_data['title'],
-                scheduled_time=event_data['datetime'],
-                location=event_data.get('location'),
-                notes=event_data.get('notes', '') # <-- SAVING NOTES
-            )
-            
-            # Format success message
-            time_str = event.scheduled_time.strftime('%A, %b %d at %I:%M %p')
-            location_str = f" at {event.location}" if event.location else ""
-            # Display notes if they exist
-            notes_str = f"\n📄 Notes: {event.notes}" if event.notes else ""
-            
-            return f"✅ *Event Created Successfully!* 🎉\n\n" \
-                   f"*{event.title}*\n" \
-                   f"📅 {time_str}{location_str}{notes_str}\n\n" \
-                   f"Use 'events' to see all your upcoming events!"
-                   
+            with span('db_write'):
+                event = Event.objects.create(**self._event_fields(event_data))
+        except Exception as e:
+            logger.error(f"Error creating event: {e}")
+            return "❌ Sorry, I couldn't create that event. Please try again with different details."
+        return self._created_reply(event, self._conflict_note(event))
+    
+    async def _acreate_event_from_data(self, event_data: dict) -> str:
+        problem = self._missing_details(event_data)
+        if problem:
+            return problem
+        try:
+            with span('db_write'):
+                event = await Event.objects.acreate(**self._event_fields(event_data))
         except Exception as e:
             logger.error(f"Error creating event: {e}")
-            return "❌ Sorry, I couldn't create that event. Please try again with different details."
\ No newline at end of file
+            return "❌ Sorry, I couldn't create that event. Please try again with different details."
+        return self._created_reply(event, await sync_to_async(self._conflict_note)(event))
+    
+    @staticmethod
+    def _missing_details(event_data: dict):
+        """The reply asking for a missing title or time, or None"""
+        # Validate required fields
+        if not event_data.get('title'):
+            return "❌ I couldn't determine the event title. Please try again with a clearer description."
+        
+        # In a real-world scenario, you might relax this if the user is just asking for a reminder without a specific time
+        if not event_data.get('datetime'):
+            return "❌ I couldn't determine the event time. Please specify when this should happen."
+        return None
+    
+    def _event_fields(self, event_data: dict) -> dict:
+        # Repeating events are stored once, as a series
+        recurrence = self._recurrence_pattern(event_data.get('recurrence'))
+        return {
+            'user': self.user,
+            'title': event_data['title'],
+            'scheduled_time': event_data['datetime'],
+            'duration_minutes': self._duration_minutes(event_data.get('duration_minutes')),
+            'location': event_data.get('location'),
+            'notes': event_data.get('notes') or '',
+            'is_recurring': bool(recurrence),
+            'recurrence_pattern': recurrence,
+        }
+    
+    @staticmethod
+    def _created_reply(event, conflict_note: str = '') -> str:
+        # Format success message
+        time_str = timezone.localtime(event.scheduled_time).strftime('%A, %b %d at %I:%M %p')
+        location_str = f" at {event.location}" if event.location else ""
+        # Display notes if they exist
+        notes_str = f"\n📄 Notes: {event.notes}" if event.notes else ""
+        repeat_str = f"\n🔁 Repeats: {event.recurrence_pattern}" if event.recurrence_pattern else ""
+        conflict_str = f"\n⚠️ Overlaps with {conflict_note}" if conflict_note else ""
+        
+        return f"✅ *Event Created Successfully!* 🎉\n\n" \
+               f"*{event.title}*\n" \
+               f"📅 {time_str}{location_str}{notes_str}{repeat_str}{conflict_str}\n\n" \
+               f"Use 'events' to see all your upcoming events!"
+    
+    def _conflict_note(self, event) -> str:
+        """The events `event` overlaps, as '*Title* (3:00 PM)' items, or ''"""
+        try:
+            clashes = get_interval_indexes().conflicts(self.user, event)
+        except Exception as e:
+            # A warning is a nicety; never fail the creation over it
+            logger.warning(f"Conflict check failed: {e}")
+            return ""
+        return ", ".join(f"*{title}* ({timezone.localtime(start):%I:%M %p})" for start, _end, _id, title in clashes[:3])
+    
+    @staticmethod
+    def _duration_minutes(value):
+        """Whole minutes up to a day, or None for the default length"""
+        try:
+            minutes = int(value)
+        except (TypeError, ValueError):
+            return None
+        return minutes if 0 < minutes <= 24 * 60 else None
+    
+    def _recurrence_pattern(self, pattern):
+        """Normalized RRULE string, or None when absent or unsupported"""
+        if not pattern or pattern == 'null':
+            return None
+        try:
+            return str(RecurrenceRule.parse(pattern))
+        except (ValueError, TypeError):
+            logger.warning(f"Ignoring unsupported recurrence pattern: {pattern}")
+            return None
@@ -0,0 +1,345 @@
+# core/fast_parser.py
+import re
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from .metrics import counters, ratio
+
+# Deterministic parser for the common "dentist tomorrow at 3pm" shape.
+# It returns the same dict as EventAIService.parse_event_message with a
+# confidence score; callers fall back to Gemini below their threshold.
+
+WEEKDAYS = {
+    'monday': 0, 'mon': 0,
+    'tuesday': 1, 'tues': 1, 'tue': 1,
+    'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thurs': 3, 'thur': 3, 'thu': 3,
+    'friday': 4, 'fri': 4,
+    'saturday': 5, 'sat': 5,
+    'sunday': 6, 'sun': 6,
+}
+# Also plain English words: only a day after next/this/on/coming or before a time
+WEEKEND_ABBREVIATIONS = ('sat', 'sun')
+
+MONTHS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8, 'september': 9, 'sept': 9, 'sep': 9,
+    'october': 10, 'oct': 10, 'november': 11, 'nov': 11, 'december': 12, 'dec': 12,
+}
+
+NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+                'six': 6, 'seven': 7}
+_number_alt = '|'.join(NUMBER_WORDS)
+
+PART_OF_DAY = {'morning': time(9, 0), 'afternoon': time(15, 0),
+               'evening': time(18, 0), 'night': time(20, 0), 'tonight': time(20, 0)}
+
+_weekday_alt = '|'.join(sorted(set(WEEKDAYS) - set(WEEKEND_ABBREVIATIONS), key=len, reverse=True))
+_month_alt = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+URL_RE = re.compile(
+    r'(?:https?://|www\.)\S+|\b(?:[\w-]+\.)*(?:zoom\.us|meet\.google\.com|teams\.microsoft\.com)/\S*',
+    re.I)
+ISO_DATE_RE = re.compile(r'\b(?:on\s+)?(\d{4})-(\d{1,2})-(\d{1,2})\b', re.I)
+RELATIVE_RE = re.compile(r'\b(day after tomorrow|today|tonight|tomorrow|tomorow|tmrw|tmr)\b', re.I)
+IN_DAYS_RE = re.compile(r'\bin\s+(\d{1,2}|a|an|one|two|three|four|five|six|seven)\s+(days?|weeks?)\b', re.I)
+WEEKDAY_RE = re.compile(rf'\b(?:(next|this|on|coming)\s+)?({_weekday_alt})\b', re.I)
+WEEKEND_ABBR_RE = re.compile(
+    r'\b(?:(next|this|on|coming)\s+)?(sat|sun)\b'
+    r'(?(1)|(?=\s*(?:(?:at\s+|@\s*)?\d|noon|midday|morning|afternoon|evening|night)))',
+    re.I)
+MONTH_DATE_RE = re.compile(
+    rf'\b(?:on\s+)?(?:(?:the\s+)?(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_month_alt})\.?'
+    rf'|({_month_alt})\.?\s+(?:the\s+)?(\d{{1,2}})(?:st|nd|rd|th)?)(?:,?\s+(\d{{4}}))?\b',
+    re.I)
+TIME_12H_RE = re.compile(r'(?:\b(?:at|by|from)\s+|@\s*)?\b(\d{1,2})(?:[:.](\d{2}))?\s*([ap])\.?m\.?(?!\w)', re.I)
+TIME_24H_RE = re.compile(r'(?:\b(?:at|by|from)\s+|@\s*)?\b([01]?\d|2[0-3]):([0-5]\d)\b', re.I)
+BARE_HOUR_RE = re.compile(r'\b(?:at|@)\s*(\d{1,2})\b(?!\s*(?:%|[a-z]))', re.I)
+NAMED_TIME_RE = re.compile(r'\b(?:at\s+)?(noon|midday)\b', re.I)
+PART_OF_DAY_RE = re.compile(r'\b(?:in\s+the\s+|this\s+)?(morning|afternoon|evening|night)\b', re.I)
+# "for 2 hours", "for an hour and a half", "for half an hour", "for 45 mins"
+DURATION_RE = re.compile(
+    rf'\bfor\s+(?:(half\s+an)|(\d{{1,3}}(?:\.\d+)?|{_number_alt}))\s*'
+    r'(hours?|hrs?|h|minutes?|mins?|m)\b(\s+and\s+a\s+half)?',
+    re.I)
+# "until 5pm", "till 17:30": the end of the event
+END_TIME_RE = re.compile(
+    r'\b(?:until|till|til)\s+(\d{1,2})(?:[:.](\d{2}))?\s*(?:([ap])\.?m\.?(?!\w)|(?=\s|$))',
+    re.I)
+# Length words left in the title mean a duration the rules did not read
+UNREAD_DURATION_RE = re.compile(r'\b(?:hours?|hrs?|minutes?|mins?|all\s+day)\b', re.I)
+
+# Things the rules cannot express faithfully; leave them to the LLM
+AMBIGUOUS_RE = re.compile(
+    r'\b\d{1,2}/\d{1,2}\b|\b(?:every|daily|weekly|monthly|until|till|between|midnight)\b'
+    r'|\b(?:meeting id|passcode|password|pwd)\b|(?<![\d-])\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)?\s*(?:-|to)\s*\d{1,2}(?![\d-])|\b(?:mon|tue|wed|thu|fri)\w*\s*-\s*\w+',
+    re.I)
+
+LEADING_FILLER_RE = re.compile(
+    r'^(?:(?:please|pls|hey|ok|okay)\s+)*'
+    r'(?:(?:can you\s+|could you\s+)?(?:create|schedule|add|set up|setup|book|plan|put|remind me(?:\s+(?:to|about|of))?)\s+)?'
+    r'(?:(?:an?|the|my)\s+)?(?:new\s+)?(?:event\s+(?:for|called|named)?\s*)?',
+    re.I)
+TRAILING_FILLER_RE = re.compile(
+    r'(?:\s+|^)(?:on|at|for|by|this|next|from|the|in|@|(?:meeting\s+)?link(?:\s+is)?:?)\s*$', re.I)
+LINK_LABEL_RE = re.compile(r'\b(?:meeting\s+)?link(?:\s+is)?\s*:\s*', re.I)
+LOCATION_RE = re.compile(r'\s(?:at|@)\s+(?!\d)([^,;]{2,80})$', re.I)
+
+
+class FastPathEventParser:
+    """Pure-Python parser for simple event messages; no network calls"""
+
+    def parse(self, message: str, now=None) -> dict:
+        """Return an AI-shaped event dict, or None when no date/time is present"""
+        counters.incr('fast_parser.attempts')
+        now = timezone.localtime(now or timezone.now())
+        text = ' '.join(message.split())
+        confidence = 0.95
+
+        duration, end_time, text, length_conf = self._extract_length(text)
+        confidence = min(confidence, length_conf)
+
+        if AMBIGUOUS_RE.search(text):
+            confidence = 0.3
+
+        location = None
+        url_match = URL_RE.search(text)
+        if url_match:
+            location = url_match.group(0).rstrip('.,)')
+            text = self._cut(text, url_match)
+
+        event_date, roll_days, text, date_conf, pod_hint = self._extract_date(text, now)
+        confidence = min(confidence, date_conf)
+
+        event_time, text, time_conf = self._extract_time(text)
+        confidence = min(confidence, time_conf)
+
+        if event_time is None and pod_hint is None:
+            pod_match = PART_OF_DAY_RE.search(text)
+            if pod_match:
+                pod_hint = PART_OF_DAY[pod_match.group(1).lower()]
+                text = self._cut(text, pod_match)
+        if event_time is None and pod_hint is not None:
+            # "tonight" / "in the evening" are vague, let the LLM confirm
+            event_time = pod_hint
+            confidence = min(confidence, 0.7)
+
+        if event_date is None and event_time is None:
+            return None
+
+        if event_time is None:
+            # Same default as the LLM prompt: midday
+            event_time = time(12, 0)
+            confidence = min(confidence, 0.8)
+
+        if event_date is None:
+            event_date, roll_days = now.date(), 1
+        scheduled = timezone.make_aware(datetime.combine(event_date, event_time),
+                                        timezone.get_current_timezone())
+        if scheduled <= now:
+            if roll_days:
+                scheduled += timedelta(days=roll_days)
+            else:
+                # An explicit date in the past is probably a misunderstanding
+                confidence = min(confidence, 0.5)
+
+        if end_time is not None:
+            end = timezone.make_aware(datetime.combine(scheduled.date(), end_time), timezone.get_current_timezone())
+            if end <= scheduled:
+                # "10pm until 2am" ends the next day
+                end += timedelta(days=1)
+            duration = int((end - scheduled).total_seconds() // 60)
+
+        if location is None:
+            location_match = LOCATION_RE.search(text)
+            if location_match:
+                location = location_match.group(1).strip(' .!?')
+                text = text[:location_match.start()]
+
+        title = self._clean_title(text)
+        if not title:
+            return None
+        if len(title.split()) > 8:
+            # Long leftovers usually hide notes or instructions
+            confidence = min(confidence, 0.6)
+        if UNREAD_DURATION_RE.search(title):
+            confidence = min(confidence, 0.5)
+
+        return {
+            "title": title,
+            "datetime": scheduled,
+            "duration_minutes": duration,
+            "location": location,
+            "notes": None,
+            "confidence": confidence,
+            "needs_clarification": False,
+            "clarification_question": None,
+        }
+
+    def _extract_length(self, text):
+        """Return (duration_minutes, end_time, remaining_text, confidence)"""
+        durations = list(DURATION_RE.finditer(text))
+        ends = list(END_TIME_RE.finditer(text))
+        if len(durations) + len(ends) > 1:
+            return None, None, text, 0.3
+        if durations:
+            match = durations[0]
+            if match.group(1):
+                amount = 0.5
+            else:
+                amount = match.group(2).lower()
+                amount = float(amount) if amount[0].isdigit() else NUMBER_WORDS[amount]
+            if match.group(4):
+                amount += 0.5
+            minutes = amount * 60 if match.group(3).lower().startswith('h') else amount
+            if not 0 < minutes <= 24 * 60:
+                return None, None, text, 0.3
+            return int(minutes), None, self._cut(text, match), 1.0
+        if ends:
+            match = ends[0]
+            hour, minute = int(match.group(1)), int(match.group(2) or 0)
+            meridiem = (match.group(3) or '').lower()
+            if minute > 59 or (meridiem and not 1 <= hour <= 12) or hour > 23:
+                return None, None, text, 0.3
+            if not meridiem and match.group(2) is None:
+                # "until 5" could be 5am or 5pm
+                return None, None, text, 0.3
+            if meridiem == 'p' and hour != 12:
+                hour += 12
+            elif meridiem == 'a' and hour == 12:
+                hour = 0
+            return None, time(hour, minute), self._cut(text, match), 1.0
+        return None, None, text, 1.0
+
+    def _extract_date(self, text, now):
+        """Return (date, roll_days, remaining_text, confidence, part_of_day_hint)
+
+        roll_days is how far to push the date when the resolved time has
+        already passed (0 for explicit dates).
+        """
+        today = now.date()
+        found = []
+
+        for match in ISO_DATE_RE.finditer(text):
+            try:
+                found.append((match, datetime(int(match.group(1)), int(match.group(2)),
+                                              int(match.group(3))).date(), 0, None))
+            except ValueError:
+                return None, 0, text, 0.3, None
+
+        for match in RELATIVE_RE.finditer(text):
+            word = match.group(1).lower()
+            if word == 'day after tomorrow':
+                found.append((match, today + timedelta(days=2), 0, None))
+            elif word in ('today', 'tonight'):
+                found.append((match, today, 0, PART_OF_DAY['tonight'] if word == 'tonight' else None))
+            else:
+                found.append((match, today + timedelta(days=1), 0, None))
+
+        for match in IN_DAYS_RE.finditer(text):
+            amount = match.group(1).lower()
+            amount = int(amount) if amount.isdigit() else NUMBER_WORDS[amount]
+            unit = 7 if match.group(2).lower().startswith('week') else 1
+            found.append((match, today + timedelta(days=amount * unit), 0, None))
+
+        for match in MONTH_DATE_RE.finditer(text):
+            day = int(match.group(1) or match.group(4))
+            month = MONTHS[(match.group(2) or match.group(3)).lower().rstrip('.')]
+            year = int(match.group(5)) if match.group(5) else today.year
+            try:
+                candidate = datetime(year, month, day).date()
+            except ValueError:
+                return None, 0, text, 0.3, None
+            if not match.group(5) and candidate < today:
+                candidate = candidate.replace(year=today.year + 1)
+            found.append((match, candidate, 0, None))
+
+        weekdays = sorted([*WEEKDAY_RE.finditer(text), *WEEKEND_ABBR_RE.finditer(text)], key=lambda m: m.start())
+        for match in weekdays:
+            target = WEEKDAYS[match.group(2).lower()]
+            days_ahead = (target - today.weekday()) % 7
+            if days_ahead == 0 and (match.group(1) or '').lower() == 'next':
+                days_ahead = 7
+            # A weekday naming today moves a week ahead once its time has passed
+            found.append((match, today + timedelta(days=days_ahead), 7 if days_ahead == 0 else 0, None))
+
+        if not found:
+            return None, 0, text, 1.0, None
+        if len(found) > 1:
+            # Several date references ("monday and friday") are not a single event
+            return None, 0, text, 0.3, None
+
+        match, value, roll_days, hint = found[0]
+        return value, roll_days, self._cut(text, match), 1.0, hint
+
+    def _extract_time(self, text):
+        """Return (time, remaining_text, confidence)"""
+        for match in TIME_12H_RE.finditer(text):
+            hour, minute = int(match.group(1)), int(match.group(2) or 0)
+            if not 1 <= hour <= 12 or minute > 59:
+                return None, text, 0.3
+            if match.group(3).lower() == 'p' and hour != 12:
+                hour += 12
+            elif match.group(3).lower() == 'a' and hour == 12:
+                hour = 0
+            return self._single_time(text, match, time(hour, minute), 1.0)
+
+        for match in TIME_24H_RE.finditer(text):
+            hour, minute = int(match.group(1)), int(match.group(2))
+            # "3:30" without am/pm is a guess between 03:30 and 15:30
+            confidence = 1.0 if hour == 0 or hour >= 8 else 0.7
+            return self._single_time(text, match, time(hour, minute), confidence)
+
+        for match in NAMED_TIME_RE.finditer(text):
+            return self._single_time(text, match, time(12, 0), 1.0)
+
+        for match in BARE_HOUR_RE.finditer(text):
+            hour = int(match.group(1))
+            if not 1 <= hour <= 12:
+                return None, text, 0.3
+            # "at 3" means the afternoon for anything earlier than 7
+            if hour <= 6:
+                hour += 12
+            return self._single_time(text, match, time(hour, 0), 0.8)
+
+        return None, text, 1.0
+
+    def _single_time(self, text, match, value, confidence):
+        remaining = self._cut(text, match)
+        if TIME_12H_RE.search(remaining) or TIME_24H_RE.search(remaining):
+            # Two clock times: a range or several events
+            return value, remaining, 0.3
+        return value, remaining, confidence
+
+    @staticmethod
+    def _cut(text, match):
+        return f"{text[:match.start()]} {text[match.end():]}"
+
+    @staticmethod
+    def _clean_title(text):
+        title = LINK_LABEL_RE.sub(' ', text)
+        title = re.sub(r'\s+([,;:.!?])', r'\1', ' '.join(title.split())).strip(' ,;:-.!?')
+        title = LEADING_FILLER_RE.sub('', title, count=1)
+        previous = None
+        while previous != title:
+            previous = title
+            title = TRAILING_FILLER_RE.sub('', title).strip(' ,;:-.!?')
+        if not title:
+            return None
+        return title[0].upper() + title[1:]
+
+
+def stats() -> dict:
+    """Fast-path hit rate and LLM calls avoided"""
+    attempts = counters.get('fast_parser.attempts')
+    hits = counters.get('fast_parser.hits')
+    return {
+        'attempts': attempts,
+        'hits': hits,
+        'hit_rate': ratio(hits, attempts),
+        'llm_calls_avoided': counters.get('llm.calls_avoided'),
+    }
+
+
+# Global instance
+fast_parser = FastPathEventParser()
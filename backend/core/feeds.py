@@ -0,0 +1,243 @@
+# core/feeds.py
+import hashlib
+import secrets
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core import checks
+from django.db.models import Count, Max
+from django.utils import timezone
+from .agenda import user_timezone
+from .cache_backends import DjangoCacheBackend, LocalLRUBackend
+from .metrics import counters, ratio
+from .models import Event
+from .recurrence import RecurrenceRule
+
+# ICS subscription feed (RFC 5545). Calendar apps poll it every few minutes,
+# so the common case must be cheap:
+#   * the ETag is derived from one aggregate query (max updated_at, count)
+#     and unchanged feeds answer 304 without rendering anything;
+#   * each VEVENT is rendered once per (event, updated_at) and cached, so an
+#     edit only re-renders the events that changed;
+#   * the body is streamed in chunks instead of being built in memory.
+
+# Bump when the rendered format changes, so clients refetch
+FEED_VERSION = 2
+CHUNK_SIZE = 500
+
+
+def ensure_feed_token(user) -> str:
+    """The user's feed token, generated on first use
+
+    `user` may be a stale session-store copy, so the token is only written
+    when none exists yet and otherwise read back, never regenerated.
+    """
+    if not user.feed_token:
+        Model = type(user)
+        Model.objects.filter(pk=user.pk, feed_token__isnull=True).update(feed_token=secrets.token_urlsafe(32))
+        user.feed_token = Model.objects.filter(pk=user.pk).values_list('feed_token', flat=True).get()
+        from .session_store import get_session_store
+        get_session_store().forget_user(user.phone_number)
+    return user.feed_token
+
+
+def feed_url(user):
+    """The user's absolute feed link, or None when PUBLIC_BASE_URL is not set
+
+    Links are sent over WhatsApp, away from any request, so there is no host
+    to fall back on; a relative link would be useless to a calendar app.
+    """
+    base = getattr(settings, 'PUBLIC_BASE_URL', '').rstrip('/')
+    if not base:
+        return None
+    return f"{base}/calendar/{ensure_feed_token(user)}.ics"
+
+
+@checks.register()
+def check_public_base_url(app_configs=None, **kwargs) -> list:
+    """W002 when feed links cannot be handed out"""
+    base = getattr(settings, 'PUBLIC_BASE_URL', '')
+    if base.startswith(('https://', 'http://')):
+        return []
+    return [checks.Warning(
+        f"PUBLIC_BASE_URL is {base!r}; calendar subscription links are not handed out without an absolute URL.",
+        hint="Set PUBLIC_BASE_URL, e.g. https://isele.example.com.",
+        id='core.W002',
+    )]
+
+
+def feed_etag(user):
+    """Strong ETag for the user's feed: changes on any create, edit or delete"""
+    summary = Event.objects.filter(user=user).aggregate(last_modified=Max('updated_at'), count=Count('id'))
+    last_modified = summary['last_modified']
+    stamp = last_modified.timestamp() if last_modified else 0
+    digest = hashlib.sha1(
+        f"{FEED_VERSION}:{user.pk}:{user.timezone}:{stamp}:{summary['count']}".encode()
+    ).hexdigest()
+    return f'"{digest}"', last_modified
+
+
+def _escape(text: str) -> str:
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line: str) -> str:
+    """Fold a content line at 75 octets without splitting UTF-8 sequences"""
+    if len(line.encode()) <= 75:
+        return line + '\r\n'
+    parts, current, size = [], [], 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > (75 if not parts else 74):
+            parts.append(''.join(current))
+            current, size = [], 0
+        current.append(char)
+        size += width
+    parts.append(''.join(current))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value) -> str:
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_vevent(event, tz) -> str:
+    """One VEVENT; recurring events use local wall time so DST is respected"""
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{event.pk}@isele",
+        f"DTSTAMP:{_utc(event.updated_at)}",
+        f"LAST-MODIFIED:{_utc(event.updated_at)}",
+    ]
+    rule = None
+    if event.is_recurring and event.recurrence_pattern:
+        try:
+            rule = RecurrenceRule.parse(event.recurrence_pattern)
+        except ValueError:
+            rule = None
+
+    if rule:
+        tzid = str(tz)
+        lines.append(f"DTSTART;TZID={tzid}:{timezone.localtime(event.scheduled_time, tz):%Y%m%dT%H%M%S}")
+        until, rule.until = rule.until, None
+        rrule = str(rule)
+        if until:
+            # UNTIL must be UTC when DTSTART carries a TZID
+            rrule += f";UNTIL={_utc(until if timezone.is_aware(until) else timezone.make_aware(until, tz))}"
+        lines.append(f"RRULE:{rrule}")
+        for value in event.recurrence_exceptions or ():
+            skipped = timezone.localtime(datetime.fromisoformat(value), tz)
+            lines.append(f"EXDATE;TZID={tzid}:{skipped:%Y%m%dT%H%M%S}")
+    else:
+        lines.append(f"DTSTART:{_utc(event.scheduled_time)}")
+
+    lines.append(f"DURATION:PT{event.duration_minutes or settings.EVENT_DEFAULT_DURATION_MINUTES}M")
+    lines.append(f"SUMMARY:{_escape(event.title)}")
+    if event.location:
+        lines.append(f"LOCATION:{_escape(event.location)}")
+    if event.notes:
+        lines.append(f"DESCRIPTION:{_escape(event.notes)}")
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) for line in lines)
+
+
+def render_header(tz) -> str:
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Isele//Event Manager//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:Isele',
+        f"X-WR-TIMEZONE:{tz}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:PT{settings.FEED_MAX_AGE // 60 or 1}M",
+        f"X-PUBLISHED-TTL:PT{settings.FEED_MAX_AGE // 60 or 1}M",
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+FOOTER = 'END:VCALENDAR\r\n'
+
+
+class FeedRenderer:
+    """Renders a user's feed chunk by chunk, reusing cached VEVENT fragments"""
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def fragment_key(event_id, updated_at, tz) -> str:
+        return f"vevent:{FEED_VERSION}:{event_id}:{updated_at.timestamp()}:{tz}"
+
+    def stream(self, user):
+        tz = user_timezone(user)
+        yield render_header(tz)
+        stamps = Event.objects.filter(user=user).order_by('scheduled_time').values_list('id', 'updated_at')
+        chunk = []
+        for row in stamps.iterator(chunk_size=CHUNK_SIZE * 4):
+            chunk.append(row)
+            if len(chunk) >= CHUNK_SIZE:
+                yield self._render_chunk(chunk, tz)
+                chunk = []
+        if chunk:
+            yield self._render_chunk(chunk, tz)
+        yield FOOTER
+
+    def _render_chunk(self, rows, tz) -> str:
+        keys = {event_id: self.fragment_key(event_id, updated_at, tz) for event_id, updated_at in rows}
+        cached = self.backend.get_many(list(keys.values())) if self.backend is not None else {}
+        fragments = {event_id: cached[key] for event_id, key in keys.items() if key in cached}
+        missing = [event_id for event_id in keys if event_id not in fragments]
+        counters.incr('feed.fragment_hits', len(fragments))
+        counters.incr('feed.fragment_misses', len(missing))
+        if missing:
+            rendered = {}
+            for event in Event.objects.filter(id__in=missing):
+                # Keyed by the fetched updated_at, in case the event was edited meanwhile
+                fragment = fragments[event.pk] = render_vevent(event, tz)
+                rendered[self.fragment_key(event.pk, event.updated_at, tz)] = fragment
+            if self.backend is not None:
+                self.backend.set_many(rendered, self.ttl)
+        # Events deleted since the id query are simply left out
+        return ''.join(fragments.get(event_id, '') for event_id, _ in rows)
+
+
+def build_feed_renderer():
+    """Build the renderer selected by FEED_CACHE_BACKEND"""
+    backend = getattr(settings, 'FEED_CACHE_BACKEND', 'local')
+    ttl = getattr(settings, 'FEED_CACHE_TTL', int(timedelta(days=7).total_seconds()))
+    if backend == 'local':
+        return FeedRenderer(LocalLRUBackend(getattr(settings, 'FEED_CACHE_MAX_ENTRIES', 50000)), ttl)
+    if backend == 'django':
+        return FeedRenderer(DjangoCacheBackend(getattr(settings, 'FEED_CACHE_ALIAS', 'default')), ttl)
+    if backend == 'none':
+        return FeedRenderer(None, ttl)
+    raise ValueError(f"Unknown FEED_CACHE_BACKEND: {backend}")
+
+
+_renderer = None
+_lock = threading.Lock()
+
+
+def get_feed_renderer():
+    """Return the process-wide feed renderer"""
+    global _renderer
+    if _renderer is None:
+        with _lock:
+            if _renderer is None:
+                _renderer = build_feed_renderer()
+    return _renderer
+
+
+def stats() -> dict:
+    hits = counters.get('feed.fragment_hits')
+    misses = counters.get('feed.fragment_misses')
+    return {
+        'requests': counters.get('feed.requests'),
+        'not_modified': counters.get('feed.not_modified'),
+        'fragment_hits': hits,
+        'fragment_misses': misses,
+        'fragment_hit_rate': ratio(hits, hits + misses),
+    }
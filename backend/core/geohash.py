@@ -0,0 +1,68 @@
+# core/geohash.py
+import math
+
+# A geohash interleaves longitude and latitude bits and writes them in
+# base 32, so every prefix of a point's geohash names a map cell holding it
+# and nearby points share long prefixes. Cells of one precision tile the
+# map; a cell's events are one range of an index on the geohash column.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+KM_PER_DEGREE = 111.32
+EARTH_RADIUS_KM = 6371.0
+
+
+def encode(latitude: float, longitude: float, precision: int = 9) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    value = bits = 0
+    use_longitude = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if use_longitude else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        use_longitude = not use_longitude
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            value = bits = 0
+    return ''.join(chars)
+
+
+def cell_size(precision: int) -> tuple:
+    """(latitude, longitude) degrees spanned by a cell of `precision` characters"""
+    bits = precision * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def neighbourhood(latitude: float, longitude: float, precision: int) -> list:
+    """The cell holding the point and the (up to) eight cells around it, sorted"""
+    height, width = cell_size(precision)
+    cells = set()
+    for lat_step in (-height, 0.0, height):
+        lat = latitude + lat_step
+        if not -90.0 <= lat <= 90.0:
+            continue
+        for lon_step in (-width, 0.0, width):
+            # Across the antimeridian
+            lon = (longitude + lon_step + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def covered_km(latitude: float, precision: int) -> float:
+    """Every point this close to (latitude, ...) lies in its neighbourhood() at `precision`"""
+    height, width = cell_size(precision)
+    return min(height * KM_PER_DEGREE, width * KM_PER_DEGREE * math.cos(math.radians(latitude)))
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
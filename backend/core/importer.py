@@ -0,0 +1,328 @@
+# core/importer.py
+import csv
+import io
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .agenda import user_timezone
+from .models import Event
+from .recurrence import RecurrenceRule, exception_key
+from .signals import events_bulk_created
+
+logger = logging.getLogger(__name__)
+
+# Calendar files are read as a stream of lines: parsers are generators that
+# yield one raw record per event, normalize() validates it, and
+# CalendarImporter writes batches with bulk_create. Memory use depends on the
+# batch size, never on the size of the file.
+
+# Exchange/Outlook exports use Windows zone names
+WINDOWS_ZONES = {
+    'GMT Standard Time': 'Europe/London',
+    'W. Europe Standard Time': 'Europe/Berlin',
+    'W. Central Africa Standard Time': 'Africa/Lagos',
+    'Eastern Standard Time': 'America/New_York',
+    'Central Standard Time': 'America/Chicago',
+    'Pacific Standard Time': 'America/Los_Angeles',
+    'India Standard Time': 'Asia/Kolkata',
+    'UTC': 'UTC',
+}
+
+CSV_COLUMNS = {
+    'title': ('title', 'summary', 'subject', 'name', 'event'),
+    'start': ('start', 'start_time', 'scheduled_time', 'datetime', 'dtstart', 'when'),
+    'date': ('date', 'start_date'),
+    'time': ('time', 'start_time_of_day', 'start_time'),
+    'tzid': ('timezone', 'tz', 'time_zone'),
+    'location': ('location', 'place', 'venue'),
+    'notes': ('notes', 'description', 'details'),
+    'recurrence': ('recurrence', 'rrule', 'repeat'),
+}
+
+CSV_FORMATS = (
+    '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %I:%M %p',
+    '%m/%d/%Y %H:%M', '%m/%d/%Y %I:%M %p', '%m/%d/%Y %I:%M:%S %p',
+    '%Y-%m-%d', '%m/%d/%Y',
+)
+
+
+def text_lines(fileobj):
+    """Decode a binary or text file object lazily, line by line"""
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def detect_format(name: str = '', first_line: str = '') -> str:
+    if name.lower().endswith(('.ics', '.ical', '.ifb')) or first_line.strip().upper().startswith('BEGIN:VCALENDAR'):
+        return 'ics'
+    return 'csv'
+
+
+def _unfolded(lines):
+    """RFC 5545 line unfolding: continuation lines start with a space or tab"""
+    current = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _split_property(line: str):
+    """'DTSTART;TZID=Africa/Lagos:20250101T090000' -> ('DTSTART', {'TZID': ...}, value)"""
+    in_quotes = False
+    for i, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ':' and not in_quotes:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        return None, {}, ''
+    name, *raw_params = head.split(';')
+    params = {}
+    for param in raw_params:
+        key, _, param_value = param.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def _unescape(value: str) -> str:
+    return (value.replace('\\n', '\n').replace('\\N', '\n')
+            .replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\'))
+
+
+def iter_ics(lines):
+    """Yield one raw record per VEVENT; nested components (VALARM) are skipped"""
+    record = None
+    nested = 0
+    line_no = 0
+    for line in _unfolded(lines):
+        line_no += 1
+        name, params, value = _split_property(line)
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT':
+                record = {'line': line_no, 'exdates': []}
+            elif record is not None:
+                nested += 1
+            continue
+        if name == 'END':
+            if value.upper() == 'VEVENT' and record is not None:
+                yield record
+                record = None
+                nested = 0
+            elif record is not None and nested:
+                nested -= 1
+            continue
+        if record is None or nested:
+            continue
+
+        if name == 'SUMMARY':
+            record['title'] = _unescape(value)
+        elif name == 'DTSTART':
+            record['start'] = value
+            record['tzid'] = params.get('TZID')
+        elif name == 'LOCATION':
+            record['location'] = _unescape(value)
+        elif name == 'DESCRIPTION':
+            record['notes'] = _unescape(value)
+        elif name == 'RRULE':
+            record['recurrence'] = value
+        elif name == 'EXDATE':
+            record['exdates'].extend((item, params.get('TZID')) for item in value.split(',') if item)
+        elif name == 'STATUS':
+            record['cancelled'] = value.upper() == 'CANCELLED'
+
+
+def iter_csv(lines):
+    """Yield one raw record per CSV row, mapping common header names"""
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames:
+        return
+    header = {field.strip().lower().replace(' ', '_'): field for field in reader.fieldnames}
+    columns = {
+        key: next((header[alias] for alias in aliases if alias in header), None)
+        for key, aliases in CSV_COLUMNS.items()
+    }
+    for row in reader:
+        def get(key):
+            column = columns[key]
+            value = row.get(column) if column else None
+            return value.strip() if value else None
+
+        start = get('start')
+        if columns['date'] and get('date'):
+            start = f"{get('date')} {get('time') or ''}".strip()
+        yield {
+            'line': reader.line_num,
+            'title': get('title'),
+            'start': start,
+            'tzid': get('tzid'),
+            'location': get('location'),
+            'notes': get('notes'),
+            'recurrence': get('recurrence'),
+            'exdates': [],
+        }
+
+
+def resolve_timezone(tzid, default):
+    """ZoneInfo for an IANA or Windows zone name; the default when unknown or empty"""
+    if not tzid:
+        return default
+    try:
+        return ZoneInfo(WINDOWS_ZONES.get(tzid, tzid))
+    except (ZoneInfoNotFoundError, ValueError):
+        return default
+
+
+def _parse_ics_datetime(value: str, tz):
+    value = value.strip()
+    if len(value) == 8:
+        return timezone.make_aware(datetime.strptime(value, '%Y%m%d'), tz)
+    if value.endswith('Z'):
+        return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=ZoneInfo('UTC'))
+    return timezone.make_aware(datetime.strptime(value, '%Y%m%dT%H%M%S'), tz)
+
+
+def _parse_csv_datetime(value: str, tz):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        for fmt in CSV_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"unrecognised date/time {value!r}")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, tz)
+
+
+def normalize(raw: dict, default_tz, source: str = 'ics') -> dict:
+    """Validate a raw record into Event field values; raises ValueError when unusable"""
+    if raw.get('cancelled'):
+        raise ValueError("cancelled event")
+    title = (raw.get('title') or '').strip()
+    if not title:
+        raise ValueError("missing title")
+    if not raw.get('start'):
+        raise ValueError("missing start time")
+
+    tz = resolve_timezone(raw.get('tzid'), default_tz)
+    parse = _parse_ics_datetime if source == 'ics' else _parse_csv_datetime
+    # In UTC: local times in a DST fold or gap never compare equal across zones,
+    # which would defeat the duplicate check against rows read back from the database
+    scheduled_time = parse(raw['start'], tz).astimezone(dt_timezone.utc)
+
+    recurrence = None
+    if raw.get('recurrence'):
+        try:
+            recurrence = str(RecurrenceRule.parse(raw['recurrence']))
+        except ValueError as e:
+            # Importing only the first date would quietly lose the rest of the series
+            raise ValueError(f"unsupported recurrence {raw['recurrence']!r}: {e}")
+    exceptions = None
+    if recurrence and raw.get('exdates'):
+        exceptions = [
+            exception_key(_parse_ics_datetime(value, resolve_timezone(tzid, tz)))
+            for value, tzid in raw['exdates']
+        ]
+
+    location = (raw.get('location') or '').strip() or None
+    return {
+        'title': title[:255],
+        'scheduled_time': scheduled_time,
+        'location': location[:255] if location else None,
+        'notes': raw.get('notes') or '',
+        'is_recurring': bool(recurrence),
+        'recurrence_pattern': recurrence,
+        'recurrence_exceptions': exceptions,
+    }
+
+
+class CalendarImporter:
+    """Streams raw records into Event rows in batches, skipping duplicates
+
+    A record duplicates an event when the user already has one with the same
+    title at the same time. Each batch is checked against the database (an
+    indexed lookup on (user, scheduled_time)) and written in one transaction,
+    so earlier batches of the same file are caught too.
+    """
+
+    MAX_ERRORS_REPORTED = 20
+
+    def __init__(self, user, batch_size: int = None, default_tz=None):
+        self.user = user
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.default_tz = default_tz or user_timezone(user)
+
+    def run(self, raw_records, source: str = 'ics') -> dict:
+        result = {'created': 0, 'duplicates': 0, 'invalid': 0, 'errors': [], 'seconds': 0.0}
+        started = time.perf_counter()
+        batch = []
+        for raw in raw_records:
+            try:
+                batch.append(normalize(raw, self.default_tz, source))
+            except ValueError as e:
+                result['invalid'] += 1
+                if len(result['errors']) < self.MAX_ERRORS_REPORTED:
+                    result['errors'].append(f"line {raw.get('line')}: {e}")
+                continue
+            if len(batch) >= self.batch_size:
+                self._write(batch, result)
+                batch = []
+        if batch:
+            self._write(batch, result)
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    def _write(self, batch, result):
+        with transaction.atomic():
+            existing = set(Event.objects.filter(
+                user=self.user, scheduled_time__in={fields['scheduled_time'] for fields in batch},
+            ).values_list('title', 'scheduled_time'))
+            events = []
+            for fields in batch:
+                key = (fields['title'], fields['scheduled_time'])
+                if key in existing:
+                    result['duplicates'] += 1
+                    continue
+                existing.add(key)
+                events.append(Event(user=self.user, **fields))
+            created = Event.objects.bulk_create(events, batch_size=self.batch_size)
+        result['created'] += len(created)
+        if created:
+            # bulk_create sends no post_save
+            events_bulk_created.send(sender=Event, user=self.user, events=created)
+
+
+def import_calendar(user, fileobj, name: str = '', fmt: str = None, batch_size: int = None, default_tz=None) -> dict:
+    """Import an .ics or CSV file object for a user; returns counts"""
+    lines = iter(text_lines(fileobj))
+    first_line = next(lines, '')
+    fmt = fmt or detect_format(name, first_line)
+    stream = _chain_first(first_line, lines)
+    records = iter_ics(stream) if fmt == 'ics' else iter_csv(stream)
+    result = CalendarImporter(user, batch_size, default_tz).run(records, source=fmt)
+    logger.info(f"Imported {result['created']} event(s) for {user.phone_number} "
+                f"({result['duplicates']} duplicate, {result['invalid']} invalid) in {result['seconds']:.1f}s")
+    return result
+
+
+def _chain_first(first_line, lines):
+    if first_line:
+        yield first_line
+    yield from lines
@@ -0,0 +1,109 @@
+# core/intent_router.py
+import re
+
+# Intent names returned by classify()
+MENU = 'menu'
+EVENTS = 'events'
+TODAY = 'today'
+CANCEL = 'cancel'
+SUBSCRIBE = 'subscribe'
+FREE = 'free'
+SEARCH = 'search'
+NEARBY = 'nearby'
+CREATE = 'create'
+UNKNOWN = 'unknown'
+
+# Whole-message commands, matched by a dict lookup before anything else
+EXACT_COMMANDS = {
+    'hi': MENU, 'hello': MENU, 'hey': MENU, 'start': MENU, 'help': MENU, 'menu': MENU,
+    'schedule': EVENTS,
+    'subscribe': SUBSCRIBE, 'feed': SUBSCRIBE, 'calendar link': SUBSCRIBE,
+    'free': FREE, 'availability': FREE, 'free time': FREE,
+    'nearby': NEARBY, "what's on": NEARBY, 'whats on': NEARBY,
+}
+
+# Declarative intent table, in priority order: when a message matches several
+# rows, the first row wins. Phrases match whole tokens, so 'at' no longer fires
+# on "chat" and 'may' no longer fires on "maybe". <num> is a 1-2 digit number
+# (ordinals included) and <clock> a token such as 3pm, 3:30pm or 10:30.
+#   (intent, row name, phrases, minimum words in the message)
+INTENT_TABLE = [
+    # Ahead of 'today' and the date rows: "am I free tomorrow?" is a question, not an event
+    (FREE, 'free', ['am i free', 'when am i free', 'free time', 'free slots', 'availability',
+                    'am i available', 'am i busy'], 1),
+    # Questions about one event, ahead of 'appointment' and 'meeting' in the create row
+    (SEARCH, 'search', ['when is my', "when's my", 'whens my', 'when was my', 'where is my', "where's my",
+                        'what time is my', 'find my', 'search', 'look up'], 1),
+    # Public happenings, ahead of 'events' so "events near me" is not the user's own list
+    (NEARBY, 'nearby', ['near me', 'nearby', 'around me', 'near here', "what's on near", 'whats on near',
+                        'happening near', 'things to do', 'local events', 'events near'], 1),
+    (EVENTS, 'events', ['events', 'upcoming', 'my schedule', 'plans', 'what do i have'], 1),
+    (TODAY, 'today', ['today', "today's", 'todays', 'agenda'], 1),
+    (CANCEL, 'cancel', ['cancel', 'clear', 'stop'], 1),
+    (SUBSCRIBE, 'subscribe', ['subscribe', 'calendar link', 'calendar feed', 'ics'], 1),
+    (CREATE, 'create', ['create', 'schedule', 'appointment', 'meeting', 'remind', 'set up'], 1),
+    # Time/date references only count as event creation in longer messages
+    (CREATE, 'time', ['<clock>', '<num> am', '<num> pm', '<num> a.m', '<num> p.m', 'at <num>'], 3),
+    (CREATE, 'date', [
+        'tomorrow', 'tonight', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+        'saturday', 'sunday', 'week', 'month', 'year', 'morning', 'afternoon', 'evening',
+        'night', 'january', 'february', 'march', 'april', 'june', 'july', 'august',
+        'september', 'october', 'november', 'december', 'may <num>', '<num> may', '<num> of may',
+    ], 3),
+]
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[':.][a-z0-9]+)*")
+NUM_RE = re.compile(r'\d{1,2}(?:st|nd|rd|th)?$')
+CLOCK_RE = re.compile(r'\d{1,2}(?::\d{2})?(?:am|pm|a\.m|p\.m)$|\d{1,2}:\d{2}$')
+
+
+def _compile(table):
+    """Fold the table into a first-token trie: token -> [(remaining tokens, row)]"""
+    trie = {}
+    for _intent, row, phrases, _min_words in table:
+        for phrase in phrases:
+            first, *rest = phrase.split()
+            trie.setdefault(first, []).append((tuple(rest), row))
+    for candidates in trie.values():
+        # Highest priority row first, then longest phrase
+        candidates.sort(key=lambda candidate: (_PRIORITY[candidate[1]], -len(candidate[0])))
+    return trie
+
+
+_PRIORITY = {row: index for index, (_i, row, _p, _w) in enumerate(INTENT_TABLE)}
+_ROWS = {row: (intent, min_words) for intent, row, _p, min_words in INTENT_TABLE}
+INTENT_TRIE = _compile(INTENT_TABLE)
+
+
+def _token_key(token: str) -> str:
+    if token[0].isdigit():
+        if CLOCK_RE.match(token):
+            return '<clock>'
+        if NUM_RE.match(token):
+            return '<num>'
+    return token
+
+
+def classify(message: str) -> str:
+    """Classify a message in a single pass over its tokens with deterministic priority"""
+    message_lower = message.lower().strip()
+    command = EXACT_COMMANDS.get(message_lower.rstrip('?!. '))
+    if command:
+        return command
+
+    word_count = len(message_lower.split())
+    keys = [_token_key(token) for token in TOKEN_RE.findall(message_lower)]
+    best = None
+    for i, key in enumerate(keys):
+        for rest, row in INTENT_TRIE.get(key, ()):
+            if rest and tuple(keys[i + 1:i + 1 + len(rest)]) != rest:
+                continue
+            if word_count < _ROWS[row][1]:
+                continue
+            if best is None or _PRIORITY[row] < _PRIORITY[best]:
+                best = row
+            break
+        if best is not None and _PRIORITY[best] == 0:
+            break
+
+    return _ROWS[best][0] if best else UNKNOWN
@@ -0,0 +1,235 @@
+# core/interval_index.py
+import bisect
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from .agenda import occurrences_between, user_timezone
+from .cache_backends import LocalLRUBackend
+from .metrics import counters, ratio
+from .models import Event, EventOccurrence
+from .occurrences import ensure_materialized, occurrence_window
+from .recurrence import iter_occurrences
+
+# Busy time of one user, for overlap warnings and "when am I free?". An
+# index holds (start, end, event_id, title) tuples sorted by start, with
+# times as POSIX timestamps, for one-off events and recurring occurrences
+# alike. The cached index spans the occurrence window (yesterday ..
+# OCCURRENCE_WINDOW_DAYS ahead); it is built on first use (new users start
+# with an empty one) and patched in place by core.signals when one of the
+# user's events is saved or deleted.
+# Ranges outside the window get a throwaway index built for that range.
+
+# Events are assumed to be shorter than this: a throwaway index also loads
+# events that started this long before its range
+LOOKBACK = timedelta(days=1)
+
+
+def event_duration(event) -> timedelta:
+    return timedelta(minutes=event.duration_minutes or settings.EVENT_DEFAULT_DURATION_MINUTES)
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc)
+
+
+class IntervalIndex:
+    """Sorted busy intervals over [start, end)
+
+    No interval is longer than `max_length` seconds, so only intervals
+    starting in (start - max_length, end) can overlap a query range: overlap
+    and gap queries bisect to that run instead of scanning, O(log n + k).
+    """
+
+    def __init__(self, start: datetime, end: datetime, intervals=()):
+        self.start = start.timestamp()
+        self.end = end.timestamp()
+        self._items = sorted(intervals)
+        self.max_length = max((item[1] - item[0] for item in self._items), default=0.0)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return self.start <= start.timestamp() and end.timestamp() <= self.end
+
+    def add(self, start: float, end: float, event_id, title: str):
+        with self._lock:
+            bisect.insort(self._items, (start, end, event_id, title))
+            self.max_length = max(self.max_length, end - start)
+
+    def remove_event(self, event_id):
+        with self._lock:
+            self._items = [item for item in self._items if item[2] != event_id]
+
+    def _candidates(self, start: float, end: float) -> list:
+        with self._lock:
+            items = self._items
+            lo = bisect.bisect_left(items, (start - self.max_length,))
+            hi = bisect.bisect_left(items, (end,), lo)
+            return items[lo:hi]
+
+    def overlapping(self, start: datetime, end: datetime) -> list:
+        """(start, end, event_id, title) of the intervals overlapping [start, end), aware UTC times"""
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        return [(_utc(s), _utc(e), event_id, title)
+                for s, e, event_id, title in self._candidates(start_ts, end_ts) if e > start_ts]
+
+    def free_slots(self, start: datetime, end: datetime, min_length: timedelta) -> list:
+        """(start, end) gaps of at least `min_length` in [start, end), aware UTC times"""
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        shortest = min_length.total_seconds()
+        slots = []
+        cursor = start_ts
+        for s, e, _event_id, _title in self._candidates(start_ts, end_ts):
+            if s - cursor >= shortest:
+                slots.append((cursor, s))
+            cursor = max(cursor, e)
+            if cursor >= end_ts:
+                break
+        if end_ts - cursor >= shortest:
+            slots.append((cursor, end_ts))
+        return [(_utc(s), _utc(e)) for s, e in slots]
+
+
+def event_intervals(event, start: datetime, end: datetime, tz=None):
+    """Index entries for `event`'s occurrences starting in [start, end)"""
+    length = event_duration(event).total_seconds()
+    for starts_at in iter_occurrences(event, start, end, tz):
+        yield (starts_at.timestamp(), starts_at.timestamp() + length, event.pk, event.title)
+
+
+def _window_rows(user, start: datetime, end: datetime):
+    """(start, duration_minutes, event_id, title) of one-offs and materialized occurrences, in one query"""
+    one_offs = Event.objects.filter(
+        user=user, is_recurring=False, scheduled_time__gte=start, scheduled_time__lt=end,
+    ).order_by().values_list('scheduled_time', 'duration_minutes', 'id', 'title')
+    recurring = EventOccurrence.objects.filter(
+        user=user, starts_at__gte=start, starts_at__lt=end,
+    ).order_by().values_list('starts_at', 'event__duration_minutes', 'event_id', 'event__title')
+    return one_offs.union(recurring, all=True)
+
+
+def build_index(user, start: datetime, end: datetime, now=None) -> IntervalIndex:
+    """Two queries inside the hot window; lazy series expansion outside it"""
+    counters.incr('interval_index.builds')
+    if start >= occurrence_window(now)[0] and ensure_materialized(user, end, now):
+        rows = _window_rows(user, start, end)
+    else:
+        rows = ((occurrence.start, occurrence.event.duration_minutes, occurrence.event.pk, occurrence.event.title)
+                for occurrence in occurrences_between(user, start, end, now))
+    default = settings.EVENT_DEFAULT_DURATION_MINUTES
+    intervals = []
+    for starts_at, minutes, event_id, title in rows:
+        starts_at = starts_at.timestamp()
+        intervals.append((starts_at, starts_at + (minutes or default) * 60, event_id, title))
+    return IntervalIndex(start, end, intervals)
+
+
+class _NoCache:
+    """INTERVAL_INDEX_BACKEND = 'none': build for every query"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+
+class IntervalIndexes:
+    """The per-user IntervalIndex cache"""
+
+    def __init__(self, backend, ttl: float = 600):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(user_id) -> str:
+        return f"intervals:{user_id}"
+
+    def get(self, user, start: datetime, end: datetime, now=None) -> IntervalIndex:
+        """An index covering [start, end): the cached one when the range lies in the window"""
+        key = self.make_key(user.pk)
+        index = self.backend.get(key)
+        if index is not None and index.covers(start, end):
+            counters.incr('interval_index.hits')
+            return index
+        window_start, window_end = occurrence_window(now)
+        if not (window_start <= start and end <= window_end):
+            counters.incr('interval_index.uncached')
+            return build_index(user, start - LOOKBACK, end, now)
+        counters.incr('interval_index.misses')
+        index = build_index(user, window_start, window_end, now)
+        self.backend.set(key, index, self.ttl)
+        return index
+
+    def conflicts(self, user, event) -> list:
+        """Other events overlapping `event`'s (first) occurrence"""
+        start = event.scheduled_time
+        end = start + event_duration(event)
+        found = [item for item in self.get(user, start, end).overlapping(start, end) if item[2] != event.pk]
+        if found:
+            counters.incr('interval_index.conflicts')
+        return found
+
+    def free_slots(self, user, start: datetime, end: datetime, min_length: timedelta) -> list:
+        return self.get(user, start, end).free_slots(start, end, min_length)
+
+    def user_created(self, user_id, now=None):
+        """A new user has no events yet: cache an empty index instead of building one"""
+        self.backend.set(self.make_key(user_id), IntervalIndex(*occurrence_window(now)), self.ttl)
+
+    def event_saved(self, event, tz=None):
+        """Replace `event`'s entries in its owner's cached index, if there is one"""
+        index = self.backend.get(self.make_key(event.user_id))
+        if index is None:
+            return
+        index.remove_event(event.pk)
+        tz = tz or user_timezone(event.user)
+        for interval in event_intervals(event, _utc(index.start), _utc(index.end), tz):
+            index.add(*interval)
+        counters.incr('interval_index.updates')
+
+    def event_deleted(self, event):
+        index = self.backend.get(self.make_key(event.user_id))
+        if index is not None:
+            index.remove_event(event.pk)
+            counters.incr('interval_index.updates')
+
+
+def build_interval_indexes():
+    backend = getattr(settings, 'INTERVAL_INDEX_BACKEND', 'local')
+    ttl = getattr(settings, 'INTERVAL_INDEX_TTL', 600)
+    if backend == 'local':
+        return IntervalIndexes(LocalLRUBackend(getattr(settings, 'INTERVAL_INDEX_MAX_USERS', 10000)), ttl)
+    if backend == 'none':
+        return IntervalIndexes(_NoCache(), ttl)
+    raise ValueError(f"Unknown INTERVAL_INDEX_BACKEND: {backend}")
+
+
+_interval_indexes = None
+_lock = threading.Lock()
+
+
+def get_interval_indexes():
+    """Return the process-wide interval index cache"""
+    global _interval_indexes
+    if _interval_indexes is None:
+        with _lock:
+            if _interval_indexes is None:
+                _interval_indexes = build_interval_indexes()
+    return _interval_indexes
+
+
+def stats() -> dict:
+    hits = counters.get('interval_index.hits')
+    misses = counters.get('interval_index.misses')
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': ratio(hits, hits + misses),
+        'uncached': counters.get('interval_index.uncached'),
+        'builds': counters.get('interval_index.builds'),
+        'updates': counters.get('interval_index.updates'),
+        'conflicts': counters.get('interval_index.conflicts'),
+    }
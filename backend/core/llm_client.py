@@ -0,0 +1,281 @@
+# core/llm_client.py
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from .metrics import counters
+
+logger = logging.getLogger(__name__)
+
+# Keeps a slow or failing Gemini from tying up webhook workers. Every call
+# gets a deadline, the number of calls in flight is capped process-wide, and
+# a circuit breaker stops calling a backend that keeps failing. Callers see
+# LLMUnavailable and answer from the fast-path parser or ask the user to
+# rephrase instead of waiting.
+
+
+class LLMUnavailable(Exception):
+    """The call was rejected or did not finish in time; `reason` says why"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures
+
+    While open, calls are refused for `reset_timeout` seconds; then a single
+    trial call is let through (half-open) and its outcome closes or reopens
+    the breaker. `clock` returns seconds (time.monotonic; tests pass a fake).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and self.clock() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            # Open, or half-open with the trial call still running
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open':
+                    counters.incr('llm.breaker_opened')
+                    logger.warning("LLM circuit breaker opened after %d failures", self._failures)
+                self.state = 'open'
+                self._opened_at = self.clock()
+
+
+class GuardedLLMClient:
+    """Runs blocking LLM calls with a deadline, an in-flight cap, a breaker and optional hedging
+
+    A call that overruns its deadline is abandoned, not interrupted: it keeps
+    its in-flight slot until the underlying HTTP request returns, so the cap
+    bounds real load on the backend. With `hedge_after` set, a call still
+    running after that many seconds gets a duplicate request, and whichever
+    answers first wins.
+
+    acall() is the asyncio counterpart for coroutine functions such as the
+    Gemini client's `aio` methods. An awaiting call holds no thread, so it
+    has its own, much larger cap (`max_in_flight_async`); the breaker is
+    shared.
+    """
+
+    def __init__(self, timeout: float = 10.0, max_in_flight: int = 16, breaker: CircuitBreaker = None,
+                 hedge_after: float = 0.0, max_in_flight_async: int = 1000):
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        # Never blocked on, so it is safe to share between event loops
+        self._async_slots = threading.BoundedSemaphore(max_in_flight_async)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='llm')
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs) within the deadline, or raise LLMUnavailable"""
+        # Saturation is load shedding, not a backend failure: check it before the breaker
+        if not self._slots.acquire(blocking=False):
+            counters.incr('llm.rejected_saturated')
+            raise LLMUnavailable('saturated')
+        if not self.breaker.allow():
+            self._slots.release()
+            counters.incr('llm.rejected_open')
+            raise LLMUnavailable('circuit open')
+
+        started = time.monotonic()
+        deadline = started + self.timeout
+        hedge_at = started + self.hedge_after if self.hedge_after else None
+        pending = {self._submit(fn, args, kwargs)}
+        hedge = None
+        error = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake = min(deadline, hedge_at) if hedge_at else deadline
+            done, pending = wait(pending, timeout=wake - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.breaker.record_success()
+                    if future is hedge:
+                        counters.incr('llm.hedge_wins')
+                    return future.result()
+                error = future.exception()
+            if hedge_at and pending and time.monotonic() >= hedge_at:
+                hedge_at = None
+                # Hedges only use spare capacity
+                if self._slots.acquire(blocking=False):
+                    counters.incr('llm.hedges')
+                    hedge = self._submit(fn, args, kwargs)
+                    pending.add(hedge)
+
+        self.breaker.record_failure()
+        if pending:
+            counters.incr('llm.timeouts')
+            raise LLMUnavailable('timeout')
+        counters.incr('llm.errors')
+        raise LLMUnavailable(f"error: {error}") from error
+
+    def _submit(self, fn, args, kwargs):
+        """Run on the pool; the caller already holds a slot, released when the call ends"""
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def acall(self, fn, *args, **kwargs):
+        """await fn(*args, **kwargs) within the deadline, or raise LLMUnavailable
+
+        Unlike call(), an overrun is cancelled rather than abandoned, which
+        closes its HTTP request and frees its slot at once.
+        """
+        if not self._async_slots.acquire(blocking=False):
+            counters.incr('llm.rejected_saturated')
+            raise LLMUnavailable('saturated')
+        if not self.breaker.allow():
+            self._async_slots.release()
+            counters.incr('llm.rejected_open')
+            raise LLMUnavailable('circuit open')
+
+        started = time.monotonic()
+        deadline = started + self.timeout
+        hedge_at = started + self.hedge_after if self.hedge_after else None
+        pending = {self._spawn(fn, args, kwargs)}
+        hedge = None
+        error = None
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                wake = min(deadline, hedge_at) if hedge_at else deadline
+                done, pending = await asyncio.wait(pending, timeout=wake - now, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.breaker.record_success()
+                        if task is hedge:
+                            counters.incr('llm.hedge_wins')
+                        return task.result()
+                    error = task.exception()
+                if hedge_at and pending and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    if self._async_slots.acquire(blocking=False):
+                        counters.incr('llm.hedges')
+                        hedge = self._spawn(fn, args, kwargs)
+                        pending.add(hedge)
+        except asyncio.CancelledError:
+            # The caller went away; a half-open trial must still settle the breaker
+            if self.breaker.state == 'half_open':
+                self.breaker.record_failure()
+            raise
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self.breaker.record_failure()
+        if pending:
+            counters.incr('llm.timeouts')
+            raise LLMUnavailable('timeout')
+        counters.incr('llm.errors')
+        raise LLMUnavailable(f"error: {error}") from error
+
+    def _spawn(self, fn, args, kwargs):
+        """Start fn as a task; the caller already holds an async slot, released when it ends"""
+        try:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+        except Exception:
+            self._async_slots.release()
+            raise
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self._async_slots.release()
+        # Losing hedges and cancelled calls are not awaited; mark their errors as seen
+        if not task.cancelled():
+            task.exception()
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait)
+
+
+def build_llm_client():
+    return GuardedLLMClient(
+        timeout=getattr(settings, 'LLM_TIMEOUT', 10.0),
+        max_in_flight=getattr(settings, 'LLM_MAX_IN_FLIGHT', 16),
+        breaker=CircuitBreaker(
+            failure_threshold=getattr(settings, 'LLM_BREAKER_FAILURES', 5),
+            reset_timeout=getattr(settings, 'LLM_BREAKER_RESET_SECONDS', 30.0),
+        ),
+        hedge_after=getattr(settings, 'LLM_HEDGE_AFTER', 0.0),
+        max_in_flight_async=getattr(settings, 'LLM_MAX_IN_FLIGHT_ASYNC', 1000),
+    )
+
+
+_llm_client = None
+_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the process-wide guard shared by every EventAIService"""
+    global _llm_client
+    if _llm_client is None:
+        with _lock:
+            if _llm_client is None:
+                _llm_client = build_llm_client()
+    return _llm_client
+
+
+def _after_fork():
+    # Pool threads do not survive fork; children build their own guard
+    global _llm_client, _lock
+    _lock = threading.Lock()
+    _llm_client = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def stats() -> dict:
+    client = _llm_client
+    return {
+        'state': client.breaker.state if client else 'closed',
+        'calls': counters.get('llm.calls'),
+        'timeouts': counters.get('llm.timeouts'),
+        'errors': counters.get('llm.errors'),
+        'rejected_saturated': counters.get('llm.rejected_saturated'),
+        'rejected_open': counters.get('llm.rejected_open'),
+        'breaker_opened': counters.get('llm.breaker_opened'),
+        'hedges': counters.get('llm.hedges'),
+        'hedge_wins': counters.get('llm.hedge_wins'),
+        'fallbacks': counters.get('llm.fallbacks'),
+        'parse_failures': counters.get('llm.parse_failures'),
+        'prompt_tokens': counters.get('llm.prompt_tokens'),
+        'output_tokens': counters.get('llm.output_tokens'),
+        'thinking_tokens': counters.get('llm.thinking_tokens'),
+    }
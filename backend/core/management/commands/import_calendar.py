@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import import_calendar, resolve_timezone
+from core.models import EventManagerUser
+
+
+class Command(BaseCommand):
+    help = "Import events from an .ics or CSV file into a user's calendar"
+
+    def add_arguments(self, parser):
+        parser.add_argument('phone_number', help="The user's phone number, e.g. +2348012345678")
+        parser.add_argument('path', help="Path to the .ics or .csv file")
+        parser.add_argument('--format', choices=['ics', 'csv'], default=None,
+                            help="File format (detected from the name or contents by default)")
+        parser.add_argument('--timezone', default=None,
+                            help="Zone for times without one (defaults to the user's timezone)")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--create-user', action='store_true',
+                            help="Create the user if the phone number is unknown")
+
+    def handle(self, *args, **options):
+        phone_number = options['phone_number']
+        if options['create_user']:
+            user, _ = EventManagerUser.objects.get_or_create(phone_number=phone_number)
+        else:
+            user = EventManagerUser.objects.filter(phone_number=phone_number).first()
+            if user is None:
+                raise CommandError(f"No user with phone number {phone_number} (use --create-user)")
+
+        default_tz = resolve_timezone(options['timezone'], None) if options['timezone'] else None
+        if options['timezone'] and default_tz is None:
+            raise CommandError(f"Unknown timezone: {options['timezone']}")
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = import_calendar(user, fileobj, name=options['path'], fmt=options['format'],
+                                         batch_size=options['batch_size'], default_tz=default_tz)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(f"  skipped {error}")
+        rate = result['created'] / result['seconds'] if result['seconds'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} event(s), {result['duplicates']} duplicate(s), "
+            f"{result['invalid']} invalid, in {result['seconds']:.1f}s ({rate:,.0f} events/s)"
+        ))
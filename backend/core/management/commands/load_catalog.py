@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.catalog import load_catalog, prune_catalog
+from core.importer import resolve_timezone
+
+
+class Command(BaseCommand):
+    help = "Load public events for \"what's on near me\" from a CSV or JSON-lines feed file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to the .csv or .jsonl file")
+        parser.add_argument('--source', default=None,
+                            help="Feed name; rows are matched by (source, id) on reload (defaults to the file name)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help="File format (detected from the name or contents by default)")
+        parser.add_argument('--timezone', default=None,
+                            help="Zone for times without one (defaults to TIME_ZONE)")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--prune', action='store_true', help="Also delete happenings that are over")
+
+    def handle(self, *args, **options):
+        default_tz = resolve_timezone(options['timezone'], None) if options['timezone'] else None
+        if options['timezone'] and default_tz is None:
+            raise CommandError(f"Unknown timezone: {options['timezone']}")
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = load_catalog(fileobj, name=options['path'], source=options['source'],
+                                      fmt=options['format'], batch_size=options['batch_size'], default_tz=default_tz)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(f"  skipped {error}")
+        rate = result['loaded'] / result['seconds'] if result['seconds'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {result['loaded']} event(s), {result['invalid']} invalid, "
+            f"in {result['seconds']:.1f}s ({rate:,.0f} events/s)"
+        ))
+        if options['prune']:
+            self.stdout.write(f"Pruned {prune_catalog()} past event(s)")
@@ -0,0 +1,28 @@
+import importlib
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import search
+
+# The SQL of migration 0008, so the rebuilt index matches a migrated one
+search_migration = importlib.import_module('core.migrations.0008_event_search')
+
+
+class Command(BaseCommand):
+    help = "Recreate the full-text search index over events and its sync triggers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        connection = connections[alias]
+        with connection.schema_editor() as schema_editor:
+            search_migration.drop_search_index(None, schema_editor)
+            search_migration.create_search_index(None, schema_editor)
+        search._fulltext.pop(alias, None)
+        if search.fulltext_available(alias):
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt the full-text index on '{alias}'"))
+        else:
+            self.stdout.write(self.style.WARNING(f"No full-text index on '{alias}': search scans events"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.occurrences import refresh_window
+
+
+class Command(BaseCommand):
+    help = "Roll the materialized recurring-event occurrence window forward (run daily)"
+
+    def handle(self, *args, **options):
+        refreshed, expired = refresh_window()
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {refreshed} recurring series, removed {expired} expired occurrence(s)"
+        ))
@@ -0,0 +1,46 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+
+from core.message_queue import MessageWorkerPool, build_queue_backend
+from core.views import handle_queued_message
+
+
+class Command(BaseCommand):
+    help = "Run background workers that process queued WhatsApp messages and reply via Twilio"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.MESSAGE_WORKER_CONCURRENCY,
+            help="Number of worker threads",
+        )
+
+    def handle(self, *args, **options):
+        if settings.MESSAGE_QUEUE_BACKEND == 'memory':
+            raise CommandError(
+                "The in-process queue cannot be shared with a separate worker process; "
+                "set MESSAGE_QUEUE_BACKEND=sqlite"
+            )
+
+        backend = build_queue_backend()
+        if hasattr(backend, 'requeue_stale'):
+            requeued = backend.requeue_stale()
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        pool = MessageWorkerPool(backend, handle_queued_message, concurrency=options['concurrency'])
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        pool.start()
+        self.stdout.write(self.style.SUCCESS(
+            f"Processing {settings.MESSAGE_QUEUE_BACKEND} queue with {options['concurrency']} worker(s)"
+        ))
+        try:
+            stop.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.stop()
@@ -0,0 +1,36 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.outbound import OutboundSender
+from core.reminders import ReminderDispatcher
+
+
+class Command(BaseCommand):
+    help = "Run the long-lived reminder dispatcher that messages users when their events are due"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.REMINDER_SEND_CONCURRENCY,
+                            help="Concurrent Twilio sends")
+        parser.add_argument('--rate', type=float, default=settings.REMINDER_RATE_PER_SECOND,
+                            help="Maximum messages per second per sender number")
+        parser.add_argument('--refresh-interval', type=float, default=5,
+                            help="Seconds between incremental refreshes from the database")
+
+    def handle(self, *args, **options):
+        sender = OutboundSender(max_workers=options['concurrency'], rate_per_second=options['rate'])
+        dispatcher = ReminderDispatcher(sender)
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dispatching reminders ({options['concurrency']} senders, {options['rate']:g} msg/s)"
+        ))
+        try:
+            dispatcher.run(stop, refresh_interval=options['refresh_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sender.shutdown()
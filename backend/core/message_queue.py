@@ -0,0 +1,206 @@
+# core/message_queue.py
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessQueue:
+    """FIFO job queue living inside the web process (local testing / single box)"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def put(self, job: dict):
+        self._queue.put(job)
+
+    def get(self, timeout: float = None):
+        """Return the next job, or None if nothing arrived within timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def ack(self, job: dict):
+        self._queue.task_done()
+
+    def __len__(self):
+        return self._queue.qsize()
+
+
+class SQLiteQueue:
+    """Durable job queue in a SQLite file, shared between web and worker processes"""
+
+    def __init__(self, path, poll_interval: float = 0.05):
+        self.path = str(path)
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS message_jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " created_at REAL NOT NULL,"
+            " claimed_at REAL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS message_jobs_status_id ON message_jobs (status, id)"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: we issue BEGIN IMMEDIATE ourselves when claiming
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, job: dict):
+        self._connection().execute(
+            "INSERT INTO message_jobs (payload, created_at) VALUES (?, ?)",
+            (json.dumps(job), time.time()),
+        )
+
+    def get(self, timeout: float = None):
+        """Claim the oldest pending job, polling until timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        conn = self._connection()
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id, payload FROM message_jobs WHERE status = 'pending' ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE message_jobs SET status = 'processing', claimed_at = ? WHERE id = ?",
+                        (time.time(), row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            if row:
+                job = json.loads(row[1])
+                job['_queue_id'] = row[0]
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def ack(self, job: dict):
+        self._connection().execute("DELETE FROM message_jobs WHERE id = ?", (job['_queue_id'],))
+
+    def requeue_stale(self, older_than: float = 300):
+        """Return jobs claimed by a worker that died back to the pending state"""
+        cursor = self._connection().execute(
+            "UPDATE message_jobs SET status = 'pending', claimed_at = NULL "
+            "WHERE status = 'processing' AND claimed_at < ?",
+            (time.time() - older_than,),
+        )
+        return cursor.rowcount
+
+    def __len__(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM message_jobs WHERE status = 'pending'"
+        ).fetchone()[0]
+
+
+class MessageWorkerPool:
+    """Pool of daemon threads draining a queue backend through a handler"""
+
+    def __init__(self, backend, handler, concurrency: int = 4):
+        self.backend = backend
+        self.handler = handler
+        self.concurrency = concurrency
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        self._stopping.clear()
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"message-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            job = self.backend.get(timeout=1)
+            if job is None:
+                continue
+            try:
+                close_old_connections()
+                self.handler(job)
+            except Exception as e:
+                logger.error(f"Error processing queued message: {e}")
+            finally:
+                self.backend.ack(job)
+                close_old_connections()
+
+
+def build_queue_backend():
+    """Build the queue backend selected by MESSAGE_QUEUE_BACKEND"""
+    backend = getattr(settings, 'MESSAGE_QUEUE_BACKEND', 'memory')
+    if backend == 'memory':
+        return InProcessQueue()
+    if backend == 'sqlite':
+        return SQLiteQueue(settings.MESSAGE_QUEUE_PATH)
+    raise ValueError(f"Unknown MESSAGE_QUEUE_BACKEND: {backend}")
+
+
+_backend = None
+_pool = None
+_lock = threading.Lock()
+
+
+def get_message_queue():
+    """Return the process-wide queue backend"""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = build_queue_backend()
+    return _backend
+
+
+def ensure_workers(handler):
+    """Start the in-process worker pool once (no-op when workers run out of process)"""
+    global _pool
+    if not getattr(settings, 'MESSAGE_WORKERS_IN_PROCESS', True):
+        return None
+    if _pool is None or not _pool.running:
+        with _lock:
+            if _pool is None or not _pool.running:
+                _pool = MessageWorkerPool(
+                    get_message_queue(),
+                    handler,
+                    concurrency=getattr(settings, 'MESSAGE_WORKER_CONCURRENCY', 4),
+                )
+                _pool.start()
+    return _pool
+
+
+def enqueue_message(job: dict, handler):
+    """Record an inbound message for out-of-band processing"""
+    get_message_queue().put(job)
+    ensure_workers(handler)
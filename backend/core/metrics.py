@@ -0,0 +1,187 @@
+# core/metrics.py
+import bisect
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+from collections import defaultdict
+
+# Set from settings.METRICS_ENABLED in CoreConfig.ready(). When off, span()
+# hands back one shared no-op context manager, so instrumented code pays a
+# function call and nothing else.
+ENABLED = True
+
+# The dict that counting() collects into for the current thread or task
+_scope = contextvars.ContextVar('counter_scope', default=None)
+
+
+class Counters:
+    """Thread-safe named counters shared by the request pipeline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(int)
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._values[name] += amount
+        scope = _scope.get()
+        if scope is not None:
+            scope[name] += amount
+
+    def get(self, name: str) -> int:
+        return self._values.get(name, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram (e.g. latencies in seconds)"""
+
+    DEFAULT_BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = tuple(bounds)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._buckets[bisect.bisect_left(self.bounds, value)] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0-100)"""
+        with self._lock:
+            if not self._count:
+                return 0.0
+            rank = q / 100 * self._count
+            seen = 0
+            for i, count in enumerate(self._buckets):
+                seen += count
+                if seen >= rank and count:
+                    return min(self.bounds[i], self._max) if i < len(self.bounds) else self._max
+            return self._max
+
+    def snapshot(self) -> dict:
+        summary = {'p50': self.percentile(50), 'p95': self.percentile(95), 'p99': self.percentile(99)}
+        with self._lock:
+            summary.update({
+                'count': self._count,
+                'mean': ratio(self._sum, self._count),
+                'max': self._max,
+                'buckets': dict(zip([*map(str, self.bounds), '+Inf'], self._buckets)),
+            })
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._buckets = [0] * (len(self.bounds) + 1)
+            self._count = 0
+            self._sum = 0.0
+            self._max = 0.0
+
+
+class Histograms:
+    """Named histograms, created on first use"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def get(self, name: str, bounds=None) -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(
+                    name, Histogram(bounds) if bounds else Histogram()
+                )
+        return histogram
+
+    def observe(self, name: str, value: float):
+        self.get(name).observe(value)
+
+    def snapshot(self) -> dict:
+        return {name: histogram.snapshot() for name, histogram in list(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# Stages range from microseconds (intent routing) to seconds (LLM calls)
+SPAN_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+               0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _Span:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, name):
+        self.histogram = histograms.get(f"span.{name}", SPAN_BOUNDS)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+_NOOP_SPAN = contextlib.nullcontext()
+
+
+def span(name: str):
+    """Time a block into the histogram 'span.<name>' (seconds)"""
+    return _Span(name) if ENABLED else _NOOP_SPAN
+
+
+@contextlib.contextmanager
+def counting():
+    """Also collect the increments made in this block, by this thread or task, into a dict
+
+    The dict is shared with sync_to_async calls made inside the block. Not
+    nestable: an inner block collects on its own.
+    """
+    counts = defaultdict(int)
+    token = _scope.set(counts)
+    try:
+        yield counts
+    finally:
+        _scope.reset(token)
+
+
+def timed(name: str):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def configure(enabled: bool):
+    global ENABLED
+    ENABLED = enabled
+
+
+def ratio(numerator: int, denominator: int) -> float:
+    """Safe division for hit rates"""
+    return numerator / denominator if denominator else 0.0
+
+
+# Global instances
+counters = Counters()
+histograms = Histograms()
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_eventmanageruser_current_conversation_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventmanageruser',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['user', 'scheduled_time'], name='core_event_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_event_user_time_index_user_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='occurrences_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_exceptions',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='recurrence_pattern',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.CreateModel(
+            name='EventOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='core.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='core.eventmanageruser')),
+            ],
+            options={
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['user', 'starts_at'], name='core_occurrence_user_time_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event', 'starts_at'), name='core_occurrence_unique')],
+            },
+        ),
+    ]
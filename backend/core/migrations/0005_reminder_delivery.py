@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_event_recurrence_occurrences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurrence_start', models.DateTimeField()),
+                ('status', models.CharField(choices=[('claimed', 'Claimed'), ('sent', 'Sent'), ('failed', 'Failed')], default='claimed', max_length=10)),
+                ('claim_token', models.CharField(max_length=32)),
+                ('message_sid', models.CharField(blank=True, max_length=64, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['scheduled_time'], name='core_event_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['updated_at'], name='core_event_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoccurrence',
+            index=models.Index(fields=['starts_at'], name='core_occurrence_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='reminderdelivery',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='core.event'),
+        ),
+        migrations.AddIndex(
+            model_name='reminderdelivery',
+            index=models.Index(fields=['claim_token'], name='core_reminder_claim_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reminderdelivery',
+            constraint=models.UniqueConstraint(fields=('event', 'occurrence_start'), name='core_reminder_once'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_reminder_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventmanageruser',
+            name='feed_token',
+            field=models.CharField(blank=True, max_length=43, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_user_feed_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,81 @@
+from django.db import OperationalError, migrations
+
+# Full-text index over Event.title, location and notes, see core.search.
+# Django rebuilds a SQLite table to alter it, which drops these triggers: a
+# later migration that alters core_event must run create_search_index again.
+
+SQLITE_CREATE = [
+    # External content: the FTS table stores only the index, reading rows from core_event.
+    # user_id is indexed too, so a MATCH can be limited to one user's events.
+    """CREATE VIRTUAL TABLE core_event_fts USING fts5(
+        title, location, notes, user_id,
+        content='core_event', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER core_event_fts_insert AFTER INSERT ON core_event BEGIN
+        INSERT INTO core_event_fts(rowid, title, location, notes, user_id)
+        VALUES (new.id, new.title, new.location, new.notes, new.user_id);
+    END""",
+    """CREATE TRIGGER core_event_fts_delete AFTER DELETE ON core_event BEGIN
+        INSERT INTO core_event_fts(core_event_fts, rowid, title, location, notes, user_id)
+        VALUES ('delete', old.id, old.title, old.location, old.notes, old.user_id);
+    END""",
+    """CREATE TRIGGER core_event_fts_update AFTER UPDATE OF title, location, notes, user_id ON core_event BEGIN
+        INSERT INTO core_event_fts(core_event_fts, rowid, title, location, notes, user_id)
+        VALUES ('delete', old.id, old.title, old.location, old.notes, old.user_id);
+        INSERT INTO core_event_fts(rowid, title, location, notes, user_id)
+        VALUES (new.id, new.title, new.location, new.notes, new.user_id);
+    END""",
+    "INSERT INTO core_event_fts(core_event_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS core_event_fts_insert',
+    'DROP TRIGGER IF EXISTS core_event_fts_delete',
+    'DROP TRIGGER IF EXISTS core_event_fts_update',
+    'DROP TABLE IF EXISTS core_event_fts',
+]
+
+# Must stay identical to core.search.POSTGRES_VECTOR for the planner to use the index
+POSTGRES_CREATE = [
+    """CREATE INDEX core_event_search_idx ON core_event USING GIN ((
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+    ))""",
+]
+
+POSTGRES_DROP = ['DROP INDEX IF EXISTS core_event_search_idx']
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            for statement in SQLITE_CREATE:
+                schema_editor.execute(statement)
+        except OperationalError:
+            # SQLite built without FTS5: core.search falls back to scanning
+            for statement in SQLITE_DROP:
+                schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = SQLITE_DROP if vendor == 'sqlite' else POSTGRES_DROP if vendor == 'postgresql' else []
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_event_duration'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_event_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=64)),
+                ('external_id', models.CharField(max_length=255)),
+                ('title', models.CharField(max_length=255)),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('venue', models.CharField(blank=True, max_length=255, null=True)),
+                ('category', models.CharField(blank=True, max_length=64, null=True)),
+                ('url', models.CharField(blank=True, max_length=500, null=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('geohash', models.CharField(max_length=12)),
+                ('starts_on', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['starts_on', 'geohash', 'starts_at', 'latitude', 'longitude'], name='core_catalog_day_geo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'external_id'), name='core_catalog_source_id')],
+            },
+        ),
+    ]
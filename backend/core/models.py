@@ -6,7 +6,9 @@ class EventManagerUser(models.Model):
     name = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     language = models.CharField(max_length=10, default='en')
-    current_conversation_state = models.JSONField(blank=True, null=True)  # Store temporary conversation data
+    timezone = models.CharField(max_length=64, default='UTC')  # IANA name, e.g. 'Africa/Lagos'
+    current_conversation_state = models.JSONField(blank=True, null=True)  # {slot: [value, expires_at]}, see core.session_store.UserRowBackend
+    feed_token = models.CharField(max_length=43, unique=True, blank=True, null=True)  # Secret part of the ICS feed URL, see core.feeds
     
     def __str__(self):
         return f"{self.phone_number} ({self.name})" if self.name else self.phone_number
@@ -20,18 +22,110 @@ class Event(models.Model):
     user = models.ForeignKey(EventManagerUser, on_delete=models.CASCADE, related_name='events')
     title = models.CharField(max_length=255)
     scheduled_time = models.DateTimeField()
+    duration_minutes = models.PositiveIntegerField(blank=True, null=True)  # None: EVENT_DEFAULT_DURATION_MINUTES
     location = models.CharField(max_length=255, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     is_recurring = models.BooleanField(default=False)
-    recurrence_pattern = models.CharField(max_length=50, blank=True, null=True)
+    recurrence_pattern = models.CharField(max_length=255, blank=True, null=True)  # RRULE, see core.recurrence
+    recurrence_exceptions = models.JSONField(blank=True, null=True)  # ISO datetimes of skipped occurrences
+    occurrences_until = models.DateTimeField(blank=True, null=True)  # End of the materialized EventOccurrence window
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['scheduled_time']
+        indexes = [
+            # Serves every per-user agenda query: WHERE user_id = ? AND scheduled_time >= ? ...
+            models.Index(fields=['user', 'scheduled_time'], name='core_event_user_time_idx'),
+            # Reminder dispatcher: due-window scans and incremental refresh of edits
+            models.Index(fields=['scheduled_time'], name='core_event_time_idx'),
+            models.Index(fields=['updated_at'], name='core_event_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.scheduled_time.strftime('%Y-%m-%d %H:%M')}"
     
     def is_upcoming(self):
-        return self.scheduled_time >= timezone.now()
\ No newline at end of file
+        return self.scheduled_time >= timezone.now()
+
+class EventOccurrence(models.Model):
+    """Materialized occurrence of a recurring event inside the hot window"""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='occurrences')
+    user = models.ForeignKey(EventManagerUser, on_delete=models.CASCADE, related_name='occurrences')
+    starts_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['starts_at']
+        indexes = [
+            models.Index(fields=['user', 'starts_at'], name='core_occurrence_user_time_idx'),
+            models.Index(fields=['starts_at'], name='core_occurrence_time_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'starts_at'], name='core_occurrence_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event.title} - {self.starts_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class ReminderDelivery(models.Model):
+    """One reminder per event occurrence; the unique row is the exactly-once ledger"""
+    STATUS_CLAIMED = 'claimed'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_CLAIMED, 'Claimed'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='reminders')
+    occurrence_start = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_CLAIMED)
+    claim_token = models.CharField(max_length=32)
+    message_sid = models.CharField(max_length=64, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'occurrence_start'], name='core_reminder_once'),
+        ]
+        indexes = [
+            models.Index(fields=['claim_token'], name='core_reminder_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Reminder for {self.event_id} @ {self.occurrence_start:%Y-%m-%d %H:%M} ({self.status})"
+
+
+class CatalogEvent(models.Model):
+    """Public happening loaded from a local feed (`manage.py load_catalog`), see core.catalog"""
+    source = models.CharField(max_length=64)
+    external_id = models.CharField(max_length=255)  # The feed's id, so reloading a feed updates rows in place
+    title = models.CharField(max_length=255)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField(blank=True, null=True)
+    venue = models.CharField(max_length=255, blank=True, null=True)
+    category = models.CharField(max_length=64, blank=True, null=True)
+    url = models.CharField(max_length=500, blank=True, null=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    geohash = models.CharField(max_length=12)  # Of (latitude, longitude); a prefix is a map cell
+    starts_on = models.DateField()  # UTC date of starts_at, the time part of the index
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['starts_at']
+        indexes = [
+            # "What's on near me": per day of the time window, a geohash prefix range per map
+            # cell; the rest makes it covering, so candidates are picked without reading rows
+            models.Index(fields=['starts_on', 'geohash', 'starts_at', 'latitude', 'longitude'],
+                         name='core_catalog_day_geo_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'external_id'], name='core_catalog_source_id'),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} - {self.starts_at.strftime('%Y-%m-%d %H:%M')}"
@@ -0,0 +1,91 @@
+# core/occurrences.py
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .db_router import reading_from
+from .models import Event, EventOccurrence
+from .recurrence import iter_occurrences
+
+# Recurring series are expanded lazily by core.recurrence. For the hot window
+# (yesterday .. OCCURRENCE_WINDOW_DAYS ahead) occurrences are also kept as
+# EventOccurrence rows so agenda queries are plain indexed range scans.
+# Each series records how far it has been materialized in occurrences_until.
+# Materializing reads from the primary even inside replica_reads(): rows and
+# occurrences_until read from a lagging replica would be inserted again.
+
+
+def occurrence_window(now=None):
+    now = now or timezone.now()
+    return now - timedelta(days=1), now + timedelta(days=settings.OCCURRENCE_WINDOW_DAYS)
+
+
+def hot_horizon(now=None):
+    """How far ahead readers may rely on materialized rows
+
+    A day short of the window end, so a series materialized earlier today
+    still counts as fresh and is not rewritten on every read.
+    """
+    now = now or timezone.now()
+    return now + timedelta(days=settings.OCCURRENCE_WINDOW_DAYS - 1)
+
+
+def materialize_event(event, tz=None, now=None):
+    """Bring one series' rows in line with its rule; only that series is touched"""
+    if not event.is_recurring:
+        EventOccurrence.objects.filter(event=event).delete()
+        return
+
+    from .agenda import user_timezone
+    start, end = occurrence_window(now)
+    tz = tz or user_timezone(event.user)
+    desired = set(iter_occurrences(event, start, end, tz))
+
+    with reading_from('default'), transaction.atomic():
+        existing = dict(
+            EventOccurrence.objects.filter(event=event, starts_at__gte=start).values_list('starts_at', 'id')
+        )
+        stale_ids = [pk for starts_at, pk in existing.items() if starts_at not in desired]
+        if stale_ids:
+            EventOccurrence.objects.filter(id__in=stale_ids).delete()
+        EventOccurrence.objects.bulk_create([
+            EventOccurrence(event_id=event.pk, user_id=event.user_id, starts_at=starts_at)
+            for starts_at in sorted(desired - existing.keys())
+        ])
+        # update() rather than save(): no post_save, no recursion
+        Event.objects.filter(pk=event.pk).update(occurrences_until=end)
+    event.occurrences_until = end
+
+
+def ensure_materialized(user, end, now=None):
+    """Make sure the user's occurrence rows cover up to `end`
+
+    Returns False when `end` lies beyond the hot window; callers then expand
+    the series lazily instead.
+    """
+    if end > hot_horizon(now):
+        return False
+    from .agenda import user_timezone
+    tz = user_timezone(user)
+    stale = Event.objects.filter(user=user, is_recurring=True).filter(
+        Q(occurrences_until__isnull=True) | Q(occurrences_until__lt=end)
+    )
+    with reading_from('default'):
+        for event in stale.iterator():
+            materialize_event(event, tz=tz, now=now)
+    return True
+
+
+def refresh_window(now=None):
+    """Roll the hot window forward for every series and drop expired rows"""
+    window_start, window_end = occurrence_window(now)
+    expired, _ = EventOccurrence.objects.filter(starts_at__lt=window_start).delete()
+    refreshed = 0
+    stale = Event.objects.filter(is_recurring=True).filter(
+        Q(occurrences_until__isnull=True) | Q(occurrences_until__lt=window_end)
+    ).select_related('user')
+    for event in stale.iterator(chunk_size=500):
+        materialize_event(event, now=now)
+        refreshed += 1
+    return refreshed, expired
@@ -0,0 +1,241 @@
+# core/outbound.py
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from .clients import build_async_twilio_client, get_twilio_client
+from .metrics import counters
+
+logger = logging.getLogger(__name__)
+
+# Outbound WhatsApp messages (replies, reminders) go through one of the
+# senders below rather than straight to the Twilio client: each sender
+# number gets its own token bucket (Twilio enforces throughput per number),
+# and throttled (429) or failed (5xx, connection error) requests are retried
+# with jittered exponential backoff. Both share the pooled Twilio clients
+# from core.clients.
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`
+
+    Buckets live in one process, so N processes sending from the same number
+    add up to N times the rate. `clock` returns seconds (tests pass a fake).
+    """
+
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class SenderBuckets:
+    """One TokenBucket per sender number, created on first use"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get(self, sender: str) -> TokenBucket:
+        bucket = self._buckets.get(sender)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(sender, TokenBucket(self.rate))
+        return bucket
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: attempt n waits up to min(cap, base * 2**n)"""
+
+    def __init__(self, max_retries: int = 4, base: float = 0.5, cap: float = 8.0):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_retries=getattr(settings, 'OUTBOUND_MAX_RETRIES', 4),
+            base=getattr(settings, 'OUTBOUND_BACKOFF_BASE', 0.5),
+            cap=getattr(settings, 'OUTBOUND_BACKOFF_MAX', 8.0),
+        )
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+    def should_retry(self, exc: Exception, attempt: int) -> bool:
+        """Count the failure and decide; `attempt` is 0 for the first try"""
+        status = getattr(exc, 'status', None)
+        if status == 429:
+            counters.incr('outbound.throttled')
+        if isinstance(status, int):
+            retryable = status == 429 or status >= 500
+        else:
+            # Connection resets and timeouts: requests' and aiohttp's are OSErrors
+            retryable = isinstance(exc, OSError)
+        if retryable and attempt < self.max_retries:
+            counters.incr('outbound.retries')
+            return True
+        counters.incr('outbound.failed')
+        return False
+
+
+class OutboundSender:
+    """Bounded, rate-limited pool sending WhatsApp messages through Twilio
+
+    `rate_per_second` applies to each sender number separately. A 5xx may
+    come back for a message Twilio did accept, so a retry can rarely
+    deliver a message twice; reminders are deduplicated upstream.
+    """
+
+    def __init__(self, client_provider=get_twilio_client, max_workers: int = 8,
+                 rate_per_second: float = 80, max_pending: int = 1000, retry: RetryPolicy = None):
+        self.client_provider = client_provider
+        self.buckets = SenderBuckets(rate_per_second)
+        self.retry = retry or RetryPolicy.from_settings()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='outbound')
+        # Back-pressure: callers block instead of queueing unbounded work
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, to: str, body: str, from_: str = None):
+        """Queue one message; returns a Future resolving to the Twilio message SID"""
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self.send, to, body, from_)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def send(self, to: str, body: str, from_: str = None) -> str:
+        """Send in the calling thread, waiting for the rate limit and retries"""
+        from_ = from_ or settings.TWILIO_WHATSAPP_NUMBER
+        bucket = self.buckets.get(from_)
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                message = self.client_provider().messages.create(from_=from_, to=to, body=body)
+            except Exception as exc:
+                if not self.retry.should_retry(exc, attempt):
+                    logger.warning("Giving up on message to %s after %d attempts: %s", to, attempt + 1, exc)
+                    raise
+                time.sleep(self.retry.delay(attempt))
+                attempt += 1
+                continue
+            counters.incr('outbound.sent')
+            return message.sid
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class AsyncOutboundSender:
+    """asyncio counterpart of OutboundSender on Twilio's aiohttp client
+
+    Build and use it inside one event loop: the connection pool belongs to
+    that loop. Call `aclose()` when done.
+    """
+
+    def __init__(self, client_factory=None, concurrency: int = 8, rate_per_second: float = 80,
+                 retry: RetryPolicy = None):
+        self.client_factory = client_factory or (lambda: build_async_twilio_client(concurrency))
+        self.buckets = SenderBuckets(rate_per_second)
+        self.retry = retry or RetryPolicy.from_settings()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._client = None
+
+    async def send(self, to: str, body: str, from_: str = None) -> str:
+        from_ = from_ or settings.TWILIO_WHATSAPP_NUMBER
+        if self._client is None:
+            self._client = self.client_factory()
+        bucket = self.buckets.get(from_)
+        attempt = 0
+        async with self._slots:
+            while True:
+                while wait := bucket.reserve():
+                    await asyncio.sleep(wait)
+                try:
+                    message = await self._client.messages.create_async(from_=from_, to=to, body=body)
+                except Exception as exc:
+                    if not self.retry.should_retry(exc, attempt):
+                        logger.warning("Giving up on message to %s after %d attempts: %s", to, attempt + 1, exc)
+                        raise
+                    await asyncio.sleep(self.retry.delay(attempt))
+                    attempt += 1
+                    continue
+                counters.incr('outbound.sent')
+                return message.sid
+
+    async def send_many(self, messages) -> list:
+        """Send (to, body) or (to, body, from_) tuples; SIDs or exceptions, in order"""
+        return await asyncio.gather(*(self.send(*message) for message in messages), return_exceptions=True)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.http_client.session.close()
+            self._client = None
+
+
+_outbound_sender = None
+_lock = threading.Lock()
+
+
+def get_outbound_sender() -> OutboundSender:
+    """Return the process-wide sender used for out-of-band replies"""
+    global _outbound_sender
+    if _outbound_sender is None:
+        with _lock:
+            if _outbound_sender is None:
+                _outbound_sender = OutboundSender(
+                    max_workers=getattr(settings, 'OUTBOUND_CONCURRENCY', 8),
+                    rate_per_second=getattr(settings, 'OUTBOUND_RATE_PER_SENDER', 80),
+                )
+    return _outbound_sender
+
+
+def _after_fork():
+    # Pool threads do not survive fork; children build their own sender
+    global _outbound_sender, _lock
+    _lock = threading.Lock()
+    _outbound_sender = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def stats() -> dict:
+    return {
+        'sent': counters.get('outbound.sent'),
+        'failed': counters.get('outbound.failed'),
+        'retries': counters.get('outbound.retries'),
+        'throttled': counters.get('outbound.throttled'),
+    }
@@ -0,0 +1,284 @@
+# core/recurrence.py
+import calendar
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.utils import timezone
+
+# RRULE-style recurrence stored in Event.recurrence_pattern, e.g.
+#   FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10
+#   FREQ=MONTHLY;INTERVAL=2;BYMONTHDAY=1,15;UNTIL=20271231
+#   FREQ=MONTHLY;BYDAY=1MO,-1FR          (first Monday, last Friday)
+#   FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR      (BYDAY/BYMONTH/BYMONTHDAY filter days)
+# Plain 'daily' / 'weekly' / 'monthly' / 'yearly' are accepted as shorthand.
+# Anything else (BYSETPOS, BYHOUR, ...) is rejected rather than ignored, so a
+# rule is either expanded as written or not accepted at all.
+# Occurrences are generated in the owner's local wall time, so a 9am weekly
+# meeting stays at 9am across DST changes. An UNTIL ending in Z is a UTC
+# instant (RFC 5545) and is moved to the owner's wall time when expanding.
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+WEEKDAY_CODES = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+RULE_PARTS = ('FREQ', 'INTERVAL', 'BYDAY', 'BYMONTHDAY', 'BYMONTH', 'WKST', 'COUNT', 'UNTIL')
+BYDAY_RE = re.compile(r'([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)')
+# Longest month for each month number, leap years included
+MONTH_DAYS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+class RecurrenceRule:
+    """A parsed subset of RFC 5545 RRULE
+
+    FREQ, INTERVAL, BYDAY (ordinals like 1MO or -1FR with MONTHLY only),
+    BYMONTHDAY, BYMONTH, WKST, COUNT and UNTIL. Combinations that would need
+    more of RFC 5545 to expand faithfully raise ValueError.
+    """
+
+    def __init__(self, freq, interval=1, byday=None, bymonthday=None, count=None, until=None,
+                 bynthday=None, bymonth=None, wkst=0):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unsupported recurrence frequency: {freq}")
+        if interval < 1:
+            raise ValueError("Recurrence interval must be positive")
+        if byday and freq == 'YEARLY':
+            raise ValueError("BYDAY is not supported with FREQ=YEARLY")
+        if bynthday and freq != 'MONTHLY':
+            raise ValueError("Ordinal BYDAY values are only supported with FREQ=MONTHLY")
+        if bymonthday and freq in ('WEEKLY', 'YEARLY'):
+            raise ValueError(f"BYMONTHDAY is not supported with FREQ={freq}")
+        if bymonth and bymonthday and not any(day <= MONTH_DAYS[month - 1] for month in bymonth for day in bymonthday):
+            raise ValueError("BYMONTHDAY never falls in BYMONTH")
+        self.freq = freq
+        self.interval = interval
+        self.byday = sorted(byday) if byday else None  # weekday numbers, Monday = 0
+        self.bynthday = sorted(bynthday) if bynthday else None  # (n, weekday): n-th (or n-th last) in the month
+        self.bymonthday = sorted(bymonthday) if bymonthday else None
+        self.bymonth = sorted(bymonth) if bymonth else None
+        self.wkst = wkst  # first day of the week, Monday = 0
+        self.count = count
+        self.until = until  # inclusive: naive local datetime, or aware UTC from UNTIL=...Z
+
+    @classmethod
+    def parse(cls, pattern: str):
+        """Parse an RRULE string (or shorthand); raises ValueError when invalid"""
+        if not pattern:
+            raise ValueError("Empty recurrence pattern")
+        pattern = pattern.strip()
+        if pattern.upper().startswith('RRULE:'):
+            pattern = pattern[6:]
+        if pattern.upper() in FREQUENCIES:
+            return cls(pattern.upper())
+
+        parts = {}
+        for part in pattern.split(';'):
+            if not part:
+                continue
+            key, _, value = part.partition('=')
+            parts[key.strip().upper()] = value.strip().upper()
+        unsupported = sorted(set(parts) - set(RULE_PARTS))
+        if unsupported:
+            raise ValueError(f"Unsupported recurrence parts: {', '.join(unsupported)}")
+
+        byday, bynthday = [], []
+        for code in filter(None, parts.get('BYDAY', '').split(',')):
+            match = BYDAY_RE.fullmatch(code)
+            ordinal = int(match.group(1)) if match and match.group(1) else None
+            if not match or (ordinal is not None and not 1 <= abs(ordinal) <= 5):
+                raise ValueError(f"Unsupported BYDAY value: {parts['BYDAY']}")
+            weekday = WEEKDAY_CODES.index(match.group(2))
+            if ordinal is None:
+                byday.append(weekday)
+            else:
+                bynthday.append((ordinal, weekday))
+        bymonthday = cls._int_list(parts, 'BYMONTHDAY', 1, 31)
+        bymonth = cls._int_list(parts, 'BYMONTH', 1, 12)
+        wkst = parts.get('WKST', 'MO')
+        if wkst not in WEEKDAY_CODES:
+            raise ValueError(f"Unsupported WKST value: {wkst}")
+        until = None
+        if parts.get('UNTIL'):
+            value = parts['UNTIL'].rstrip('Z')
+            fmt = '%Y%m%dT%H%M%S' if 'T' in value else '%Y%m%d'
+            until = datetime.strptime(value, fmt)
+            if fmt == '%Y%m%d':
+                until = until.replace(hour=23, minute=59, second=59)
+            elif parts['UNTIL'].endswith('Z'):
+                until = until.replace(tzinfo=dt_timezone.utc)
+
+        return cls(
+            parts.get('FREQ'),
+            interval=int(parts.get('INTERVAL', 1)),
+            byday=byday,
+            bymonthday=bymonthday,
+            count=int(parts['COUNT']) if parts.get('COUNT') else None,
+            until=until,
+            bynthday=bynthday,
+            bymonth=bymonth,
+            wkst=WEEKDAY_CODES.index(wkst),
+        )
+
+    @staticmethod
+    def _int_list(parts, key, low, high):
+        if not parts.get(key):
+            return None
+        try:
+            values = [int(value) for value in parts[key].split(',')]
+        except ValueError:
+            values = []
+        if not values or any(not low <= value <= high for value in values):
+            raise ValueError(f"Unsupported {key} value: {parts[key]}")
+        return values
+
+    def __str__(self):
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.byday or self.bynthday:
+            codes = [f"{n}{WEEKDAY_CODES[day]}" for n, day in self.bynthday or ()]
+            codes += [WEEKDAY_CODES[day] for day in self.byday or ()]
+            parts.append("BYDAY=" + ','.join(codes))
+        if self.bymonthday:
+            parts.append("BYMONTHDAY=" + ','.join(str(day) for day in self.bymonthday))
+        if self.bymonth:
+            parts.append("BYMONTH=" + ','.join(str(month) for month in self.bymonth))
+        if self.wkst:
+            parts.append(f"WKST={WEEKDAY_CODES[self.wkst]}")
+        if self.count:
+            parts.append(f"COUNT={self.count}")
+        if self.until and timezone.is_aware(self.until):
+            parts.append(f"UNTIL={self.until.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')}")
+        elif self.until:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%dT%H%M%S')}")
+        return ';'.join(parts)
+
+    def local_until(self, tz=None):
+        """UNTIL as a naive wall time in `tz` (default: the current timezone)"""
+        if self.until is None or timezone.is_naive(self.until):
+            return self.until
+        return timezone.localtime(self.until, tz or timezone.get_current_timezone()).replace(tzinfo=None)
+
+    def iter_local(self, dtstart: datetime, after: datetime = None, tz=None):
+        """Yield naive local occurrence starts from dtstart, in order
+
+        When the rule has no COUNT, periods entirely before `after` are
+        skipped arithmetically instead of being generated one by one. `tz`
+        is the zone of dtstart, for a UTC UNTIL.
+        """
+        until = self.local_until(tz)
+        period = 0
+        if after is not None and self.count is None and after > dtstart:
+            period = self._periods_before(dtstart, after)
+
+        generated = 0
+        while True:
+            candidates = self._period_candidates(dtstart, period)
+            if candidates is None:
+                return
+            for candidate in candidates:
+                if candidate < dtstart:
+                    continue
+                if until and candidate > until:
+                    return
+                generated += 1
+                yield candidate
+                if self.count and generated >= self.count:
+                    return
+            period += 1
+
+    def _periods_before(self, dtstart, after):
+        # Conservative: lands on or before the period containing `after`
+        if self.freq == 'DAILY':
+            elapsed = (after.date() - dtstart.date()).days
+        elif self.freq == 'WEEKLY':
+            elapsed = (after.date() - dtstart.date()).days // 7 - 1
+        elif self.freq == 'MONTHLY':
+            elapsed = (after.year - dtstart.year) * 12 + after.month - dtstart.month - 1
+        else:
+            elapsed = after.year - dtstart.year - 1
+        return max(0, elapsed // self.interval)
+
+    def _period_candidates(self, dtstart, period):
+        """Occurrence starts in the n-th period, or None past any representable date"""
+        step = period * self.interval
+        clock = dtstart.time()
+        try:
+            if self.freq == 'DAILY':
+                candidate = dtstart + timedelta(days=step)
+                if ((self.byday and candidate.weekday() not in self.byday)
+                        or (self.bymonthday and candidate.day not in self.bymonthday)
+                        or (self.bymonth and candidate.month not in self.bymonth)):
+                    return []
+                return [candidate]
+
+            if self.freq == 'WEEKLY':
+                offset = (dtstart.weekday() - self.wkst) % 7
+                week_start = dtstart.date() - timedelta(days=offset) + timedelta(weeks=step)
+                days = sorted((day - self.wkst) % 7 for day in self.byday or [dtstart.weekday()])
+                candidates = [datetime.combine(week_start + timedelta(days=day), clock) for day in days]
+                return [c for c in candidates if not self.bymonth or c.month in self.bymonth]
+
+            if self.freq == 'MONTHLY':
+                month_index = dtstart.month - 1 + step
+                year, month = dtstart.year + month_index // 12, month_index % 12 + 1
+                if self.bymonth and month not in self.bymonth:
+                    return []
+                return [datetime(year, month, day, clock.hour, clock.minute, clock.second)
+                        for day in self._month_days(year, month, dtstart.day)]
+
+            year = dtstart.year + step
+            # Months without the day (e.g. the 31st, Feb 29) are skipped, as in RFC 5545
+            return [datetime(year, month, dtstart.day, clock.hour, clock.minute, clock.second)
+                    for month in self.bymonth or [dtstart.month]
+                    if dtstart.day <= calendar.monthrange(year, month)[1]]
+        except (OverflowError, ValueError):
+            return None
+
+    def _month_days(self, year, month, default_day):
+        """Days of a month matched by BYDAY and BYMONTHDAY (both must match when both are set)"""
+        first_weekday, last_day = calendar.monthrange(year, month)
+        days = set(range(1, last_day + 1))
+        if self.byday or self.bynthday:
+            weekdays = {day: (first_weekday + day - 1) % 7 for day in days}
+            matched = {day for day in days if weekdays[day] in (self.byday or ())}
+            for n, weekday in self.bynthday or ():
+                same = [day for day in sorted(days) if weekdays[day] == weekday]
+                if abs(n) <= len(same):
+                    matched.add(same[n - 1] if n > 0 else same[n])
+            days &= matched
+        if self.bymonthday:
+            days &= set(self.bymonthday)
+        elif not (self.byday or self.bynthday):
+            days &= {default_day}
+        return sorted(days)
+
+
+def iter_occurrences(event, start, end, tz=None):
+    """Yield aware occurrence starts of a recurring event in [start, end), lazily"""
+    if not event.is_recurring or not event.recurrence_pattern:
+        if start <= event.scheduled_time < end:
+            yield event.scheduled_time
+        return
+
+    try:
+        rule = RecurrenceRule.parse(event.recurrence_pattern)
+    except ValueError:
+        # An unreadable pattern degrades to a one-off event
+        if start <= event.scheduled_time < end:
+            yield event.scheduled_time
+        return
+
+    tz = tz or timezone.get_current_timezone()
+    dtstart = timezone.localtime(event.scheduled_time, tz).replace(tzinfo=None)
+    local_start = timezone.localtime(start, tz).replace(tzinfo=None)
+    exceptions = {datetime.fromisoformat(value) for value in event.recurrence_exceptions or ()}
+
+    for local in rule.iter_local(dtstart, after=local_start, tz=tz):
+        occurrence = timezone.make_aware(local, tz)
+        if occurrence >= end:
+            return
+        if occurrence < start or occurrence in exceptions:
+            continue
+        yield occurrence
+
+
+def exception_key(occurrence: datetime) -> str:
+    """The string stored in Event.recurrence_exceptions to skip an occurrence"""
+    return occurrence.isoformat()
@@ -0,0 +1,197 @@
+# core/reminders.py
+import heapq
+import logging
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from .agenda import user_timezone
+from .metrics import counters
+from .models import Event, EventOccurrence, ReminderDelivery
+from .occurrences import hot_horizon, refresh_window
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderDispatcher:
+    """Fires reminders for event occurrences from an in-memory min-heap
+
+    Only reminders due within `lookahead` are held in memory. Each refresh
+    extends the loaded horizon with an indexed range scan and picks up edits
+    through Event.updated_at, so tables are never polled as a whole.
+    Delivery is recorded in ReminderDelivery, whose unique (event, occurrence)
+    row is claimed before sending: a restart never sends a reminder twice.
+    Recurring reminders come from EventOccurrence rows, so the dispatcher
+    rolls the materialized window forward itself whenever its horizon would
+    pass the rows' end; it does not depend on the refresh_occurrences cron.
+    """
+
+    def __init__(self, sender, lead=None, lookahead=None, grace=None, batch_size: int = 500):
+        self.sender = sender
+        self.lead = lead if lead is not None else timedelta(minutes=settings.REMINDER_LEAD_MINUTES)
+        self.lookahead = lookahead or timedelta(minutes=10)
+        # Reminders missed while the dispatcher was down are still sent within this grace
+        self.grace = grace if grace is not None else timedelta(minutes=settings.REMINDER_GRACE_MINUTES)
+        self.batch_size = batch_size
+        if self.lead + self.lookahead >= timedelta(days=settings.OCCURRENCE_WINDOW_DAYS - 1):
+            raise ValueError("Reminder lead and lookahead must fit inside OCCURRENCE_WINDOW_DAYS")
+        self._heap = []
+        self._materialized_until = None
+        self._queued = set()
+        self._loaded_until = None
+        self._last_refresh = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _push(self, event_id, starts_at):
+        key = (event_id, starts_at)
+        if key in self._queued:
+            return
+        self._queued.add(key)
+        heapq.heappush(self._heap, (starts_at - self.lead, event_id, starts_at))
+
+    def refresh(self, now=None):
+        """Load reminders firing before now + lookahead that are not in the heap yet"""
+        now = now or timezone.now()
+        start = self._loaded_until or now - self.grace
+        until = now + self.lookahead
+
+        if self._materialized_until is None or until + self.lead > self._materialized_until:
+            refreshed, _expired = refresh_window(now)
+            self._materialized_until = hot_horizon(now)
+            counters.incr('reminders.series_materialized', refreshed)
+
+        if until > start:
+            window = (start + self.lead, until + self.lead)
+            for event_id, starts_at in Event.objects.filter(
+                is_recurring=False, scheduled_time__gte=window[0], scheduled_time__lt=window[1],
+            ).values_list('id', 'scheduled_time').iterator():
+                self._push(event_id, starts_at)
+            for event_id, starts_at in EventOccurrence.objects.filter(
+                starts_at__gte=window[0], starts_at__lt=window[1],
+            ).values_list('event_id', 'starts_at').iterator():
+                self._push(event_id, starts_at)
+
+        if self._last_refresh is not None:
+            self._load_edits(now, until)
+
+        self._loaded_until = until
+        self._last_refresh = now
+
+    def _load_edits(self, now, until):
+        """Events created or edited since the last refresh that now fall in range"""
+        window = (now - self.grace + self.lead, until + self.lead)
+        series_ids = []
+        for event_id, starts_at, is_recurring in Event.objects.filter(
+            updated_at__gte=self._last_refresh,
+        ).values_list('id', 'scheduled_time', 'is_recurring').iterator():
+            if is_recurring:
+                series_ids.append(event_id)
+            elif window[0] <= starts_at < window[1]:
+                self._push(event_id, starts_at)
+        if series_ids:
+            for event_id, starts_at in EventOccurrence.objects.filter(
+                event_id__in=series_ids, starts_at__gte=window[0], starts_at__lt=window[1],
+            ).values_list('event_id', 'starts_at').iterator():
+                self._push(event_id, starts_at)
+
+    def pop_due(self, now=None):
+        """Remove and return (event_id, occurrence_start) pairs that are due"""
+        now = now or timezone.now()
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            _fire_at, event_id, starts_at = heapq.heappop(self._heap)
+            self._queued.discard((event_id, starts_at))
+            due.append((event_id, starts_at))
+        return due
+
+    def dispatch(self, due):
+        """Claim, send and record a batch of due reminders; returns the number sent"""
+        if not due:
+            return 0
+        events = Event.objects.select_related('user').in_bulk({event_id for event_id, _ in due})
+        live = self._still_scheduled(due, events)
+        if not live:
+            return 0
+
+        # Claim first: rows that already exist (sent before a restart) are skipped
+        token = uuid.uuid4().hex
+        ReminderDelivery.objects.bulk_create(
+            [ReminderDelivery(event_id=event_id, occurrence_start=starts_at, claim_token=token)
+             for event_id, starts_at in live],
+            ignore_conflicts=True,
+        )
+        claimed = list(ReminderDelivery.objects.filter(claim_token=token))
+        counters.incr('reminders.duplicates_skipped', len(live) - len(claimed))
+
+        futures = []
+        for delivery in claimed:
+            event = events[delivery.event_id]
+            futures.append((delivery, self.sender.submit(
+                to=f"whatsapp:{event.user.phone_number}",
+                body=self.render(event, delivery.occurrence_start),
+            )))
+
+        sent = []
+        for delivery, future in futures:
+            try:
+                delivery.message_sid = future.result()
+                delivery.status = ReminderDelivery.STATUS_SENT
+                delivery.sent_at = timezone.now()
+                sent.append(delivery)
+            except Exception as e:
+                logger.error(f"Reminder delivery failed for event {delivery.event_id}: {e}")
+                delivery.status = ReminderDelivery.STATUS_FAILED
+        ReminderDelivery.objects.bulk_update(
+            [delivery for delivery, _ in futures], ['status', 'message_sid', 'sent_at'],
+        )
+        counters.incr('reminders.sent', len(sent))
+        return len(sent)
+
+    def _still_scheduled(self, due, events):
+        """Drop heap entries whose event was deleted or moved since loading"""
+        live = []
+        series = [(event_id, starts_at) for event_id, starts_at in due
+                  if event_id in events and events[event_id].is_recurring]
+        occurrences = set()
+        if series:
+            occurrences = set(EventOccurrence.objects.filter(
+                event_id__in={event_id for event_id, _ in series},
+                starts_at__in={starts_at for _, starts_at in series},
+            ).values_list('event_id', 'starts_at'))
+        for event_id, starts_at in due:
+            event = events.get(event_id)
+            if event is None:
+                continue
+            if event.is_recurring and (event_id, starts_at) not in occurrences:
+                continue
+            if not event.is_recurring and event.scheduled_time != starts_at:
+                continue
+            live.append((event_id, starts_at))
+        return live
+
+    @staticmethod
+    def render(event, starts_at):
+        time_str = timezone.localtime(starts_at, user_timezone(event.user)).strftime('%I:%M %p')
+        location_str = f" @ {event.location}" if event.location else ""
+        return f"⏰ *Reminder:* {event.title}\n📅 {time_str}{location_str}"
+
+    def run(self, stop, refresh_interval: float = 5, tick: float = 0.5):
+        """Loop until `stop` (a threading.Event) is set"""
+        next_refresh = 0
+        while not stop.is_set():
+            now = timezone.now()
+            if now.timestamp() >= next_refresh:
+                close_old_connections()
+                self.refresh(now)
+                next_refresh = now.timestamp() + refresh_interval
+            due = self.pop_due(now)
+            if due:
+                self.dispatch(due)
+                continue
+            wait = tick
+            if self._heap:
+                wait = min(tick, max(0, (self._heap[0][0] - now).total_seconds()))
+            stop.wait(wait)
@@ -0,0 +1,165 @@
+# core/search.py
+import logging
+import re
+from django.conf import settings
+from django.core import checks
+from django.db import connections, router
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.utils import timezone
+from .metrics import counters, ratio
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+# "When is my dentist appointment?": full-text search over the title,
+# location and notes of one user's events. Every term is matched as a
+# prefix ("dent" finds "Dentist"); results are ranked title hits first,
+# then location, then notes, with upcoming events ahead of past ones on a
+# tie. SQLite uses the FTS5 table core_event_fts, PostgreSQL a GIN index
+# over a weighted tsvector; both come from migration 0008 and are kept in
+# sync by the database itself, so bulk_create, update() and cascading
+# deletes, which skip signals, are covered too. Other databases, and SQLite
+# built without FTS5, fall back to an icontains scan. So does SQLite when
+# a table rebuild of core_event has dropped the sync triggers: the index
+# would silently go stale. `manage.py rebuild_search_index` restores them.
+
+# Question words around the search terms
+STOPWORDS = frozenset("""
+    a an and any are at did do does find for have i in is look me my next of on search
+    show the time to up was what when whens where wheres which with
+""".split())
+TERM_RE = re.compile(r'\w+')
+MAX_TERMS = 8
+
+FTS_TABLE = 'core_event_fts'
+FTS_TRIGGERS = ('core_event_fts_insert', 'core_event_fts_delete', 'core_event_fts_update')
+
+# bm25() weights of the FTS5 columns: title, location, notes, user_id
+SQLITE_QUERY = (
+    "SELECT core_event.* FROM core_event_fts "
+    "JOIN core_event ON core_event.id = core_event_fts.rowid "
+    "WHERE core_event_fts MATCH %s "
+    "ORDER BY bm25(core_event_fts, 10.0, 4.0, 1.0, 0.0), core_event.scheduled_time < %s, core_event.scheduled_time "
+    "LIMIT %s"
+)
+
+# Must stay identical to the expression indexed by migration 0008
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(notes, '')), 'C')"
+)
+POSTGRES_QUERY = (
+    f"SELECT * FROM core_event WHERE user_id = %s AND ({POSTGRES_VECTOR}) @@ to_tsquery('simple', %s) "
+    f"ORDER BY ts_rank({POSTGRES_VECTOR}, to_tsquery('simple', %s)) DESC, scheduled_time < %s, scheduled_time "
+    "LIMIT %s"
+)
+
+_fulltext = {}
+
+
+def search_terms(message: str) -> list:
+    """The words of `message` worth searching for, in order, without repeats"""
+    terms = []
+    for word in TERM_RE.findall(message.lower()):
+        if len(word) > 1 and word not in STOPWORDS and word not in terms:
+            terms.append(word)
+    return terms[:MAX_TERMS]
+
+
+def missing_triggers(connection) -> list:
+    """FTS5 sync triggers missing on a SQLite connection that has the FTS table"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'core_event'")
+        present = {name for name, in cursor.fetchall()}
+    return [name for name in FTS_TRIGGERS if name not in present]
+
+
+def fulltext_available(alias: str) -> bool:
+    """Whether the database behind `alias` has an up-to-date full-text index"""
+    available = _fulltext.get(alias)
+    if available is None:
+        connection = connections[alias]
+        if connection.vendor == 'sqlite':
+            available = FTS_TABLE in connection.introspection.table_names()
+            missing = available and missing_triggers(connection)
+            if missing:
+                logger.warning("Full-text index on %s is not kept in sync (missing %s), searching without it; "
+                               "run manage.py rebuild_search_index", alias, ', '.join(missing))
+                available = False
+        else:
+            available = connection.vendor == 'postgresql'
+        _fulltext[alias] = available
+    return available
+
+
+def fulltext_events(user, terms: list, limit: int, now, alias: str = 'default') -> list:
+    """Ranked matches from the FTS5 table or the tsvector index"""
+    connection = connections[alias]
+    now = connection.ops.adapt_datetimefield_value(now)
+    if connection.vendor == 'sqlite':
+        match = ' OR '.join(f'"{term}"*' for term in terms)
+        params = [f'user_id:"{user.pk}" AND ({match})', now, limit]
+        query = SQLITE_QUERY
+    else:
+        tsquery = ' | '.join(f'{term}:*' for term in terms)
+        params = [user.pk, tsquery, tsquery, now, limit]
+        query = POSTGRES_QUERY
+    return list(Event.objects.db_manager(alias).raw(query, params))
+
+
+def scan_events(user, terms: list, limit: int, now, alias: str = 'default') -> list:
+    """The icontains fallback: every term against every text column, upcoming first"""
+    matches = Q()
+    for term in terms:
+        matches |= Q(title__icontains=term) | Q(location__icontains=term) | Q(notes__icontains=term)
+    past = ExpressionWrapper(Q(scheduled_time__lt=now), output_field=BooleanField())
+    return list(Event.objects.using(alias).filter(matches, user=user).order_by(past, 'scheduled_time')[:limit])
+
+
+def find_events(user, terms: list, limit: int = None, now=None) -> list:
+    """Up to `limit` of the user's events matching any of `terms`, best first"""
+    limit = limit or getattr(settings, 'SEARCH_MAX_RESULTS', 5)
+    now = now or timezone.now()
+    alias = router.db_for_read(Event) or 'default'
+    counters.incr('search.queries')
+    if fulltext_available(alias):
+        counters.incr('search.fulltext')
+        events = fulltext_events(user, terms, limit, now, alias)
+    else:
+        counters.incr('search.scans')
+        events = scan_events(user, terms, limit, now, alias)
+    if not events:
+        counters.incr('search.no_results')
+    return events
+
+
+@checks.register(checks.Tags.database)
+def check_search_index(app_configs=None, databases=None, **kwargs) -> list:
+    """W001 when a SQLite full-text index has lost its sync triggers"""
+    warnings = []
+    for alias in databases or ():
+        connection = connections[alias]
+        if connection.vendor != 'sqlite' or FTS_TABLE not in connection.introspection.table_names():
+            continue
+        missing = missing_triggers(connection)
+        if missing:
+            warnings.append(checks.Warning(
+                f"The full-text index {FTS_TABLE} on '{alias}' is missing its triggers {', '.join(missing)}; "
+                "search falls back to scanning.",
+                hint="Run manage.py rebuild_search_index.",
+                id='core.W001',
+            ))
+    return warnings
+
+
+def stats() -> dict:
+    queries = counters.get('search.queries')
+    no_results = counters.get('search.no_results')
+    return {
+        'queries': queries,
+        'fulltext': counters.get('search.fulltext'),
+        'scans': counters.get('search.scans'),
+        'no_results': no_results,
+        'no_result_rate': ratio(no_results, queries),
+    }
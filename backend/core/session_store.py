@@ -0,0 +1,204 @@
+# core/session_store.py
+import copy
+import json
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from .cache_backends import LocalLRUBackend, DjangoCacheBackend
+from .metrics import counters
+from .models import EventManagerUser
+
+
+class UserRowBackend:
+    """Session entries in EventManagerUser.current_conversation_state
+
+    Keys are session:<slot>:<user pk>; the column holds {slot: [value,
+    expires_at]}. Every worker process sees the same state, as with a shared
+    cache, without running one.
+    """
+
+    @staticmethod
+    def _parse(key: str):
+        _prefix, slot, user_id = key.split(':')
+        return slot, int(user_id)
+
+    def get(self, key):
+        slot, user_id = self._parse(key)
+        row = EventManagerUser.objects.filter(pk=user_id).values_list('current_conversation_state', flat=True).first()
+        entry = (row or {}).get(slot)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def set(self, key, value, timeout: float):
+        slot, user_id = self._parse(key)
+        # Pending events may carry datetimes; they come back as ISO strings
+        value = json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+        self._update(user_id, lambda entries: entries.__setitem__(slot, [value, time.time() + timeout]))
+
+    def delete(self, key):
+        slot, user_id = self._parse(key)
+        # Most clears (cancel, a finished flow) find nothing: skip the locked write
+        if not EventManagerUser.objects.filter(pk=user_id, current_conversation_state__has_key=slot).exists():
+            return
+        self._update(user_id, lambda entries: entries.pop(slot, None))
+
+    @staticmethod
+    def _update(user_id, change):
+        with transaction.atomic():
+            rows = EventManagerUser.objects.select_for_update().filter(pk=user_id)
+            entries = rows.values_list('current_conversation_state', flat=True).first() or {}
+            before = dict(entries)
+            change(entries)
+            now = time.time()
+            entries = {slot: entry for slot, entry in entries.items() if entry[1] > now}
+            if entries != before:
+                # update(): no post_save, so cached identities are not dropped
+                rows.update(current_conversation_state=entries or None)
+
+
+class SessionStore:
+    """User identity and in-flight conversation state
+
+    Identity never changes once a user exists, so it is cached in-process and,
+    when configured, in a shared cache; saving or deleting a user drops it
+    (core.signals). Conversation state must be seen by every worker process:
+    it lives in `state`, the user's row or a shared cache, and in-process
+    only for single-process deployments. Both expire on their own;
+    abandoned flows simply time out.
+    """
+
+    def __init__(self, local, shared=None, identity_ttl: int = 3600, state_ttl: int = 1800,
+                 location_ttl: int = 21600, state=None):
+        self.local = local
+        self.shared = shared
+        self.state = state or shared or local
+        self.identity_ttl = identity_ttl
+        self.state_ttl = state_ttl
+        self.location_ttl = location_ttl
+
+    @property
+    def _state_backend(self):
+        return self.state
+
+    @property
+    def _state_blocking(self) -> bool:
+        # Database and shared cache backends do I/O; async views call them on a worker thread
+        return self.state is not self.local
+
+    def get_user(self, phone_number: str):
+        """Return the user for a phone number, creating it only on first contact"""
+        key = f"session:user:{phone_number}"
+        user = self.local.get(key)
+        if user is None and self.shared:
+            user = self.shared.get(key)
+            if user is not None:
+                self.local.set(key, user, self.identity_ttl)
+        if user is not None:
+            counters.incr('session_store.user_hits')
+            # Callers get their own instance; the cached one is shared across threads
+            return copy.copy(user)
+
+        counters.incr('session_store.user_misses')
+        user, created = EventManagerUser.objects.get_or_create(phone_number=phone_number)
+        self.local.set(key, user, self.identity_ttl)
+        if self.shared:
+            self.shared.set(key, user, self.identity_ttl)
+        return copy.copy(user)
+
+    async def aget_user(self, phone_number: str):
+        """get_user for async views: in-process hits stay on the event loop"""
+        user = self.local.get(f"session:user:{phone_number}")
+        if user is not None:
+            counters.incr('session_store.user_hits')
+            return copy.copy(user)
+        if self.shared:
+            # Shared cache clients block; leave the rest to a worker thread
+            return await sync_to_async(self.get_user)(phone_number)
+
+        counters.incr('session_store.user_misses')
+        user, created = await EventManagerUser.objects.aget_or_create(phone_number=phone_number)
+        self.local.set(f"session:user:{phone_number}", user, self.identity_ttl)
+        return copy.copy(user)
+
+    def get_state(self, user):
+        state = self._state_backend.get(f"session:state:{user.pk}")
+        return copy.deepcopy(state) if state is not None else None
+
+    def set_state(self, user, state: dict):
+        self._state_backend.set(f"session:state:{user.pk}", copy.deepcopy(state), self.state_ttl)
+
+    def clear_state(self, user):
+        self._state_backend.delete(f"session:state:{user.pk}")
+
+    # Async views use these; only an in-process state backend stays on the event loop
+    async def aget_state(self, user):
+        if self._state_blocking:
+            return await sync_to_async(self.get_state)(user)
+        return self.get_state(user)
+
+    async def aset_state(self, user, state: dict):
+        if self._state_blocking:
+            return await sync_to_async(self.set_state)(user, state)
+        self.set_state(user, state)
+
+    async def aclear_state(self, user):
+        if self._state_blocking:
+            return await sync_to_async(self.clear_state)(user)
+        self.clear_state(user)
+
+    def get_location(self, user):
+        """(latitude, longitude) the user last shared, while it is fresh"""
+        return self._state_backend.get(f"session:location:{user.pk}")
+
+    def set_location(self, user, latitude: float, longitude: float):
+        self._state_backend.set(f"session:location:{user.pk}", (latitude, longitude), self.location_ttl)
+
+    def forget_user(self, phone_number: str):
+        """Drop a cached identity, e.g. after the user row was changed or deleted"""
+        key = f"session:user:{phone_number}"
+        self.local.delete(key)
+        if self.shared:
+            self.shared.delete(key)
+
+
+def build_session_store():
+    alias = getattr(settings, 'SESSION_STORE_SHARED_ALIAS', '')
+    local = LocalLRUBackend(getattr(settings, 'SESSION_STORE_MAX_USERS', 10000))
+    shared = DjangoCacheBackend(alias) if alias else None
+    backend = getattr(settings, 'SESSION_STATE_BACKEND', '') or ('cache' if shared else 'database')
+    if backend == 'database':
+        state = UserRowBackend()
+    elif backend == 'cache':
+        if shared is None:
+            raise ValueError("SESSION_STATE_BACKEND 'cache' needs SESSION_STORE_SHARED_ALIAS")
+        state = shared
+    elif backend == 'local':
+        state = local
+    else:
+        raise ValueError(f"Unknown SESSION_STATE_BACKEND: {backend}")
+    return SessionStore(
+        local,
+        shared,
+        identity_ttl=getattr(settings, 'SESSION_IDENTITY_TTL', 3600),
+        state_ttl=getattr(settings, 'CONVERSATION_STATE_TTL', 1800),
+        location_ttl=getattr(settings, 'CATALOG_LOCATION_TTL', 21600),
+        state=state,
+    )
+
+
+_session_store = None
+_lock = threading.Lock()
+
+
+def get_session_store():
+    """Return the process-wide session store"""
+    global _session_store
+    if _session_store is None:
+        with _lock:
+            if _session_store is None:
+                _session_store = build_session_store()
+    return _session_store
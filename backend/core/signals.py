@@ -0,0 +1,114 @@
+# core/signals.py
+from datetime import timezone as dt_timezone
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+from .agenda_cache import get_agenda_cache
+from .db_router import note_write
+from .geohash import encode
+from .interval_index import get_interval_indexes
+from .models import CatalogEvent, Event, EventManagerUser
+from .occurrences import materialize_event
+from .session_store import get_session_store
+
+# Sent after Event.objects.bulk_create (which skips post_save), with the
+# keyword arguments `user` and `events` (the created instances)
+events_bulk_created = Signal()
+
+
+@receiver(post_save, sender=Event)
+def refresh_event_occurrences(sender, instance, created, raw=False, **kwargs):
+    """Keep the materialized occurrence window in sync with an edited series"""
+    if raw:
+        return
+    if instance.is_recurring or not created:
+        materialize_event(instance)
+
+
+@receiver(events_bulk_created, sender=Event)
+def materialize_bulk_created(sender, user, events, **kwargs):
+    """Materialize the occurrence window of bulk-created series"""
+    from .agenda import user_timezone
+    tz = user_timezone(user)
+    for event in events:
+        if event.is_recurring:
+            materialize_event(event, tz=tz)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_agenda(sender, instance, raw=False, **kwargs):
+    """Rendered agendas of the event's owner are stale once it changes"""
+    if raw:
+        return
+    get_agenda_cache().invalidate(instance.user_id)
+
+
+@receiver(events_bulk_created, sender=Event)
+def invalidate_agenda_bulk(sender, user, events, **kwargs):
+    get_agenda_cache().invalidate(user.pk)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def stick_to_primary(sender, instance, raw=False, **kwargs):
+    """The owner's next agenda reads must see this write, even before replicas catch up"""
+    if raw:
+        return
+    note_write(instance.user_id)
+
+
+@receiver(events_bulk_created, sender=Event)
+def stick_to_primary_bulk(sender, user, events, **kwargs):
+    note_write(user.pk)
+
+
+@receiver(post_save, sender=EventManagerUser)
+@receiver(post_delete, sender=EventManagerUser)
+def forget_cached_user(sender, instance, raw=False, **kwargs):
+    """Cached identities are copies of the row: drop them once it changes"""
+    if raw:
+        return
+    get_session_store().forget_user(instance.phone_number)
+
+
+@receiver(post_save, sender=EventManagerUser)
+def stick_user_to_primary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    note_write(instance.pk)
+
+
+@receiver(post_save, sender=Event)
+def update_interval_index(sender, instance, raw=False, **kwargs):
+    """Patch the owner's cached busy intervals instead of dropping them"""
+    if raw:
+        return
+    get_interval_indexes().event_saved(instance)
+
+
+@receiver(post_save, sender=EventManagerUser)
+def seed_interval_index(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        get_interval_indexes().user_created(instance.pk)
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_interval_index(sender, instance, **kwargs):
+    get_interval_indexes().event_deleted(instance)
+
+
+@receiver(events_bulk_created, sender=Event)
+def update_interval_index_bulk(sender, user, events, **kwargs):
+    from .agenda import user_timezone
+    tz = user_timezone(user)
+    indexes = get_interval_indexes()
+    for event in events:
+        indexes.event_saved(event, tz=tz)
+
+
+@receiver(pre_save, sender=CatalogEvent)
+def set_catalog_index_fields(sender, instance, raw=False, **kwargs):
+    """Single saves (admin edits); the feed loader fills these in itself"""
+    if not raw:
+        instance.geohash = encode(instance.latitude, instance.longitude)
+        instance.starts_on = instance.starts_at.astimezone(dt_timezone.utc).date()
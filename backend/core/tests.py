@@ -1,3 +1,1386 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import io
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import path
+from django.utils import timezone
+from twilio.twiml.messaging_response import MessagingResponse
+from .ai_cache import ParseCache
+from . import (agenda_cache, catalog, feeds, intent_router, interval_index, message_queue, metrics, search,
+               session_store, views, webhook_dedup)
+from .cache_backends import LocalLRUBackend
+from .clients import LazyClient, ai_service_provider
+from .db_router import reading_from
+from .debounce import MessageDebouncer, get_debouncer
+from .event_creator import EventCreationService
+from .fast_parser import FastPathEventParser
+from .geohash import KM_PER_DEGREE, covered_km, distance_km, encode, neighbourhood
+from .importer import import_calendar
+from .interval_index import IntervalIndex, get_interval_indexes
+from .llm_client import CircuitBreaker, GuardedLLMClient, LLMUnavailable
+from .metrics import counters, histograms
+from .models import CatalogEvent, Event, EventManagerUser, EventOccurrence, ReminderDelivery
+from .occurrences import ensure_materialized, hot_horizon, materialize_event
+from .outbound import OutboundSender, RetryPolicy, SenderBuckets, TokenBucket
+from .recurrence import RecurrenceRule, iter_occurrences
+from .reminders import ReminderDispatcher
 
-# Create your tests here.
+NOW = datetime(2026, 10, 17, 15, 0, tzinfo=dt_timezone.utc)
+LAGOS = ZoneInfo('Africa/Lagos')
+NEW_YORK = ZoneInfo('America/New_York')
+
+
+def reset_process_caches():
+    """Drop the in-process caches, which outlive the rows a test rolls back"""
+    session_store._session_store = None
+    agenda_cache._agenda_cache = None
+    interval_index._interval_indexes = None
+    webhook_dedup._webhook_dedup = None
+
+
+class ParseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = ParseCache(LocalLRUBackend(16))
+
+    def test_key_includes_the_senders_timezone(self):
+        message = "Dentist tomorrow at 3pm"
+        with timezone.override(LAGOS):
+            self.cache.set(message, [{'title': 'Dentist', 'datetime': datetime(2026, 10, 18, 15, 0, tzinfo=LAGOS)}],
+                           NOW)
+            cached = self.cache.get(message, NOW)
+        self.assertEqual(cached[0]['datetime'], datetime(2026, 10, 18, 15, 0, tzinfo=LAGOS))
+        with timezone.override(NEW_YORK):
+            self.assertIsNone(self.cache.get(message, NOW))
+
+    def test_cached_events_are_copies(self):
+        with timezone.override(LAGOS):
+            self.cache.set("gym", [{'title': 'Gym', 'datetime': None}], NOW)
+            self.cache.get("gym", NOW)[0]['title'] = 'changed'
+            self.assertEqual(self.cache.get("gym", NOW)[0]['title'], 'Gym')
+
+
+class MaterializeOnPrimaryTests(TestCase):
+    def test_materializing_inside_replica_reads_reads_the_primary(self):
+        user = EventManagerUser.objects.create(phone_number='+15550000001')
+        event = Event.objects.create(user=user, title='Standup', scheduled_time=timezone.now() + timedelta(hours=1),
+                                     is_recurring=True, recurrence_pattern='FREQ=DAILY')
+        count = EventOccurrence.objects.filter(event=event).count()
+        Event.objects.filter(pk=event.pk).update(occurrences_until=None)
+        # An alias with no connection: any read routed to it fails
+        with reading_from('replica_unreachable'):
+            self.assertTrue(ensure_materialized(user, timezone.now() + timedelta(days=7)))
+        self.assertEqual(EventOccurrence.objects.filter(event=event).count(), count)
+        self.assertIsNotNone(Event.objects.get(pk=event.pk).occurrences_until)
+
+
+class FastParserTests(SimpleTestCase):
+    # A Saturday, noon UTC
+    now = datetime(2026, 10, 17, 12, 0, tzinfo=dt_timezone.utc)
+
+    def parse(self, message):
+        return FastPathEventParser().parse(message, self.now)
+
+    def assertAccepted(self, event, title, when, duration=None):
+        self.assertGreaterEqual(event['confidence'], settings.FAST_PARSER_CONFIDENCE_THRESHOLD)
+        self.assertEqual(event['title'], title)
+        self.assertEqual(event['datetime'], when)
+        self.assertEqual(event['duration_minutes'], duration)
+
+    def test_simple_event(self):
+        self.assertAccepted(self.parse("Dentist tomorrow at 3pm"), 'Dentist',
+                            datetime(2026, 10, 18, 15, 0, tzinfo=dt_timezone.utc))
+
+    def test_duration(self):
+        tomorrow_3pm = datetime(2026, 10, 18, 15, 0, tzinfo=dt_timezone.utc)
+        self.assertAccepted(self.parse("Review tomorrow at 3pm for 2 hours"), 'Review', tomorrow_3pm, 120)
+        self.assertAccepted(self.parse("Review tomorrow at 3pm for 45 mins"), 'Review', tomorrow_3pm, 45)
+        self.assertAccepted(self.parse("Review tomorrow at 3pm for an hour and a half"), 'Review', tomorrow_3pm, 90)
+        self.assertAccepted(self.parse("Review tomorrow at 3pm for half an hour"), 'Review', tomorrow_3pm, 30)
+
+    def test_end_time(self):
+        self.assertAccepted(self.parse("Review tomorrow at 3pm until 5pm"), 'Review',
+                            datetime(2026, 10, 18, 15, 0, tzinfo=dt_timezone.utc), 120)
+        self.assertAccepted(self.parse("Party tomorrow 10pm till 1:30am"), 'Party',
+                            datetime(2026, 10, 18, 22, 0, tzinfo=dt_timezone.utc), 210)
+
+    def test_unread_length_goes_to_the_llm(self):
+        threshold = settings.FAST_PARSER_CONFIDENCE_THRESHOLD
+        self.assertLess(self.parse("Review tomorrow at 3pm for a couple of hours")['confidence'], threshold)
+        self.assertLess(self.parse("Review tomorrow at 3pm until 5")['confidence'], threshold)
+        self.assertLess(self.parse("Study until exams tomorrow 3pm")['confidence'], threshold)
+
+    def test_weekend_abbreviations(self):
+        self.assertAccepted(self.parse("party sat 8pm"), 'Party', datetime(2026, 10, 17, 20, 0, tzinfo=dt_timezone.utc))
+        self.assertAccepted(self.parse("brunch on sun at 11am"), 'Brunch',
+                            datetime(2026, 10, 18, 11, 0, tzinfo=dt_timezone.utc))
+        # Not a day: the word is part of the title
+        self.assertAccepted(self.parse("sun screen shopping tomorrow 3pm"), 'Sun screen shopping',
+                            datetime(2026, 10, 18, 15, 0, tzinfo=dt_timezone.utc))
+
+
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        self.user = EventManagerUser.objects.create(phone_number='+15550000002', timezone='Africa/Lagos')
+
+    def series(self, pattern, first, tz=LAGOS):
+        return Event(user=self.user, title='Class', scheduled_time=first.replace(tzinfo=tz),
+                     is_recurring=True, recurrence_pattern=pattern)
+
+    def expand(self, event, tz=LAGOS):
+        start = event.scheduled_time
+        return [timezone.localtime(starts_at, tz).replace(tzinfo=None)
+                for starts_at in iter_occurrences(event, start, start + timedelta(days=60), tz)]
+
+    def test_count(self):
+        event = self.series('FREQ=WEEKLY;BYDAY=MO,WE;COUNT=3', datetime(2026, 10, 19, 9, 0))
+        self.assertEqual(self.expand(event), [datetime(2026, 10, 19, 9, 0), datetime(2026, 10, 21, 9, 0),
+                                              datetime(2026, 10, 26, 9, 0)])
+
+    def test_local_until_is_inclusive(self):
+        event = self.series('FREQ=DAILY;UNTIL=20261021T090000', datetime(2026, 10, 19, 9, 0))
+        self.assertEqual(self.expand(event)[-1], datetime(2026, 10, 21, 9, 0))
+
+    def test_utc_until(self):
+        # 08:00Z is 09:00 in Lagos: the last class is on the 21st
+        event = self.series('FREQ=DAILY;UNTIL=20261021T080000Z', datetime(2026, 10, 19, 9, 0))
+        self.assertEqual(self.expand(event)[-1], datetime(2026, 10, 21, 9, 0))
+        # 12:00Z is 08:00 in New York, before that day's 09:00 class
+        event = self.series('FREQ=DAILY;UNTIL=20261021T120000Z', datetime(2026, 10, 19, 9, 0), NEW_YORK)
+        self.assertEqual(self.expand(event, NEW_YORK)[-1], datetime(2026, 10, 20, 9, 0))
+
+    def test_utc_until_survives_normalization(self):
+        rule = RecurrenceRule.parse('RRULE:FREQ=DAILY;UNTIL=20261021T080000Z')
+        self.assertEqual(str(rule), 'FREQ=DAILY;UNTIL=20261021T080000Z')
+        self.assertEqual(str(RecurrenceRule.parse('FREQ=DAILY;UNTIL=20261021')), 'FREQ=DAILY;UNTIL=20261021T235959')
+
+    def test_window_extension(self):
+        now = timezone.now()
+        event = self.series('FREQ=DAILY', timezone.localtime(now, LAGOS).replace(tzinfo=None) + timedelta(hours=1))
+        event.save()
+        materialize_event(event, tz=LAGOS, now=now)
+        first_end = Event.objects.get(pk=event.pk).occurrences_until
+        rows = EventOccurrence.objects.filter(event=event).count()
+
+        later = now + timedelta(days=5)
+        self.assertTrue(ensure_materialized(self.user, hot_horizon(later), now=later))
+        self.assertEqual(Event.objects.get(pk=event.pk).occurrences_until, first_end + timedelta(days=5))
+        self.assertEqual(EventOccurrence.objects.filter(event=event).count(), rows + 5)
+        starts = list(EventOccurrence.objects.filter(event=event).values_list('starts_at', flat=True))
+        self.assertEqual(len(starts), len(set(starts)))
+
+    def test_byday_filters_daily(self):
+        event = self.series('FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR;COUNT=6', datetime(2026, 10, 16, 9, 0))
+        self.assertEqual([day.day for day in self.expand(event)], [16, 19, 20, 21, 22, 23])
+
+    def test_byday_expands_monthly(self):
+        event = self.series('FREQ=MONTHLY;BYDAY=MO;COUNT=4', datetime(2026, 10, 17, 9, 0))
+        self.assertEqual([(day.month, day.day) for day in self.expand(event)], [(10, 19), (10, 26), (11, 2), (11, 9)])
+
+    def test_ordinal_byday(self):
+        event = self.series('FREQ=MONTHLY;BYDAY=1MO,-1FR;COUNT=4', datetime(2026, 10, 1, 9, 0))
+        self.assertEqual([(day.month, day.day) for day in self.expand(event)], [(10, 5), (10, 30), (11, 2), (11, 27)])
+        self.assertEqual(str(RecurrenceRule.parse('FREQ=MONTHLY;BYDAY=-1FR,1MO')), 'FREQ=MONTHLY;BYDAY=-1FR,1MO')
+
+    def test_bymonth(self):
+        event = self.series('FREQ=YEARLY;BYMONTH=3,9;COUNT=3', datetime(2026, 10, 17, 9, 0))
+        start = event.scheduled_time
+        starts = [timezone.localtime(starts_at, LAGOS).date()
+                  for starts_at in iter_occurrences(event, start, start + timedelta(days=800), LAGOS)]
+        self.assertEqual([(day.year, day.month) for day in starts], [(2027, 3), (2027, 9), (2028, 3)])
+
+    def test_wkst_moves_the_week_boundary(self):
+        monday = self.series('FREQ=WEEKLY;INTERVAL=2;BYDAY=SU,TU;COUNT=3', datetime(2026, 10, 18, 9, 0))
+        sunday = self.series('FREQ=WEEKLY;INTERVAL=2;BYDAY=SU,TU;WKST=SU;COUNT=3', datetime(2026, 10, 18, 9, 0))
+        self.assertEqual([day.day for day in self.expand(monday)], [18, 27, 1])
+        self.assertEqual([day.day for day in self.expand(sunday)], [18, 20, 1])
+
+    def test_unsupported_parts_are_rejected(self):
+        for pattern in ('FREQ=MONTHLY;BYDAY=MO;BYSETPOS=1', 'FREQ=DAILY;BYHOUR=9', 'FREQ=WEEKLY;BYDAY=1MO',
+                        'FREQ=YEARLY;BYDAY=MO', 'FREQ=WEEKLY;BYMONTHDAY=3', 'FREQ=MONTHLY;BYDAY=6MO',
+                        'FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30', 'FREQ=DAILY;WKST=XX'):
+            with self.subTest(pattern=pattern), self.assertRaises(ValueError):
+                RecurrenceRule.parse(pattern)
+
+    def test_importer_reports_unsupported_rules(self):
+        ics = ('BEGIN:VCALENDAR\nBEGIN:VEVENT\nSUMMARY:Board meeting\nDTSTART:20261102T090000Z\n'
+               'RRULE:FREQ=MONTHLY;BYDAY=MO;BYSETPOS=1\nEND:VEVENT\nEND:VCALENDAR\n')
+        with self.assertLogs('core.importer', 'INFO'):
+            result = import_calendar(self.user, io.StringIO(ics), name='board.ics')
+        self.assertEqual((result['created'], result['invalid']), (0, 1))
+        self.assertIn('BYSETPOS', result['errors'][0])
+        self.assertFalse(Event.objects.filter(title='Board meeting').exists())
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        search._fulltext.clear()
+        if not search.fulltext_available('default'):
+            self.skipTest("SQLite without FTS5")
+        self.user = EventManagerUser.objects.create(phone_number='+15550000003')
+        self.now = timezone.now()
+
+    def add(self, title, days, user=None, **fields):
+        return Event.objects.create(user=user or self.user, title=title,
+                                    scheduled_time=self.now + timedelta(days=days), **fields)
+
+    def test_title_hits_rank_first_and_prefixes_match(self):
+        in_notes = self.add('Checkup', 1, notes='ask the dentist about the crown')
+        in_title = self.add('Dentist', 3)
+        self.assertEqual(search.find_events(self.user, ['dent'], 5, self.now), [in_title, in_notes])
+
+    def test_upcoming_before_past_on_a_tie(self):
+        past = self.add('Piano lesson', -2)
+        upcoming = self.add('Piano lesson', 2)
+        self.assertEqual(search.find_events(self.user, ['piano'], 5, self.now), [upcoming, past])
+
+    def test_only_the_users_events(self):
+        other = EventManagerUser.objects.create(phone_number='+15550000004')
+        self.add('Dentist', 1, user=other)
+        self.assertEqual(search.find_events(self.user, ['dentist'], 5, self.now), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        event = self.add('Dentist', 1)
+        Event.objects.filter(pk=event.pk).update(title='Orthodontist')
+        self.assertEqual(search.find_events(self.user, ['dentist'], 5, self.now), [])
+        self.assertEqual([e.pk for e in search.find_events(self.user, ['ortho'], 5, self.now)], [event.pk])
+        event.delete()
+        self.assertEqual(search.find_events(self.user, ['ortho'], 5, self.now), [])
+
+    def test_scan_fallback_matches_every_column(self):
+        event = self.add('Checkup', 1, location='Dental Clinic')
+        self.assertEqual(search.scan_events(self.user, ['dental'], 5, self.now), [event])
+
+
+class SearchTriggerTests(TransactionTestCase):
+    def setUp(self):
+        search._fulltext.clear()
+        if not search.fulltext_available('default'):
+            self.skipTest("SQLite without FTS5")
+        self.addCleanup(search._fulltext.clear)
+
+    def test_missing_trigger_falls_back_and_warns_until_rebuilt(self):
+        user = EventManagerUser.objects.create(phone_number='+15550000005')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER core_event_fts_insert')
+        event = Event.objects.create(user=user, title='Dentist', scheduled_time=timezone.now())
+        search._fulltext.clear()
+        self.assertFalse(search.fulltext_available('default'))
+        self.assertEqual(search.find_events(user, ['dentist']), [event])
+        self.assertEqual([w.id for w in search.check_search_index(databases=['default'])], ['core.W001'])
+
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertTrue(search.fulltext_available('default'))
+        self.assertEqual(search.check_search_index(databases=['default']), [])
+        self.assertEqual(search.fulltext_events(user, ['dentist'], 5, timezone.now()), [event])
+
+
+class BrokenBackend(LocalLRUBackend):
+    def get(self, key):
+        raise ConnectionError("cache is down")
+
+    def set(self, key, value, timeout):
+        raise ConnectionError("cache is down")
+
+    def add(self, key, value, timeout):
+        raise ConnectionError("cache is down")
+
+    def get_many(self, keys):
+        raise ConnectionError("cache is down")
+
+    def set_many(self, mapping, timeout):
+        raise ConnectionError("cache is down")
+
+    def delete(self, key):
+        raise ConnectionError("cache is down")
+
+
+class WebhookDedupTests(SimpleTestCase):
+    def setUp(self):
+        self.dedup = webhook_dedup.WebhookDedup(LocalLRUBackend(16), wait=0.3, poll_interval=0.01)
+
+    def test_claim_finish_replay(self):
+        self.assertIsNone(self.dedup.claim('SM1'))
+        self.dedup.finish('SM1', '<Response>hi</Response>', llm_calls=1)
+        self.assertEqual(self.dedup.claim('SM1'), '<Response>hi</Response>')
+
+    def test_repeat_while_running_is_acknowledged_at_once(self):
+        self.assertIsNone(self.dedup.claim('SM2'))
+        started = time.monotonic()
+        self.assertEqual(self.dedup.claim('SM2'), '')
+        self.assertLess(time.monotonic() - started, 0.05)
+
+    def test_running_request_sends_out_of_band_after_a_pending_repeat(self):
+        self.assertIsNone(self.dedup.claim('SM8'))
+        self.assertEqual(self.dedup.claim('SM8'), '')
+        self.assertTrue(self.dedup.finish('SM8', 'reply'))
+        self.assertEqual(self.dedup.claim('SM8'), '')
+
+    def test_no_out_of_band_reply_without_a_pending_repeat(self):
+        self.assertIsNone(self.dedup.claim('SM9'))
+        self.assertFalse(self.dedup.finish('SM9', 'reply'))
+        self.assertEqual(self.dedup.claim('SM9'), 'reply')
+
+    def test_repeat_racing_finish_gets_the_reply_inline(self):
+        self.assertIsNone(self.dedup.claim('SM10'))
+        self.assertFalse(self.dedup.finish('SM10', 'reply'))
+        self.assertEqual(self.dedup._still_running('SM10'), 'reply')
+
+    def test_release_lets_the_retry_run(self):
+        self.assertIsNone(self.dedup.claim('SM3'))
+        self.dedup.release('SM3')
+        self.assertIsNone(self.dedup.claim('SM3'))
+
+    def test_async_repeat_waits_for_the_reply(self):
+        async def scenario():
+            self.assertIsNone(await self.dedup.aclaim('SM4'))
+            repeat = asyncio.ensure_future(self.dedup.aclaim('SM4'))
+            await asyncio.sleep(0.05)
+            self.dedup.finish('SM4', 'reply')
+            return await repeat
+        self.assertEqual(asyncio.run(scenario()), 'reply')
+
+    def test_wait_is_capped_below_the_twilio_timeout(self):
+        self.assertEqual(webhook_dedup.WebhookDedup(LocalLRUBackend(), wait=30).wait, webhook_dedup.MAX_WAIT)
+
+    def test_backend_errors_fail_open(self):
+        dedup = webhook_dedup.WebhookDedup(BrokenBackend())
+        self.assertIsNone(dedup.claim('SM5'))
+        self.assertIsNone(asyncio.run(dedup.aclaim('SM5')))
+        self.assertEqual(dedup._still_running('SM5'), '')
+        self.assertFalse(dedup.finish('SM5', 'reply'))
+        dedup.release('SM5')
+
+
+@override_settings(WEBHOOK_ASYNC_MODE=False, MESSAGE_DEBOUNCE_SECONDS=0)
+class WebhookDedupViewTests(TestCase):
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+
+    def post(self, sid):
+        return self.client.post('/webhook/whatsapp/', {'From': 'whatsapp:+15550000006', 'MessageSid': sid,
+                                                       'Body': 'Dentist tomorrow at 3pm'}, secure=True)
+
+    def test_repeated_message_sid_creates_one_event_and_replays_the_reply(self):
+        first, repeat = self.post('SM6'), self.post('SM6')
+        self.assertEqual(repeat.content, first.content)
+        self.assertEqual(Event.objects.filter(title='Dentist').count(), 1)
+
+    def test_repeat_while_running_gets_the_reply_out_of_band(self):
+        repeats, webhook_reply = [], views.webhook_reply
+
+        def reply_after_a_retry(request):
+            repeats.append(self.post('SM11'))
+            return webhook_reply(request)
+
+        sender = mock.Mock()
+        with mock.patch.object(views, 'webhook_reply', reply_after_a_retry), \
+                mock.patch.object(views, 'get_outbound_sender', return_value=sender):
+            first = self.post('SM11')
+        empty = str(MessagingResponse()).encode()
+        self.assertEqual([r.content for r in repeats], [empty])
+        self.assertEqual(first.content, empty)
+        sender.submit.assert_called_once()
+        self.assertEqual(sender.submit.call_args.kwargs['to'], 'whatsapp:+15550000006')
+        self.assertIn('Event Created Successfully', sender.submit.call_args.kwargs['body'])
+        self.assertEqual(self.post('SM11').content, empty)
+        self.assertEqual(Event.objects.filter(title='Dentist').count(), 1)
+
+    def test_cache_errors_do_not_fail_the_webhook(self):
+        webhook_dedup._webhook_dedup = webhook_dedup.WebhookDedup(BrokenBackend())
+        response = self.post('SM7')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Event.objects.filter(title='Dentist').count(), 1)
+
+
+class IntervalIndexTests(SimpleTestCase):
+    def setUp(self):
+        hour = 3600
+        base = NOW.timestamp()
+        # An all-day block, then 10-11 and 11-12 back to back
+        self.index = IntervalIndex(NOW - timedelta(days=1), NOW + timedelta(days=2), [
+            (base - 2 * hour, base + 10 * hour, 1, 'Workshop'),
+            (base + 10 * hour, base + 11 * hour, 2, 'Call'),
+            (base + 11 * hour, base + 12 * hour, 3, 'Lunch'),
+        ])
+
+    def ids(self, start_hours, end_hours):
+        start, end = NOW + timedelta(hours=start_hours), NOW + timedelta(hours=end_hours)
+        return [item[2] for item in self.index.overlapping(start, end)]
+
+    def test_overlapping_finds_long_intervals_that_started_earlier(self):
+        self.assertEqual(self.ids(9, 9.5), [1])
+
+    def test_touching_intervals_do_not_overlap(self):
+        self.assertEqual(self.ids(10, 11), [2])
+        self.assertEqual(self.ids(12, 13), [])
+
+    def test_free_slots(self):
+        slots = self.index.free_slots(NOW, NOW + timedelta(hours=14), timedelta(minutes=90))
+        self.assertEqual(slots, [(NOW + timedelta(hours=12), NOW + timedelta(hours=14))])
+        self.index.add(NOW.timestamp() + 12.5 * 3600, NOW.timestamp() + 13 * 3600, 4, 'Coffee')
+        self.assertEqual(self.index.free_slots(NOW, NOW + timedelta(hours=14), timedelta(minutes=90)), [])
+        self.index.remove_event(4)
+        self.assertEqual(len(self.index), 3)
+
+
+class IntervalIndexCacheTests(TestCase):
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = EventManagerUser.objects.create(phone_number='+15550000007')
+        self.start = (timezone.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+    def event(self, title, hours=0, minutes=60, **fields):
+        return Event(user=self.user, title=title, scheduled_time=self.start + timedelta(hours=hours),
+                     duration_minutes=minutes, **fields)
+
+    def test_new_user_starts_with_an_empty_cached_index(self):
+        builds = counters.get('interval_index.builds')
+        self.assertEqual(get_interval_indexes().conflicts(self.user, self.event('Dentist')), [])
+        self.assertEqual(counters.get('interval_index.builds'), builds)
+
+    def test_saves_and_deletes_patch_the_cached_index(self):
+        indexes = get_interval_indexes()
+        standup = self.event('Standup', is_recurring=True, recurrence_pattern='FREQ=DAILY')
+        standup.save()
+        review = self.event('Review', hours=2)
+        review.save()
+        builds = counters.get('interval_index.builds')
+
+        self.assertEqual([item[3] for item in indexes.conflicts(self.user, self.event('Dentist', hours=24.5))],
+                         ['Standup'])
+        self.assertEqual([item[3] for item in indexes.conflicts(self.user, self.event('Gym', hours=2.5))],
+                         ['Review'])
+        review.delete()
+        self.assertEqual(indexes.conflicts(self.user, self.event('Gym', hours=2.5)), [])
+        self.assertEqual(counters.get('interval_index.builds'), builds)
+
+    def test_cold_index_is_built_from_the_database(self):
+        self.event('Standup', is_recurring=True, recurrence_pattern='FREQ=WEEKLY').save()
+        self.event('Review', hours=2).save()
+        reset_process_caches()
+        busy = get_interval_indexes().free_slots(self.user, self.start, self.start + timedelta(hours=4),
+                                                 timedelta(minutes=60))
+        self.assertEqual(busy, [(self.start + timedelta(hours=1), self.start + timedelta(hours=2)),
+                                (self.start + timedelta(hours=3), self.start + timedelta(hours=4))])
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode(self):
+        self.assertEqual(encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(encode(0.0, 0.0, 5), 's0000')
+
+    def test_neighbourhood_holds_every_point_within_covered_km(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            lat, lon = rng.uniform(-60, 60), rng.uniform(-179, 179)
+            precision = rng.randint(3, 7)
+            cells = neighbourhood(lat, lon, precision)
+            self.assertIn(encode(lat, lon, precision), cells)
+            reach = covered_km(lat, precision) * 0.999
+            bearing = rng.uniform(0, 2 * math.pi)
+            # A point about `reach` km away in a random direction
+            other_lat = lat + reach * math.cos(bearing) / KM_PER_DEGREE
+            other_lon = lon + reach * math.sin(bearing) / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+            if distance_km(lat, lon, other_lat, other_lon) <= covered_km(lat, precision):
+                self.assertIn(encode(other_lat, other_lon, precision), cells)
+
+    def test_neighbourhood_wraps_the_antimeridian(self):
+        cells = neighbourhood(0.0, 179.99, 4)
+        self.assertTrue(any(cell.startswith('8') for cell in cells))
+
+
+class CatalogTests(TestCase):
+    # Lagos
+    lat, lon = 6.5244, 3.3792
+
+    def setUp(self):
+        self.now = timezone.now().replace(microsecond=0)
+        rng = random.Random(1)
+        CatalogEvent.objects.bulk_create([
+            CatalogEvent(source='test', external_id=str(i), title=f"Event {i}",
+                         starts_at=self.now + timedelta(hours=rng.uniform(0, 72)),
+                         latitude=self.lat + rng.gauss(0, 0.08), longitude=self.lon + rng.gauss(0, 0.08),
+                         geohash='', starts_on=self.now.date())
+            for i in range(400)
+        ])
+        # bulk_create skips pre_save: fill the index columns like the loader does
+        for event in CatalogEvent.objects.all():
+            event.save()
+
+    def brute_force(self, start, end, limit, radius_km):
+        found = sorted((distance_km(self.lat, self.lon, e.latitude, e.longitude), e.starts_at, e.pk)
+                       for e in CatalogEvent.objects.filter(starts_at__gte=start, starts_at__lt=end))
+        return [pk for distance, _, pk in found if distance <= radius_km][:limit]
+
+    def test_nearby_matches_a_full_scan(self):
+        for hours, limit, radius in ((24, 5, 10), (72, 10, 3), (6, 3, 25), (48, 50, 1)):
+            start, end = self.now, self.now + timedelta(hours=hours)
+            found = catalog.nearby(self.lat, self.lon, start, end, limit=limit, radius_km=radius)
+            self.assertEqual([event.pk for _, event in found], self.brute_force(start, end, limit, radius))
+            self.assertEqual([d for d, _ in found], sorted(d for d, _ in found))
+
+    def test_only_events_starting_in_the_window(self):
+        start, end = self.now + timedelta(days=1), self.now + timedelta(days=2)
+        for _, event in catalog.nearby(self.lat, self.lon, start, end, limit=50, radius_km=50):
+            self.assertTrue(start <= event.starts_at < end)
+
+    def test_nothing_nearby(self):
+        self.assertEqual(catalog.nearby(-33.9, 18.4, self.now, self.now + timedelta(days=3)), [])
+
+    def test_reloading_a_feed_updates_rows_in_place(self):
+        feed = ("id,title,start,lat,lon\n"
+                f"a1,Concert,{(self.now + timedelta(hours=3)).isoformat()},6.45,3.39\n"
+                "a2,No time,,6.45,3.39\n")
+        result = catalog.load_catalog(io.BytesIO(feed.encode()), name='city.csv')
+        self.assertEqual((result['loaded'], result['invalid']), (1, 1))
+        catalog.load_catalog(io.BytesIO(feed.replace('Concert', 'Concert (moved)').encode()), name='city.csv')
+        event = CatalogEvent.objects.get(source='city', external_id='a1')
+        self.assertEqual(event.title, 'Concert (moved)')
+        self.assertEqual(event.geohash, encode(6.45, 3.39, catalog.PRECISION))
+
+
+class MessageQueueTests(SimpleTestCase):
+    def test_in_process_queue_is_fifo(self):
+        jobs = message_queue.InProcessQueue()
+        jobs.put({'body': 'a'})
+        jobs.put({'body': 'b'})
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual([jobs.get(timeout=0)['body'], jobs.get(timeout=0)['body']], ['a', 'b'])
+        self.assertIsNone(jobs.get(timeout=0.01))
+
+    def test_sqlite_queue_claims_each_job_once(self):
+        jobs = message_queue.SQLiteQueue(os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3'), poll_interval=0.01)
+        for body in ('a', 'b'):
+            jobs.put({'body': body})
+        first, second = jobs.get(timeout=0), jobs.get(timeout=0)
+        self.assertEqual([first['body'], second['body']], ['a', 'b'])
+        self.assertIsNone(jobs.get(timeout=0))
+        self.assertEqual(len(jobs), 0)
+
+        jobs.ack(first)
+        # The worker holding `second` died: its job is handed out again
+        self.assertEqual(jobs.requeue_stale(older_than=-1), 1)
+        self.assertEqual(jobs.get(timeout=0)['body'], 'b')
+
+    def test_worker_pool_survives_handler_errors(self):
+        jobs = message_queue.InProcessQueue()
+        handled = []
+        done = threading.Event()
+
+        def handler(job):
+            if job['body'] == 'boom':
+                raise RuntimeError(job['body'])
+            handled.append(job['body'])
+            if len(handled) == 2:
+                done.set()
+
+        for body in ('a', 'boom', 'b'):
+            jobs.put({'body': body})
+        pool = message_queue.MessageWorkerPool(jobs, handler, concurrency=1)
+        with self.assertLogs('core.message_queue', 'ERROR'):
+            pool.start()
+            self.addCleanup(pool.stop, 0)
+            self.assertTrue(done.wait(5))
+        self.assertEqual(handled, ['a', 'b'])
+
+
+@override_settings(WEBHOOK_ASYNC_MODE=True, MESSAGE_WORKERS_IN_PROCESS=False, MESSAGE_DEBOUNCE_SECONDS=0)
+class QueuedWebhookTests(TestCase):
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.jobs = message_queue.InProcessQueue()
+        patcher = mock.patch.object(message_queue, '_backend', self.jobs)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_acknowledges_at_once_and_replies_out_of_band(self):
+        response = self.client.post('/webhook/whatsapp/', {'From': 'whatsapp:+15550000008', 'To': 'whatsapp:+1555',
+                                                           'Body': 'Dentist tomorrow at 3pm'}, secure=True)
+        self.assertEqual(response.content.decode().strip(), '<?xml version="1.0" encoding="UTF-8"?><Response />')
+        self.assertFalse(Event.objects.exists())
+
+        job = self.jobs.get(timeout=0)
+        self.assertEqual((job['from'], job['body']), ('whatsapp:+15550000008', 'Dentist tomorrow at 3pm'))
+        with mock.patch.object(views, 'get_outbound_sender') as sender:
+            views.handle_queued_message(job)
+        sender.return_value.send.assert_called_once()
+        self.assertEqual(sender.return_value.send.call_args.kwargs['to'], 'whatsapp:+15550000008')
+        self.assertTrue(Event.objects.filter(title='Dentist').exists())
+
+
+class IntentRouterTests(SimpleTestCase):
+    def assertRoutes(self, intent, *messages):
+        for message in messages:
+            self.assertEqual(intent_router.classify(message), intent, message)
+
+    def test_exact_commands(self):
+        self.assertRoutes(intent_router.MENU, 'Hi', 'help!', ' menu ')
+        self.assertRoutes(intent_router.EVENTS, 'schedule')
+        self.assertRoutes(intent_router.NEARBY, "What's on?")
+
+    def test_earlier_rows_win(self):
+        self.assertRoutes(intent_router.FREE, 'am i free tomorrow', 'when am i free this week')
+        self.assertRoutes(intent_router.SEARCH, 'when is my dentist appointment', 'find my meeting with Ada')
+        self.assertRoutes(intent_router.NEARBY, 'any events near me tonight')
+        self.assertRoutes(intent_router.EVENTS, 'show my upcoming events')
+        self.assertRoutes(intent_router.TODAY, "what's my agenda today")
+        self.assertRoutes(intent_router.CANCEL, 'cancel the meeting')
+
+    def test_whole_tokens_only(self):
+        # 'at' inside "chat", 'may' inside "maybe", 'ics' inside "physics"
+        self.assertRoutes(intent_router.UNKNOWN, 'lets chat', 'maybe later', 'physics')
+
+    def test_dates_and_times_need_a_longer_message(self):
+        self.assertRoutes(intent_router.UNKNOWN, 'tomorrow', '3pm')
+        self.assertRoutes(intent_router.CREATE, 'dentist tomorrow 3pm', 'lunch with Ada at 1',
+                          'party on 5 may evening', 'standup at 10:30 daily')
+        self.assertRoutes(intent_router.CREATE, 'create standup')
+
+
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = EventManagerUser.objects.create(phone_number='+15550000009')
+
+    def worker(self):
+        # A fresh store per simulated worker process: nothing in-process is shared
+        return session_store.build_session_store()
+
+    def test_conversation_state_is_shared_between_workers_by_default(self):
+        first, second = self.worker(), self.worker()
+        first.set_state(self.user, {'creating_event': True, 'pending_event': {'title': 'Dentist', 'datetime': NOW}})
+        first.set_location(self.user, 6.5, 3.4)
+        state = second.get_state(self.user)
+        self.assertEqual(state['pending_event'], {'title': 'Dentist', 'datetime': '2026-10-17T15:00:00Z'})
+        self.assertEqual(list(second.get_location(self.user)), [6.5, 3.4])
+
+        second.clear_state(self.user)
+        self.assertIsNone(first.get_state(self.user))
+        self.assertIsNotNone(first.get_location(self.user))
+
+    def test_state_expires(self):
+        store = self.worker()
+        store.set_state(self.user, {'creating_event': True})
+        with mock.patch('core.session_store.time.time', return_value=time.time() + store.state_ttl + 1):
+            self.assertIsNone(store.get_state(self.user))
+
+    def test_clearing_absent_state_does_not_write(self):
+        with self.assertNumQueries(1):
+            self.worker().clear_state(self.user)
+
+    @override_settings(SESSION_STATE_BACKEND='cache')
+    def test_cache_backend_needs_a_shared_alias(self):
+        with self.assertRaises(ValueError):
+            self.worker()
+
+    def test_saving_a_user_drops_the_cached_identity(self):
+        store = session_store.get_session_store()
+        self.assertEqual(store.get_user('+15550000009').timezone, 'UTC')
+        self.user.timezone = 'Africa/Lagos'
+        self.user.save()
+        self.assertEqual(store.get_user('+15550000009').timezone, 'Africa/Lagos')
+
+        pk = self.user.pk
+        self.user.delete()
+        self.assertNotEqual(store.get_user('+15550000009').pk, pk)
+
+
+class LazyClientTests(SimpleTestCase):
+    def test_builds_once_on_first_use(self):
+        built = []
+        client = LazyClient(lambda: built.append(object()) or built[-1])
+        self.assertEqual(built, [])
+        threads = [threading.Thread(target=client.get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(built), 1)
+        self.assertIs(client.get(), built[0])
+
+    def test_override_and_factory_swap(self):
+        client = LazyClient(object)
+        built = client.get()
+        stub = object()
+        with client.override(stub):
+            self.assertIs(client.get(), stub)
+        self.assertIs(client.get(), built)
+
+        client.set_factory(lambda: stub)
+        self.assertIs(client.get(), stub)
+
+    def test_forked_children_build_their_own(self):
+        client = LazyClient(object)
+        built = client.get()
+        client._after_fork()
+        self.assertIsNot(client.get(), built)
+
+    def test_importing_the_app_builds_no_sdk_clients(self):
+        code = ("import django, sys; django.setup(); import core.views, core.reminders; "
+                "sys.exit(any(m in sys.modules for m in ('google.genai', 'twilio.rest')))")
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='backend.settings')
+        env.pop('GOOGLE_API_KEY', None)
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env)
+        self.assertEqual(result.returncode, 0)
+
+
+class FakeSender:
+    """OutboundSender stand-in: records messages and answers at once"""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def submit(self, to, body):
+        with self._lock:
+            self.sent.append((to, body))
+        future = Future()
+        future.set_result(f"SM{len(self.sent)}")
+        return future
+
+
+class ReminderDispatcherTests(TestCase):
+    def setUp(self):
+        self.user = EventManagerUser.objects.create(phone_number='+15550000010')
+        self.now = timezone.now().replace(microsecond=0)
+
+    def drain(self, dispatcher, now):
+        dispatcher.refresh(now)
+        return dispatcher.dispatch(dispatcher.pop_due(now))
+
+    def test_rerun_sends_each_reminder_once(self):
+        Event.objects.create(user=self.user, title='Dentist', scheduled_time=self.now - timedelta(minutes=1))
+        sender = FakeSender()
+        self.assertEqual(self.drain(ReminderDispatcher(sender), self.now), 1)
+        # A restarted dispatcher loads the same due reminder
+        self.assertEqual(self.drain(ReminderDispatcher(sender), self.now), 0)
+        self.assertEqual(len(sender.sent), 1)
+        delivery = ReminderDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.message_sid), (ReminderDelivery.STATUS_SENT, 'SM1'))
+
+    def test_recurring_reminders_do_not_need_the_refresh_cron(self):
+        event = Event.objects.create(user=self.user, title='Standup', scheduled_time=self.now + timedelta(hours=1),
+                                     is_recurring=True, recurrence_pattern='FREQ=DAILY')
+        # Past the rows materialized on save, as if refresh_occurrences never ran
+        later = event.scheduled_time + timedelta(days=settings.OCCURRENCE_WINDOW_DAYS + 2, minutes=1)
+        self.assertFalse(EventOccurrence.objects.filter(starts_at__gte=later - timedelta(minutes=1)).exists())
+        sender = FakeSender()
+        self.assertEqual(self.drain(ReminderDispatcher(sender), later), 1)
+        self.assertIn('Standup', sender.sent[0][1])
+
+    def test_refuses_a_horizon_beyond_the_window(self):
+        with self.assertRaises(ValueError):
+            ReminderDispatcher(FakeSender(), lead=timedelta(days=settings.OCCURRENCE_WINDOW_DAYS))
+
+
+class ReminderClaimRaceTests(TransactionTestCase):
+    def test_concurrent_dispatchers_claim_each_reminder_once(self):
+        user = EventManagerUser.objects.create(phone_number='+15550000011')
+        now = timezone.now().replace(microsecond=0)
+        for minutes in range(1, 6):
+            Event.objects.create(user=user, title=f"Call {minutes}", scheduled_time=now - timedelta(minutes=minutes))
+        sender = FakeSender()
+        dispatchers = [ReminderDispatcher(sender) for _ in range(4)]
+        due = []
+        for dispatcher in dispatchers:
+            dispatcher.refresh(now)
+            due.append(dispatcher.pop_due(now))
+        start = threading.Barrier(len(dispatchers))
+
+        def dispatch(dispatcher, batch):
+            start.wait()
+            try:
+                dispatcher.dispatch(batch)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=dispatch, args=pair) for pair in zip(dispatchers, due)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(body.split('\n')[0] for _, body in sender.sent),
+                         [f"⏰ *Reminder:* Call {minutes}" for minutes in range(1, 6)])
+        self.assertEqual(ReminderDelivery.objects.filter(status=ReminderDelivery.STATUS_SENT).count(), 5)
+
+
+class MessageDebouncerTests(SimpleTestCase):
+    def setUp(self):
+        self.flushed = []
+        self.done = threading.Event()
+
+    def flush(self, job):
+        self.flushed.append(job)
+        self.done.set()
+
+    def job(self, body, phone='whatsapp:+15550000012'):
+        return {'from': phone, 'to': 'whatsapp:+1555', 'body': body, 'received_at': time.time()}
+
+    def test_burst_becomes_one_job(self):
+        debouncer = MessageDebouncer(self.flush, window=0.05)
+        for body in ('meeting with Ada', 'tomorrow', '3pm at the office'):
+            debouncer.submit(self.job(body))
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(len(self.flushed), 1)
+        self.assertEqual(self.flushed[0]['body'], 'meeting with Ada tomorrow 3pm at the office')
+        self.assertEqual(self.flushed[0]['parts'], 3)
+        self.assertEqual(debouncer.pending(), 0)
+
+    def test_numbers_are_buffered_separately(self):
+        debouncer = MessageDebouncer(self.flush, window=60)
+        debouncer.submit(self.job('meeting with Ada'))
+        debouncer.submit(self.job('lunch with Sam', phone='whatsapp:+15550000013'))
+        self.assertEqual(debouncer.pending(), 2)
+        debouncer.flush_all()
+        self.assertEqual(sorted(job['body'] for job in self.flushed), ['lunch with Sam', 'meeting with Ada'])
+
+    def test_commands_skip_the_window_and_flush_the_burst_first(self):
+        debouncer = MessageDebouncer(self.flush, window=60)
+        debouncer.submit(self.job('meeting with Ada'))
+        debouncer.submit(self.job('menu'))
+        self.assertEqual([job['body'] for job in self.flushed], ['meeting with Ada', 'menu'])
+
+    def test_cancel_discards_the_burst(self):
+        debouncer = MessageDebouncer(self.flush, window=60)
+        debouncer.submit(self.job('meeting with Ada'))
+        debouncer.submit(self.job('cancel'))
+        self.assertEqual([job['body'] for job in self.flushed], ['cancel'])
+        self.assertEqual(debouncer.pending(), 0)
+
+    def test_max_wait_caps_a_long_burst(self):
+        debouncer = MessageDebouncer(self.flush, window=30, max_wait=0.05)
+        debouncer.submit(self.job('meeting with Ada'))
+        self.assertTrue(self.done.wait(2))
+
+    @override_settings(MESSAGE_DEBOUNCE_SECONDS=0)
+    def test_disabled_when_the_window_is_zero(self):
+        self.assertIsNone(get_debouncer(self.flush))
+
+
+ICS_EXPORT = """BEGIN:VCALENDAR
+BEGIN:VTIMEZONE
+TZID:W. Central Africa Standard Time
+END:VTIMEZONE
+BEGIN:VEVENT
+SUMMARY:Board meeting\\, Q4 review
+DTSTART;TZID=W. Central Africa Standard Time:20261102T090000
+LOCATION:Victoria
+  Island
+RRULE:FREQ=WEEKLY;BYDAY=MO
+EXDATE;TZID=W. Central Africa Standard Time:20261109T090000
+BEGIN:VALARM
+SUMMARY:Alarm
+END:VALARM
+END:VEVENT
+BEGIN:VEVENT
+SUMMARY:Offsite
+DTSTART:20261110T080000Z
+STATUS:CANCELLED
+END:VEVENT
+BEGIN:VEVENT
+DTSTART:20261111T080000Z
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+class ImporterTests(TestCase):
+    def setUp(self):
+        self.user = EventManagerUser.objects.create(phone_number='+15550000014', timezone='Africa/Lagos')
+
+    def run_import(self, text, name, **kwargs):
+        with self.assertLogs('core.importer', 'INFO'):
+            return import_calendar(self.user, io.BytesIO(text.encode()), name=name, **kwargs)
+
+    def test_ics(self):
+        result = self.run_import(ICS_EXPORT, 'export.ics')
+        self.assertEqual((result['created'], result['invalid']), (1, 2))
+        event = Event.objects.get(user=self.user)
+        self.assertEqual(event.title, 'Board meeting, Q4 review')
+        self.assertEqual(event.location, 'Victoria Island')
+        self.assertEqual(event.scheduled_time, datetime(2026, 11, 2, 8, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(event.recurrence_pattern, 'FREQ=WEEKLY;BYDAY=MO')
+        self.assertEqual(event.recurrence_exceptions, ['2026-11-09T09:00:00+01:00'])
+        self.assertEqual([error.split(':', 1)[1].strip() for error in result['errors']],
+                         ['cancelled event', 'missing title'])
+
+    def test_csv(self):
+        csv_text = ("Subject,Start Date,Start Time,Location,Repeat\n"
+                    "Dentist,11/02/2026,3:00 PM,Ikeja,\n"
+                    'Standup,2026-11-03,09:30,,"FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR"\n'
+                    "Retro,2026-11-05,16:00,,FREQ=MONTHLY;BYDAY=TH;BYSETPOS=-1\n"
+                    ",2026-11-06,10:00,,\n")
+        result = self.run_import(csv_text, 'events.csv')
+        self.assertEqual((result['created'], result['invalid']), (2, 2))
+        self.assertTrue(result['errors'][0].startswith('line 4: unsupported recurrence'))
+        self.assertEqual(result['errors'][1], 'line 5: missing title')
+        dentist = Event.objects.get(title='Dentist')
+        self.assertEqual((dentist.scheduled_time, dentist.location),
+                         (datetime(2026, 11, 2, 14, 0, tzinfo=dt_timezone.utc), 'Ikeja'))
+        self.assertEqual(Event.objects.get(title='Standup').recurrence_pattern, 'FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR')
+
+    def test_duplicates_are_skipped_within_and_across_batches(self):
+        Event.objects.create(user=self.user, title='Dentist',
+                             scheduled_time=datetime(2026, 11, 2, 14, 0, tzinfo=dt_timezone.utc))
+        rows = ['Dentist,2026-11-02 15:00', 'Gym,2026-11-03 07:00', 'Gym,2026-11-03 07:00',
+                'Dentist,2026-11-02 16:00', 'Gym,2026-11-03 07:00']
+        result = self.run_import('title,start\n' + '\n'.join(rows) + '\n', 'events.csv', batch_size=2)
+        self.assertEqual((result['created'], result['duplicates']), (2, 3))
+        self.assertEqual(Event.objects.filter(user=self.user).count(), 3)
+
+    def test_each_batch_is_one_transaction(self):
+        rows = '\n'.join(f"Class {i},2026-11-{i + 1:02d} 09:00" for i in range(5))
+        real_bulk_create = Event.objects.bulk_create
+        calls = []
+
+        def bulk_create(events, **kwargs):
+            calls.append(len(events))
+            if len(calls) == 2:
+                raise RuntimeError("disk full")
+            return real_bulk_create(events, **kwargs)
+
+        with mock.patch.object(Event.objects, 'bulk_create', side_effect=bulk_create), \
+                self.assertRaises(RuntimeError):
+            import_calendar(self.user, io.StringIO('title,start\n' + rows + '\n'), name='events.csv', batch_size=2)
+        # The first batch was committed; nothing of the failed one was
+        self.assertEqual(sorted(Event.objects.values_list('title', flat=True)), ['Class 0', 'Class 1'])
+
+
+@override_settings(PUBLIC_BASE_URL='https://isele.example.com/')
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = EventManagerUser.objects.create(phone_number='+15550000015', timezone='Africa/Lagos')
+        self.event = Event.objects.create(user=self.user, title='Dentist', scheduled_time=NOW)
+
+    def get(self, url, **headers):
+        return self.client.get(url.removeprefix('https://isele.example.com'), headers=headers, secure=True)
+
+    def test_link_is_absolute(self):
+        url = feeds.feed_url(self.user)
+        self.assertEqual(url, f"https://isele.example.com/calendar/{self.user.feed_token}.ics")
+        self.assertIn(url, views.get_feed_message(self.user))
+
+    @override_settings(PUBLIC_BASE_URL='')
+    def test_no_link_without_a_base_url(self):
+        self.assertIsNone(feeds.feed_url(self.user))
+        self.assertNotIn('/calendar/', views.get_feed_message(self.user))
+        self.assertIsNone(EventManagerUser.objects.get(pk=self.user.pk).feed_token)
+        self.assertEqual([w.id for w in feeds.check_public_base_url()], ['core.W002'])
+
+    def test_unknown_token(self):
+        feeds.ensure_feed_token(self.user)
+        self.assertEqual(self.get('/calendar/not-the-token.ics').status_code, 404)
+
+    def test_etag_revalidation(self):
+        url = feeds.feed_url(self.user)
+        response = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('SUMMARY:Dentist', b''.join(response.streaming_content).decode())
+        etag = response['ETag']
+
+        self.assertEqual(self.get(url, if_none_match=etag).status_code, 304)
+        self.event.title = 'Dentist (moved)'
+        self.event.save()
+        changed = self.get(url, if_none_match=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+
+class AgendaCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = agenda_cache.AgendaCache(LocalLRUBackend(100), ttl=300)
+        self.user = EventManagerUser(pk=1, phone_number='+15550000016', timezone='Africa/Lagos')
+        self.renders = 0
+
+    def render(self, user):
+        self.renders += 1
+        return f"render {self.renders}", None
+
+    def test_hit_until_invalidated(self):
+        self.assertEqual(self.cache.get_or_render(self.user, 'today', self.render, NOW), 'render 1')
+        self.assertEqual(self.cache.get_or_render(self.user, 'today', self.render, NOW), 'render 1')
+        self.cache.invalidate(self.user.pk)
+        self.assertEqual(self.cache.get_or_render(self.user, 'today', self.render, NOW), 'render 2')
+
+    def test_entries_end_with_the_local_day(self):
+        self.cache.get_or_render(self.user, 'today', self.render, NOW)
+        # 23:00 UTC is midnight in Lagos
+        tomorrow = NOW + timedelta(hours=8)
+        self.assertEqual(self.cache.get_or_render(self.user, 'today', self.render, tomorrow), 'render 2')
+
+    def test_render_overlapping_an_invalidation_is_not_stored(self):
+        def render_then_edit(user):
+            text = self.render(user)
+            # An event saved while the old agenda was being rendered
+            self.cache.invalidate(user.pk)
+            return text
+
+        self.assertEqual(self.cache.get_or_render(self.user, 'today', render_then_edit, NOW), 'render 1')
+        self.assertEqual(self.cache.get_or_render(self.user, 'today', self.render, NOW), 'render 2')
+        self.assertEqual(self.cache.get_or_render(self.user, 'today', self.render, NOW), 'render 2')
+
+    def test_entries_from_an_older_version_are_ignored(self):
+        self.cache.get_or_render(self.user, 'upcoming', self.render, NOW)
+        entry = self.cache.backend.get(self.cache.make_key(self.user.pk, 'upcoming'))
+        self.cache.invalidate(self.user.pk)
+        # e.g. written by a render that passed its version check just before the bump
+        self.cache.backend.set(self.cache.make_key(self.user.pk, 'upcoming'), entry, 300)
+        self.assertEqual(self.cache.get_or_render(self.user, 'upcoming', self.render, NOW), 'render 2')
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+
+    def span_count(self, name):
+        return histograms.get(f"span.{name}", metrics.SPAN_BOUNDS).snapshot()['count']
+
+    def test_webhook_times_each_stage_and_prints_nothing(self):
+        stages = ('user_lookup', 'intent_routing', 'twiml_render')
+        before = {stage: self.span_count(stage) for stage in stages}
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            response = self.client.post('/webhook/whatsapp/', {'From': 'whatsapp:+15550000017', 'Body': 'menu'},
+                                        secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(output.getvalue(), '')
+        for stage in stages:
+            self.assertEqual(self.span_count(stage), before[stage] + 1, stage)
+
+    def test_endpoint(self):
+        response = self.client.get('/metrics/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(set(payload), {'enabled', 'counters', 'histograms', 'components'})
+        self.assertIn('agenda_cache', payload['components'])
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_endpoint_token(self):
+        self.assertEqual(self.client.get('/metrics/', secure=True).status_code, 401)
+        response = self.client.get('/metrics/', headers={'Authorization': 'Bearer s3cret'}, secure=True)
+        self.assertEqual(response.status_code, 200)
+
+    def test_disabled_spans_record_nothing(self):
+        self.addCleanup(metrics.configure, metrics.ENABLED)
+        metrics.configure(False)
+        with metrics.span('metrics_test_disabled'):
+            pass
+        self.assertNotIn('span.metrics_test_disabled', histograms.snapshot())
+
+    def test_histogram_percentiles(self):
+        histogram = metrics.Histogram((0.01, 0.1, 1))
+        for value in [0.005] * 90 + [0.05] * 9 + [5]:
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual((snapshot['p50'], snapshot['p95'], snapshot['p99']), (0.01, 0.1, 0.1))
+        self.assertEqual((snapshot['count'], snapshot['max']), (100, 5))
+        self.assertEqual(snapshot['buckets'], {'0.01': 90, '0.1': 9, '1': 0, '+Inf': 1})
+
+    def test_counting_collects_only_its_own_block(self):
+        with metrics.counting() as counts:
+            counters.incr('metrics_test.inside', 2)
+        counters.incr('metrics_test.inside')
+        self.assertEqual(dict(counts), {'metrics_test.inside': 2})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=self.clock)
+
+    def open_breaker(self):
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        with self.assertLogs('core.llm_client', 'WARNING'):
+            self.open_breaker()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_trial_closes_on_success(self):
+        with self.assertLogs('core.llm_client', 'WARNING'):
+            self.open_breaker()
+        self.clock.now += 29.9
+        self.assertFalse(self.breaker.allow())
+        self.clock.now += 0.1
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, 'half_open')
+        # Only one trial at a time
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.allow())
+
+    def test_half_open_trial_reopens_on_failure(self):
+        with self.assertLogs('core.llm_client', 'WARNING'):
+            self.open_breaker()
+            self.clock.now += 30
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.clock.now += 29
+        self.assertFalse(self.breaker.allow())
+
+
+class GuardedLLMClientTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def guarded(self, **kwargs):
+        client = GuardedLLMClient(breaker=CircuitBreaker(failure_threshold=1, clock=FakeClock()), **kwargs)
+        self.addCleanup(client.shutdown)
+        return client
+
+    def slow_then_fast(self):
+        """The first call hangs until the test ends; later ones answer at once"""
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            self.release.wait(5)
+            return 'slow'
+        return 'fast'
+
+    def test_hedge_answers_when_the_first_call_stalls(self):
+        client = self.guarded(timeout=5, hedge_after=0.01)
+        wins = counters.get('llm.hedge_wins')
+        self.assertEqual(client.call(self.slow_then_fast), 'fast')
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(counters.get('llm.hedge_wins'), wins + 1)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_no_hedge_without_spare_capacity(self):
+        client = self.guarded(timeout=0.1, hedge_after=0.01, max_in_flight=1)
+        with self.assertLogs('core.llm_client', 'WARNING'), self.assertRaises(LLMUnavailable) as raised:
+            client.call(self.slow_then_fast)
+        self.assertEqual(raised.exception.reason, 'timeout')
+        self.assertEqual(self.calls, 1)
+
+    def test_errors_open_the_breaker_and_calls_are_refused(self):
+        client = self.guarded(timeout=5)
+
+        def broken():
+            raise ConnectionError("reset")
+
+        with self.assertLogs('core.llm_client', 'WARNING'), self.assertRaises(LLMUnavailable) as raised:
+            client.call(broken)
+        self.assertEqual(raised.exception.reason, 'error: reset')
+        with self.assertRaises(LLMUnavailable) as raised:
+            client.call(lambda: 'ok')
+        self.assertEqual(raised.exception.reason, 'circuit open')
+
+    def test_async_hedge(self):
+        started = []
+
+        async def slow_then_fast():
+            started.append(1)
+            if len(started) == 1:
+                await asyncio.sleep(5)
+                return 'slow'
+            return 'fast'
+
+        client = self.guarded(timeout=5, hedge_after=0.01)
+        self.assertEqual(asyncio.run(client.acall(slow_then_fast)), 'fast')
+        self.assertEqual(len(started), 2)
+
+
+class StubAIService:
+    """Answers every parse with the same events and counts the calls"""
+
+    def __init__(self, events):
+        self.events = events
+        self.calls = 0
+
+    def parse_events(self, message):
+        self.calls += 1
+        return [dict(event) for event in self.events]
+
+    async def aparse_events(self, message):
+        return self.parse_events(message)
+
+
+class MultiEventCreationTests(TestCase):
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = EventManagerUser.objects.create(phone_number='+15550000018', timezone='Africa/Lagos')
+        monday = datetime(2026, 10, 19, 9, 0, tzinfo=LAGOS)
+        parsed = {'confidence': 0.9, 'needs_clarification': False, 'location': None, 'notes': None}
+        self.ai = StubAIService([
+            {**parsed, 'title': 'Standup', 'datetime': monday, 'recurrence': 'FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR'},
+            {**parsed, 'title': 'Retro', 'datetime': monday + timedelta(days=3, hours=7)},
+            {**parsed, 'title': 'retro', 'datetime': monday + timedelta(days=3, hours=7)},
+            {**parsed, 'title': '1:1 with Sam', 'datetime': None},
+        ])
+        patcher = mock.patch.object(EventCreationService, '_fast_parse', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertCreated(self, reply):
+        self.assertEqual(self.ai.calls, 1)
+        self.assertIn('2 events created', reply)
+        self.assertIn('• 1:1 with Sam', reply)
+        self.assertEqual(sorted(Event.objects.filter(user=self.user).values_list('title', flat=True)),
+                         ['Retro', 'Standup'])
+        standup = Event.objects.get(title='Standup')
+        self.assertEqual(standup.recurrence_pattern, 'FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR')
+        # bulk_create sends no post_save: events_bulk_created materializes the series
+        self.assertTrue(EventOccurrence.objects.filter(event=standup).exists())
+
+    def test_one_parse_and_one_insert(self):
+        message = 'standup mon-fri 9am, retro thursday 4pm, 1:1 with Sam friday'
+        with ai_service_provider.override(self.ai), \
+                mock.patch.object(Event.objects, 'bulk_create', wraps=Event.objects.bulk_create) as bulk_create:
+            reply = EventCreationService(self.user).process_event_creation(message)
+        bulk_create.assert_called_once()
+        self.assertCreated(reply)
+
+    async def test_async(self):
+        message = 'standup mon-fri 9am, retro thursday 4pm, 1:1 with Sam friday'
+        with ai_service_provider.override(self.ai):
+            reply = await EventCreationService(self.user).aprocess_event_creation(message)
+        await sync_to_async(self.assertCreated)(reply)
+
+
+class TwilioError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class StubTwilio:
+    """messages.create fails with each of `errors` in turn, then succeeds"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.attempts = 0
+        self.messages = self
+
+    def create(self, from_, to, body):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return mock.Mock(sid=f"SM{self.attempts}")
+
+
+class OutboundTests(SimpleTestCase):
+    def test_token_bucket_bursts_then_refills_at_the_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=4, capacity=3, clock=clock)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0])
+        self.assertEqual(bucket.reserve(), 0.25)
+        clock.now += 0.125
+        self.assertEqual(bucket.reserve(), 0.125)
+        clock.now += 0.125
+        self.assertEqual(bucket.reserve(), 0)
+        # Idle time never banks more than the capacity
+        clock.now += 60
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0])
+        self.assertGreater(bucket.reserve(), 0)
+
+    def test_buckets_are_per_sender_number(self):
+        buckets = SenderBuckets(rate=1)
+        self.assertIs(buckets.get('whatsapp:+1'), buckets.get('whatsapp:+1'))
+        self.assertEqual(buckets.get('whatsapp:+1').reserve(), 0)
+        self.assertEqual(buckets.get('whatsapp:+2').reserve(), 0)
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(base=0.5, cap=2)
+        with mock.patch('core.outbound.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([policy.delay(attempt) for attempt in range(5)], [0.5, 1, 2, 2, 2])
+
+    def test_which_failures_are_retried(self):
+        policy = RetryPolicy(max_retries=2)
+        self.assertTrue(policy.should_retry(TwilioError(429), 0))
+        self.assertTrue(policy.should_retry(TwilioError(503), 0))
+        self.assertTrue(policy.should_retry(ConnectionResetError(), 0))
+        self.assertFalse(policy.should_retry(TwilioError(400), 0))
+        self.assertFalse(policy.should_retry(ValueError(), 0))
+        self.assertFalse(policy.should_retry(TwilioError(429), 2))
+
+    def test_send_retries_throttling_then_succeeds(self):
+        twilio = StubTwilio(TwilioError(429), TwilioError(502))
+        sender = OutboundSender(lambda: twilio, max_workers=1, retry=RetryPolicy(max_retries=3, base=0))
+        self.addCleanup(sender.shutdown)
+        self.assertEqual(sender.submit('whatsapp:+15550000019', 'hi', 'whatsapp:+1555').result(5), 'SM3')
+
+    def test_send_gives_up_after_the_last_retry(self):
+        twilio = StubTwilio(*[TwilioError(503)] * 3)
+        sender = OutboundSender(lambda: twilio, max_workers=1, retry=RetryPolicy(max_retries=2, base=0))
+        self.addCleanup(sender.shutdown)
+        with self.assertLogs('core.outbound', 'WARNING'), self.assertRaises(TwilioError):
+            sender.send('whatsapp:+15550000019', 'hi', 'whatsapp:+1555')
+        self.assertEqual(twilio.attempts, 3)
+
+
+# The async view is only routed when WEBHOOK_ASYNC_VIEW is set at import; AsyncWebhookTests use this instead
+urlpatterns = [path('webhook/whatsapp/', views.whatsapp_webhook_async)]
+
+
+@override_settings(ROOT_URLCONF='core.tests')
+class AsyncWebhookTests(TestCase):
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+
+    async def post(self, body):
+        response = await self.async_client.post('/webhook/whatsapp/', {'From': 'whatsapp:+15550000020', 'Body': body},
+                                                secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    async def test_creation_then_read_only_intent(self):
+        with mock.patch.object(views, 'route_message', wraps=views.route_message) as route_message:
+            # Creation stays on the event loop
+            reply = await self.post('Dentist tomorrow at 3pm')
+            route_message.assert_not_called()
+            self.assertIn('Event Created Successfully', reply)
+            event = await Event.objects.select_related('user').aget(title='Dentist')
+            self.assertEqual(event.user.phone_number, '+15550000020')
+
+            # Read-only intents are routed to the sync handlers
+            reply = await self.post('events')
+            route_message.assert_called_once()
+        self.assertIn(views.UPCOMING_HEADER.strip(), reply)
+        self.assertIn('Dentist', reply)
+        self.assertEqual(await Event.objects.acount(), 1)
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('webhook/whatsapp/', views.whatsapp_webhook, name='whatsapp_webhook'),
+    path('webhook/whatsapp/', views.whatsapp_webhook_async if settings.WEBHOOK_ASYNC_VIEW else views.whatsapp_webhook,
+         name='whatsapp_webhook'),
+    path('import/calendar/', views.import_calendar_upload, name='import_calendar'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
 ]
\ No newline at end of file
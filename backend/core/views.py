@@ -1,118 +1,310 @@
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_safe
+from django.utils.http import http_date, parse_etags
 from django.utils import timezone
-from twilio.rest import Client
+from django.conf import settings
 from twilio.twiml.messaging_response import MessagingResponse
-import os
-import json
+from asgiref.sync import sync_to_async
+import hmac
 import logging
-from .models import EventManagerUser, Event
+from xml.etree import ElementTree
+from .models import EventManagerUser
 from .event_creator import EventCreationService
-from datetime import datetime, timedelta
-import re
+from .message_queue import enqueue_message
+from .debounce import get_debouncer
+from . import intent_router, agenda, catalog, search
+from .session_store import get_session_store
+from .agenda_cache import get_agenda_cache
+from .outbound import get_outbound_sender
+from .webhook_dedup import get_webhook_dedup
+from .interval_index import get_interval_indexes
+from .recurrence import iter_occurrences
+from .metrics import counters, counting, histograms, span
+from .db_router import choose_read_alias, iterate_reading_from, reading_from, replica_reads
+from .importer import import_calendar, resolve_timezone
+from . import feeds
+from datetime import timedelta
+import time
 
 logger = logging.getLogger(__name__)
 
-# Initialize Twilio client
-twilio_client = Client(os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'))
-
 @csrf_exempt
 @require_POST
 def whatsapp_webhook(request):
     """Handle incoming WhatsApp messages via Twilio"""
+    # Twilio retries slow webhooks: a MessageSid seen before gets the same reply
+    message_sid = request.POST.get('MessageSid', '')
+    dedup = get_webhook_dedup() if message_sid else None
+    if dedup:
+        repeated = dedup.claim(message_sid)
+        if repeated is not None:
+            return HttpResponse(repeated or str(MessagingResponse()), content_type='text/xml')
+    
     try:
-        # Get the incoming message details
-        from_number = request.POST.get('From', '')
-        message_body = request.POST.get('Body', '').strip()
-        
-        print(f"📱 Received message from {from_number}: {message_body}")  # DEBUG
+        with counting() as counts:
+            body = webhook_reply(request)
+        if dedup and dedup.finish(message_sid, body, counts['llm.calls']):
+            body = reply_out_of_band(request.POST, body)
+        return HttpResponse(body, content_type='text/xml')
         
-        # Extract phone number (remove 'whatsapp:' prefix)
-        phone_number = from_number.replace('whatsapp:', '')
-        
-        # Get or create user
-        user, created = EventManagerUser.objects.get_or_create(phone_number=phone_number)
-        if created:
-            print(f"👤 New user created: {phone_number}")
+    except Exception as e:
+        if dedup:
+            dedup.release(message_sid)
+        logger.error(f"Error processing webhook: {e}")
+        resp = MessagingResponse()
+        resp.message("Sorry, I encountered an error. Please try again.")
+        return HttpResponse(str(resp), content_type='text/xml')
+
+def webhook_reply(request):
+    """TwiML answering the message in `request`"""
+    # Get the incoming message details
+    from_number = request.POST.get('From', '')
+    message_body = request.POST.get('Body', '').strip()
+    location = shared_location(request.POST)
+    
+    logger.debug("Received message from %s: %s", from_number, message_body)
+    
+    # Async mode: record the message and acknowledge Twilio right away,
+    # a background worker replies through the REST API
+    if settings.WEBHOOK_ASYNC_MODE:
+        queue_incoming(from_number, request.POST.get('To', ''), message_body, location)
+        return str(MessagingResponse())
+    
+    # Extract phone number (remove 'whatsapp:' prefix)
+    phone_number = from_number.replace('whatsapp:', '')
+    
+    with span('webhook'):
+        # Get or create user (cached, so known users cost no query)
+        with span('user_lookup'):
+            user = get_session_store().get_user(phone_number)
         
-        # Process the message
-        response_text = process_message(user, message_body)
+        # Process the message, or the location pin it carries
+        if location:
+            response_text = process_location(user, *location)
+        else:
+            response_text = process_message(user, message_body)
         
         # Create TwiML response
-        resp = MessagingResponse()
-        resp.message(response_text)
-        
-        return HttpResponse(str(resp), content_type='text/xml')
+        with span('twiml_render'):
+            resp = MessagingResponse()
+            resp.message(response_text)
+            return str(resp)
+
+@csrf_exempt
+@require_POST
+async def whatsapp_webhook_async(request):
+    """whatsapp_webhook for ASGI: the coroutine waits on Gemini and the database without holding a thread
+
+    Used for /webhook/whatsapp/ when WEBHOOK_ASYNC_VIEW is set.
+    """
+    message_sid = request.POST.get('MessageSid', '')
+    dedup = get_webhook_dedup() if message_sid else None
+    if dedup:
+        repeated = await dedup.aclaim(message_sid)
+        if repeated is not None:
+            return HttpResponse(repeated or str(MessagingResponse()), content_type='text/xml')
+    
+    try:
+        with counting() as counts:
+            body = await awebhook_reply(request)
+        if dedup and await dedup.afinish(message_sid, body, counts['llm.calls']):
+            body = await sync_to_async(reply_out_of_band)(request.POST, body)
+        return HttpResponse(body, content_type='text/xml')
         
     except Exception as e:
+        if dedup:
+            await dedup.arelease(message_sid)
         logger.error(f"Error processing webhook: {e}")
         resp = MessagingResponse()
         resp.message("Sorry, I encountered an error. Please try again.")
         return HttpResponse(str(resp), content_type='text/xml')
 
+async def awebhook_reply(request):
+    """webhook_reply for the async webhook"""
+    from_number = request.POST.get('From', '')
+    message_body = request.POST.get('Body', '').strip()
+    location = shared_location(request.POST)
+    
+    logger.debug("Received message from %s: %s", from_number, message_body)
+    
+    if settings.WEBHOOK_ASYNC_MODE:
+        await sync_to_async(queue_incoming)(from_number, request.POST.get('To', ''), message_body, location)
+        return str(MessagingResponse())
+    
+    phone_number = from_number.replace('whatsapp:', '')
+    
+    with span('webhook'):
+        with span('user_lookup'):
+            user = await get_session_store().aget_user(phone_number)
+        
+        if location:
+            response_text = await sync_to_async(process_location)(user, *location)
+        else:
+            response_text = await aprocess_message(user, message_body)
+        
+        with span('twiml_render'):
+            resp = MessagingResponse()
+            resp.message(response_text)
+            return str(resp)
+
+def reply_out_of_band(post, body):
+    """Send a TwiML reply's messages through the REST API; returns the empty TwiML to answer with
+
+    For a request Twilio retried while it ran: Twilio has stopped waiting for
+    its response, and the retry was acknowledged without one.
+    """
+    sender = get_outbound_sender()
+    for message in ElementTree.fromstring(body).iter('Message'):
+        if message.text:
+            sender.submit(to=post.get('From', ''), body=message.text, from_=post.get('To') or None)
+    return str(MessagingResponse())
+
+def shared_location(post):
+    """(latitude, longitude) of a WhatsApp location pin, or None for a text message"""
+    try:
+        latitude, longitude = float(post['Latitude']), float(post['Longitude'])
+    except (KeyError, ValueError):
+        return None
+    if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+        return latitude, longitude
+    return None
+
+def queue_incoming(from_number, to_number, message_body, location=None):
+    """Hand a message to the background workers (WEBHOOK_ASYNC_MODE)"""
+    job = {
+        'from': from_number,
+        'to': to_number,
+        'body': message_body,
+        'received_at': time.time(),
+    }
+    if location:
+        # A pin is a complete request on its own, never merged with text
+        job['location'] = list(location)
+        enqueue_queued_job(job)
+        return
+    # Rapid-fire fragments of one request are merged before queueing
+    debouncer = get_debouncer(enqueue_queued_job)
+    if debouncer:
+        debouncer.submit(job)
+    else:
+        enqueue_queued_job(job)
+
+def enqueue_queued_job(job):
+    enqueue_message(job, handle_queued_message)
+
+def handle_queued_message(job):
+    """Run the intent/AI pipeline for a queued message and reply out-of-band"""
+    if job.get('received_at'):
+        histograms.observe('queue_wait', time.time() - job['received_at'])
+    phone_number = job['from'].replace('whatsapp:', '')
+    with span('user_lookup'):
+        user = get_session_store().get_user(phone_number)
+    
+    try:
+        if job.get('location'):
+            response_text = process_location(user, *job['location'])
+        else:
+            response_text = process_message(user, job['body'])
+    except Exception as e:
+        logger.error(f"Error processing queued message: {e}")
+        response_text = "Sorry, I encountered an error. Please try again."
+    
+    # Rate-limited per sender number and retried on 429/5xx
+    with span('twilio_send'):
+        get_outbound_sender().send(to=job['from'], body=response_text, from_=job.get('to'))
+
+def process_location(user, latitude, longitude):
+    """A location pin shared in WhatsApp: remember it and answer the question waiting for it"""
+    store = get_session_store()
+    store.set_location(user, latitude, longitude)
+    state = store.get_state(user) or {}
+    question = state.pop('nearby_query', '')
+    if question:
+        if state:
+            store.set_state(user, state)
+        else:
+            store.clear_state(user)
+    with timezone.override(agenda.user_timezone(user)):
+        return get_nearby_events(user, question, (latitude, longitude))
+
 def process_message(user, message):
     """Process the incoming message and return appropriate response"""
-    message_lower = message.lower().strip()
+    # Dates the user types ("tomorrow at 3pm") are in their own timezone
+    with timezone.override(agenda.user_timezone(user)):
+        return route_message(user, message)
+
+async def aprocess_message(user, message):
+    """process_message for the async webhook"""
+    with timezone.override(agenda.user_timezone(user)):
+        return await aroute_message(user, message)
+
+async def aroute_message(user, message):
+    """route_message for the async webhook
+
+    Event creation, the only step that calls Gemini, runs natively on the
+    event loop; every other intent is a short database read and goes
+    through route_message on a worker thread.
+    """
+    with span('intent_routing'):
+        intent = intent_router.classify(message)
+    
+    # Same precedence as route_message: commands first, then an open creation flow
+    if intent in (intent_router.CREATE, intent_router.UNKNOWN):
+        conversation_state = await get_session_store().aget_state(user) or {}
+        if intent == intent_router.CREATE or conversation_state.get('creating_event'):
+            logger.debug("Processing %r -> %s (async)", message, intent)
+            return await EventCreationService(user).aprocess_event_creation(message, conversation_state)
+    return await sync_to_async(route_message)(user, message)
+
+def route_message(user, message):
+    """Dispatch a message to the handler for its intent"""
+    with span('intent_routing'):
+        intent = intent_router.classify(message)
     
-    print(f"🔍 Processing: '{message}' -> '{message_lower}'")  # DEBUG
+    logger.debug("Processing %r -> %s", message, intent)
     
     # Help/Start command
-    if message_lower in ['hi', 'hello', 'hey', 'start', 'help', 'menu']:
-        print("✅ Triggered: Main menu")  # DEBUG
+    if intent == intent_router.MENU:
         return get_main_menu()
     
     # View upcoming events
-    elif any(keyword in message_lower for keyword in ['events', 'upcoming', 'schedule', 'plans', 'what do i have']):
-        print("✅ Triggered: View events")  # DEBUG
+    elif intent == intent_router.EVENTS:
         return get_upcoming_events(user)
     
     # View today's events
-    elif any(keyword in message_lower for keyword in ['today', "today's", 'agenda']):
-        print("✅ Triggered: Today's agenda")  # DEBUG
+    elif intent == intent_router.TODAY:
         return get_todays_events(user)
     
+    # Calendar subscription link
+    elif intent == intent_router.SUBSCRIBE:
+        return get_feed_message(user)
+    
+    # Gaps between events
+    elif intent == intent_router.FREE:
+        return get_free_time(user, message)
+    
+    # Full-text search over the user's events
+    elif intent == intent_router.SEARCH:
+        return get_search_results(user, message)
+    
+    # Public happenings around the user's shared location
+    elif intent == intent_router.NEARBY:
+        return get_nearby_events(user, message)
+    
     # Cancel or clear state
-    elif any(keyword in message_lower for keyword in ['cancel', 'clear', 'stop']):
-        user.clear_conversation_state()
+    elif intent == intent_router.CANCEL:
+        get_session_store().clear_state(user)
         return "✅ Conversation cleared. How can I help you?"
     
-    # Check if we're in the middle of event creation
-    elif user.current_conversation_state and user.current_conversation_state.get('creating_event'):
-        print("✅ Triggered: Continue event creation")  # DEBUG
-        event_service = EventCreationService(user)
-        return event_service.process_event_creation(message)
-    
-    # 🚨 PERMISSIVE EVENT CREATION DETECTION 🚨
-    # If message contains time/date words, assume it's event creation
-    time_date_words = [
-        'tomorrow', 'today', 'monday', 'tuesday', 'wednesday', 'thursday', 
-        'friday', 'saturday', 'sunday', 'week', 'month', 'year',
-        'at', 'am', 'pm', 'morning', 'afternoon', 'evening', 'night',
-        'january', 'february', 'march', 'april', 'may', 'june', 'july',
-        'august', 'september', 'october', 'november', 'december'
-    ]
-    
-    # Also check for time patterns like "2pm", "3:30", etc.
-    time_pattern = r'\b(\d{1,2}(:\d{2})?\s*(am|pm)?)\b'
-    has_time = re.search(time_pattern, message_lower)
-    
-    has_date_word = any(word in message_lower for word in time_date_words)
-    
-    # If message has time/date reference and is more than 3 words, assume event creation
-    if (has_time or has_date_word) and len(message.split()) >= 3:
-        print(f"✅ Triggering AI event creation: time={has_time}, date_word={has_date_word}")
-        event_service = EventCreationService(user)
-        return event_service.process_event_creation(message)
-    
-    # Also trigger on explicit creation keywords
-    create_keywords = ['create', 'schedule', 'appointment', 'meeting', 'remind', 'set up']
-    if any(keyword in message_lower for keyword in create_keywords):
-        print("✅ Triggering AI via creation keyword")
+    # In the middle of event creation, or a time/date reference in a longer
+    # message or an explicit creation keyword
+    conversation_state = get_session_store().get_state(user) or {}
+    if conversation_state.get('creating_event') or intent == intent_router.CREATE:
         event_service = EventCreationService(user)
-        return event_service.process_event_creation(message)
+        return event_service.process_event_creation(message, conversation_state)
     
-    print("❌ No trigger matched, falling back to default")  # DEBUG
+    logger.debug("No trigger matched, falling back to default")
     return "I'm your Event Manager bot! 🤖\n\n" + get_main_menu()
 
 def get_main_menu():
@@ -123,50 +315,319 @@ Here's what I can do:
 • *View Events* - See your upcoming events
 • *Today's Agenda* - See what's happening today  
 • *Create Event* - Schedule a new event (say 'create meeting tomorrow at 2pm')
+• *Free Time* - Find open slots (say 'am I free tomorrow?')
+• *Search* - Find an event (say 'when is my dentist appointment?')
+• *Near Me* - Discover what's on around you (say 'what's on near me?' or share your location)
+• *Subscribe* - Get a link to see your events in Google, Apple or Outlook calendar
 
 Just tell me what you'd like to do! 💬"""
 
+# Agenda replies are built from precompiled templates and joined once
+NO_UPCOMING_TEXT = "You have no upcoming events! 🎉\n\nTry creating one with: 'Team meeting tomorrow at 3pm'"
+UPCOMING_HEADER = "📅 *Your Upcoming Events:*\n\n"
+UPCOMING_ITEM = "• *{title}*\n  {when}{location}\n\n".format
+UPCOMING_FOOTER = "To create a new event, just tell me about it! ✨"
+NO_TODAY_TEXT = "No events scheduled for today! 🕶️\n\nEnjoy your free time! You can schedule events with natural language."
+TODAY_HEADER = "📋 *Today's Agenda ({day:%A, %b %d}):*\n\n".format
+TODAY_ITEM = "• *{when}* - {title}{location}\n".format
+
+def _location(event):
+    return f" @ {event.location}" if event.location else ""
+
 def get_upcoming_events(user):
     """Get user's upcoming events"""
-    now = timezone.now()
-    upcoming_events = Event.objects.filter(
-        user=user, 
-        scheduled_time__gte=now
-    )[:10]  # Limit to 10 events
+    return get_agenda_cache().get_or_render(user, 'upcoming', render_upcoming_events)
+
+def render_upcoming_events(user):
+    """Render the upcoming list; it is valid until its first event starts"""
+    tz = agenda.user_timezone(user)
+    # One-off events and recurring occurrences, merged by time
+    with replica_reads(user.pk):
+        upcoming_events = agenda.upcoming_occurrences(user, limit=10)
     
     if not upcoming_events:
-        return "You have no upcoming events! 🎉\n\nTry creating one with: 'Team meeting tomorrow at 3pm'"
-    
-    response = "📅 *Your Upcoming Events:*\n\n"
-    for event in upcoming_events:
-        time_str = event.scheduled_time.strftime('%a, %b %d at %I:%M %p')
-        location_str = f" @ {event.location}" if event.location else ""
-        response += f"• *{event.title}*\n  {time_str}{location_str}\n\n"
+        return NO_UPCOMING_TEXT, None
     
-    response += "To create a new event, just tell me about it! ✨"
-    return response
+    items = (
+        UPCOMING_ITEM(
+            title=event.title,
+            when=timezone.localtime(starts_at, tz).strftime('%a, %b %d at %I:%M %p'),
+            location=_location(event),
+        )
+        for starts_at, event in upcoming_events
+    )
+    return ''.join((UPCOMING_HEADER, *items, UPCOMING_FOOTER)), upcoming_events[0].start
 
 def get_todays_events(user):
     """Get user's events for today"""
-    today = timezone.now().date()
-    tomorrow = today + timedelta(days=1)
+    return get_agenda_cache().get_or_render(user, 'today', render_todays_events)
+
+def render_todays_events(user):
+    """Render today's agenda; it is valid for the rest of the user's day"""
+    # Half-open range over the user's local day, so the index can be used
+    tz = agenda.user_timezone(user)
+    start, end = agenda.day_window(user)
     
-    todays_events = Event.objects.filter(
-        user=user,
-        scheduled_time__date=today
-    ).order_by('scheduled_time')
+    with replica_reads(user.pk):
+        todays_events = list(agenda.occurrences_between(user, start, end))
     
     if not todays_events:
-        return "No events scheduled for today! 🕶️\n\nEnjoy your free time! You can schedule events with natural language."
+        return NO_TODAY_TEXT, None
+    
+    items = (
+        TODAY_ITEM(
+            when=timezone.localtime(starts_at, tz).strftime('%I:%M %p'),
+            title=event.title,
+            location=_location(event),
+        )
+        for starts_at, event in todays_events
+    )
+    return ''.join((TODAY_HEADER(day=start.date()), *items)), None
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+FREE_SLOT = "• {start:%I:%M %p} – {end:%I:%M %p}\n".format
+FREE_NONE = "• Booked solid\n"
+FREE_FOOTER = "\nTell me about an event to book one of them! ✨"
+
+def _free_days(message, today):
+    """(day offsets, label) the message asks about; today by default"""
+    words = set(intent_router.TOKEN_RE.findall(message.lower()))
+    if 'week' in words:
+        return range(7), 'this week'
+    if 'tomorrow' in words:
+        return [1], 'tomorrow'
+    for index, weekday in enumerate(WEEKDAYS):
+        if weekday in words:
+            offset = (index - today.weekday()) % 7
+            return [offset], 'today' if offset == 0 else f"on {weekday.capitalize()}"
+    return [0], 'today'
+
+def get_free_time(user, message):
+    """Gaps of at least FREE_SLOT_MIN_MINUTES in the user's day(s), from the interval index"""
+    now = agenda.local_now(user)
+    offsets, label = _free_days(message, now.date())
+    indexes = get_interval_indexes()
+    minimum = timedelta(minutes=settings.FREE_SLOT_MIN_MINUTES)
     
-    response = f"📋 *Today's Agenda ({today.strftime('%A, %b %d')}):*\n\n"
-    for event in todays_events:
-        time_str = event.scheduled_time.strftime('%I:%M %p')
-        location_str = f" @ {event.location}" if event.location else ""
-        response += f"• *{time_str}* - {event.title}{location_str}\n"
+    days = []
+    for offset in offsets:
+        midnight = agenda.day_window(user, offset, now)[0]
+        opens = midnight + timedelta(hours=settings.FREE_SLOTS_DAY_START_HOUR)
+        closes = midnight + timedelta(hours=settings.FREE_SLOTS_DAY_END_HOUR)
+        if offset == 0:
+            # From the next quarter hour
+            opens = max(opens, now.replace(second=0, microsecond=0) + timedelta(minutes=-now.minute % 15))
+        slots = indexes.free_slots(user, opens, closes, minimum) if opens < closes else []
+        days.append((midnight, slots))
+    
+    def slot_lines(slots):
+        return ''.join(FREE_SLOT(start=timezone.localtime(start), end=timezone.localtime(end)) for start, end in slots)
+    
+    if len(days) == 1:
+        day, slots = days[0]
+        if not slots:
+            return f"😅 You're booked solid {label} ({day:%a, %b %d})."
+        return f"🟢 *Free {label} ({day:%a, %b %d}):*\n\n{slot_lines(slots)}{FREE_FOOTER}"
+    
+    parts = [f"🟢 *Free time {label}:*\n"]
+    for day, slots in days:
+        parts.append(f"\n*{day:%a, %b %d}*\n")
+        parts.append(slot_lines(slots) or FREE_NONE)
+    return ''.join(parts) + FREE_FOOTER
+
+SEARCH_EMPTY = "What should I look for? Try 'when is my dentist appointment?' 🔍"
+SEARCH_HEADER = "🔍 *Events matching \"{query}\":*\n\n".format
+SEARCH_NONE = "I couldn't find any events matching \"{query}\". 🤔\n\nSay *events* to see what's coming up.".format
+
+def _search_when(event, now, tz):
+    if event.is_recurring:
+        upcoming = next(iter_occurrences(event, now, now + timedelta(days=366), tz), None)
+        if upcoming is None:
+            return "Repeating series, no more dates"
+        return timezone.localtime(upcoming, tz).strftime('Repeats, next %a, %b %d at %I:%M %p')
+    when = timezone.localtime(event.scheduled_time, tz).strftime('%a, %b %d %Y at %I:%M %p')
+    return when if event.scheduled_time >= now else f"{when} (past)"
+
+def get_search_results(user, message):
+    """The user's events best matching the words of `message`"""
+    terms = search.search_terms(message)
+    if not terms:
+        return SEARCH_EMPTY
     
+    tz = agenda.user_timezone(user)
+    now = timezone.now()
+    with span('search'), replica_reads(user.pk):
+        events = search.find_events(user, terms, now=now)
+    
+    query = ' '.join(terms)
+    if not events:
+        return SEARCH_NONE(query=query)
+    items = (
+        UPCOMING_ITEM(title=event.title, when=_search_when(event, now, tz), location=_location(event))
+        for event in events
+    )
+    return ''.join((SEARCH_HEADER(query=query), *items)).rstrip()
+
+NEARBY_ASK = "📍 Share your location (tap 📎 → *Location*) and I'll show you what's on nearby!"
+NEARBY_HEADER = "📍 *What's on near you {label}:*\n\n".format
+NEARBY_ITEM = "• *{title}*\n  {when} · {distance}{venue}{url}\n\n".format
+NEARBY_NONE = "Nothing on within {radius:g} km {label}. 😴\n\nTry another day, or share a different location.".format
+NEARBY_FOOTER = "Share a new location to look somewhere else."
+
+def _nearby_window(user, message):
+    """[start, end) and label of the time the message asks about; the next CATALOG_WINDOW_HOURS by default"""
+    now = agenda.local_now(user)
+    words = set(intent_router.TOKEN_RE.findall(message.lower()))
+    if 'weekend' in words:
+        saturday = 0 if now.weekday() == 6 else (5 - now.weekday()) % 7
+        sunday = saturday if now.weekday() == 6 else saturday + 1
+        return (max(now, agenda.day_window(user, saturday, now)[0]), agenda.day_window(user, sunday, now)[1],
+                'this weekend')
+    if words & {'today', 'tonight', 'tomorrow', 'week', *WEEKDAYS}:
+        offsets, label = _free_days(message, now.date())
+        start = agenda.day_window(user, offsets[0], now)[0]
+        if 'tonight' in words:
+            start, label = start + timedelta(hours=17), 'tonight'
+        return max(now, start), agenda.day_window(user, offsets[-1], now)[1], label
+    hours = settings.CATALOG_WINDOW_HOURS
+    return now, now + timedelta(hours=hours), f"in the next {hours} hours"
+
+def _distance(km):
+    return f"{km * 1000:.0f} m" if km < 1 else f"{km:.1f} km"
+
+def get_nearby_events(user, message, location=None):
+    """The catalog events nearest the user's shared location, in the time the message asks about"""
+    store = get_session_store()
+    location = location or store.get_location(user)
+    if location is None:
+        # Answered by process_location once the pin arrives
+        state = store.get_state(user) or {}
+        state['nearby_query'] = message
+        store.set_state(user, state)
+        return NEARBY_ASK
+    
+    latitude, longitude = location
+    start, end, label = _nearby_window(user, message)
+    with span('catalog_nearby'), replica_reads():
+        results = catalog.nearby(latitude, longitude, start, end)
+    
+    if not results:
+        return NEARBY_NONE(radius=settings.CATALOG_RADIUS_KM, label=label)
+    items = (
+        NEARBY_ITEM(
+            title=event.title,
+            when=timezone.localtime(event.starts_at).strftime('%a, %b %d at %I:%M %p'),
+            distance=_distance(km),
+            venue=f"\n  @ {event.venue}" if event.venue else "",
+            url=f"\n  {event.url}" if event.url else "",
+        )
+        for km, event in results
+    )
+    return ''.join((NEARBY_HEADER(label=label), *items, NEARBY_FOOTER))
+
+def get_feed_message(user):
+    """Reply with the user's private calendar subscription link"""
+    url = feeds.feed_url(user)
+    if url is None:
+        return "📆 Calendar subscriptions are not available yet. Please try again later."
+    return (
+        "📆 *Subscribe to your Isele calendar*\n\n"
+        f"{url}\n\n"
+        "Add this link in Google Calendar (Other calendars → From URL), "
+        "Apple Calendar or Outlook. Keep it private: anyone with the link can see your events."
+    )
+
+
+@require_safe
+def calendar_feed(request, token):
+    """ICS subscription feed; answers 304 when the client's copy is current"""
+    user = EventManagerUser.objects.filter(feed_token=token).first()
+    if user is None:
+        raise Http404("Unknown calendar feed")
+    counters.incr('feed.requests')
+    
+    # The ETag and the body are read from the same replica
+    read_alias = choose_read_alias(user.pk)
+    with reading_from(read_alias):
+        etag, last_modified = feeds.feed_etag(user)
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f"private, max-age={settings.FEED_MAX_AGE}",
+    }
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified.timestamp())
+    
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        counters.incr('feed.not_modified')
+        response = HttpResponseNotModified()
+    else:
+        response = StreamingHttpResponse(
+            iterate_reading_from(read_alias, feeds.get_feed_renderer().stream(user)),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'inline; filename="isele.ics"'
+    for name, value in headers.items():
+        response[name] = value
     return response
 
 
+@csrf_exempt
+@require_POST
+def import_calendar_upload(request):
+    """Import an uploaded .ics or CSV file (multipart 'file') for the user in 'phone_number'"""
+    token = settings.IMPORT_API_TOKEN
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not token or not hmac.compare_digest(supplied, token):
+        return JsonResponse({'error': 'unauthorized'}, status=401)
+    
+    upload = request.FILES.get('file')
+    phone_number = request.POST.get('phone_number', '').replace('whatsapp:', '').strip()
+    if upload is None or not phone_number:
+        return JsonResponse({'error': "'file' and 'phone_number' are required"}, status=400)
+    
+    default_tz = None
+    if request.POST.get('timezone'):
+        default_tz = resolve_timezone(request.POST['timezone'], None)
+        if default_tz is None:
+            return JsonResponse({'error': f"unknown timezone {request.POST['timezone']!r}"}, status=400)
+    
+    user = get_session_store().get_user(phone_number)
+    # Large uploads are spooled to disk by Django and read back line by line
+    fmt = request.POST.get('format') if request.POST.get('format') in ('ics', 'csv') else None
+    result = import_calendar(user, upload, name=upload.name, fmt=fmt, default_tz=default_tz)
+    return JsonResponse(result, status=201 if result['created'] else 200)
+
+
 def health(request):
-    return JsonResponse({"message" : "Welcome to Isele"})
\ No newline at end of file
+    return JsonResponse({"message" : "Welcome to Isele"})
+
+
+@require_safe
+def metrics(request):
+    """Counters, latency histograms and per-component stats of this process"""
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied, token):
+            return JsonResponse({'error': 'unauthorized'}, status=401)
+    
+    from . import (agenda_cache, ai_cache, debounce, fast_parser, interval_index, llm_client,
+                   metrics as metrics_module, outbound, webhook_dedup)
+    return JsonResponse({
+        'enabled': metrics_module.ENABLED,
+        'counters': counters.snapshot(),
+        'histograms': histograms.snapshot(),
+        'components': {
+            'fast_parser': fast_parser.stats(),
+            'parse_cache': ai_cache.stats(),
+            'llm': llm_client.stats(),
+            'debounce': debounce.stats(),
+            'agenda_cache': agenda_cache.stats(),
+            'feed': feeds.stats(),
+            'outbound': outbound.stats(),
+            'webhook_dedup': webhook_dedup.stats(),
+            'interval_index': interval_index.stats(),
+            'search': search.stats(),
+            'catalog': catalog.stats(),
+        },
+    })
\ No newline at end of file
@@ -0,0 +1,215 @@
+# core/webhook_dedup.py
+import asyncio
+import logging
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .cache_backends import DjangoCacheBackend, LocalLRUBackend
+from .metrics import counters, ratio
+
+logger = logging.getLogger(__name__)
+
+# Twilio retries a webhook that got no answer within 15 seconds, which a
+# slow Gemini call easily causes, and now and then delivers a message twice.
+# Each MessageSid is handled once: the first request claims it and stores
+# its TwiML reply, and a repeat gets that reply back without parsing again
+# or creating the events again. A repeat arriving while the first request
+# is still running is acknowledged with an empty reply at once in the sync
+# view, which must not hold a worker while Gemini is slow; the async view
+# waits for the reply a little, holding no thread. Such a repeat is noted,
+# and since Twilio only retries after giving up on the first request, that
+# request then delivers its reply through the REST API instead of TwiML.
+# Cache errors fail open: the message is handled rather than answered with a
+# 500 that Twilio retries.
+
+_PENDING = 'pending'
+# Values of the repeat key, whichever of a pending repeat and finish() adds it first
+_REPEATED = 'repeated'
+_FINISHED = 'finished'
+# Well under Twilio's 15 second timeout
+MAX_WAIT = 5.0
+
+
+class WebhookDedup:
+    """TTL-evicted set of seen MessageSids and the reply each one got
+
+    `claim_ttl` bounds how long a claim blocks repeats if its request dies
+    without finishing; `wait` is how long a repeat in the async view waits
+    for a running one (at most MAX_WAIT).
+    """
+
+    def __init__(self, backend, ttl: float = 3600, claim_ttl: float = 60, wait: float = MAX_WAIT,
+                 poll_interval: float = 0.1):
+        self.backend = backend
+        self.ttl = ttl
+        self.claim_ttl = claim_ttl
+        self.wait = min(wait, MAX_WAIT)
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def make_key(message_sid: str) -> str:
+        return f"twsid:{message_sid}"
+
+    @staticmethod
+    def repeat_key(message_sid: str) -> str:
+        return f"twsid:{message_sid}:repeat"
+
+    def claim(self, message_sid: str):
+        """None if this request should handle the message, else the reply to send again
+
+        The reply is '' when the first request is still running.
+        """
+        try:
+            reply = self._check(self.make_key(message_sid))
+        except Exception as e:
+            return self._backend_error('claim', message_sid, e)
+        return self._still_running(message_sid) if reply is _PENDING else reply
+
+    @property
+    def _blocking(self) -> bool:
+        # Django cache clients do I/O; async views call them on a worker thread
+        return isinstance(self.backend, DjangoCacheBackend)
+
+    async def aclaim(self, message_sid: str):
+        """claim() for async views: waits up to `wait` for a running request's reply"""
+        key = self.make_key(message_sid)
+        check = sync_to_async(self._check) if self._blocking else self._acheck
+        deadline = time.monotonic() + self.wait
+        while True:
+            try:
+                reply = await check(key)
+            except Exception as e:
+                return self._backend_error('claim', message_sid, e)
+            if reply is not _PENDING:
+                return reply
+            if time.monotonic() >= deadline:
+                if self._blocking:
+                    return await sync_to_async(self._still_running)(message_sid)
+                return self._still_running(message_sid)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _acheck(self, key):
+        return self._check(key)
+
+    def _check(self, key):
+        """None (claimed now), _PENDING (another request is on it) or the stored reply"""
+        if self.backend.add(key, _PENDING, self.claim_ttl):
+            counters.incr('webhook_dedup.messages')
+            return None
+        entry = self.backend.get(key)
+        if entry is None or entry == _PENDING:
+            # None: released or expired since add(), claimable on the next poll
+            return _PENDING
+        body, llm_calls = entry
+        counters.incr('webhook_dedup.duplicates')
+        counters.incr('webhook_dedup.llm_calls_saved', llm_calls)
+        return body
+
+    def _still_running(self, message_sid: str) -> str:
+        """Note the repeat for finish(), then acknowledge it empty unless the reply just landed"""
+        counters.incr('webhook_dedup.duplicates')
+        counters.incr('webhook_dedup.pending_repeats')
+        try:
+            # add() on the repeat key is the handoff: the repeat or finish() wins it, never both
+            if (self.backend.add(self.repeat_key(message_sid), _REPEATED, self.claim_ttl)
+                    or self.backend.get(self.repeat_key(message_sid)) != _FINISHED):
+                logger.info("Repeat of %s while it is still running, its reply will go out of band", message_sid)
+                return ''
+            entry = self.backend.get(self.make_key(message_sid))
+        except Exception as e:
+            self._backend_error('claim', message_sid, e)
+            return ''
+        return entry[0] if entry is not None and entry != _PENDING else ''
+
+    @staticmethod
+    def _backend_error(operation: str, message_sid: str, error: Exception):
+        counters.incr('webhook_dedup.backend_errors')
+        logger.warning("Webhook dedup %s failed for %s (%s), handling it without dedup",
+                       operation, message_sid, error)
+        return None
+
+    def finish(self, message_sid: str, body: str, llm_calls: int = 0) -> bool:
+        """Store the reply; `llm_calls` is what a repeat will be counted as saving
+
+        Returns True when a repeat was acknowledged without the reply while
+        this request ran. Twilio has given up on this request by then, so the
+        caller must deliver the reply out of band; repeats from now on get an
+        empty reply.
+        """
+        key = self.make_key(message_sid)
+        try:
+            self.backend.set(key, (body, llm_calls), self.ttl)
+            if self.backend.add(self.repeat_key(message_sid), _FINISHED, self.claim_ttl):
+                return False
+            self.backend.set(key, ('', llm_calls), self.ttl)
+        except Exception as e:
+            self._backend_error('finish', message_sid, e)
+            return False
+        counters.incr('webhook_dedup.out_of_band_replies')
+        return True
+
+    def release(self, message_sid: str):
+        """Drop a claim whose request failed, so Twilio's retry runs the message again"""
+        try:
+            self.backend.delete(self.make_key(message_sid))
+            self.backend.delete(self.repeat_key(message_sid))
+        except Exception as e:
+            self._backend_error('release', message_sid, e)
+
+    async def afinish(self, message_sid: str, body: str, llm_calls: int = 0) -> bool:
+        if self._blocking:
+            return await sync_to_async(self.finish)(message_sid, body, llm_calls)
+        return self.finish(message_sid, body, llm_calls)
+
+    async def arelease(self, message_sid: str):
+        if self._blocking:
+            return await sync_to_async(self.release)(message_sid)
+        self.release(message_sid)
+
+
+def build_webhook_dedup():
+    """Build the dedup layer selected by WEBHOOK_DEDUP_BACKEND, or None when disabled"""
+    backend = getattr(settings, 'WEBHOOK_DEDUP_BACKEND', 'local')
+    if backend == 'none':
+        return None
+    if backend == 'local':
+        store = LocalLRUBackend(getattr(settings, 'WEBHOOK_DEDUP_MAX_ENTRIES', 20000))
+    elif backend == 'django':
+        store = DjangoCacheBackend(getattr(settings, 'WEBHOOK_DEDUP_ALIAS', 'default'))
+    else:
+        raise ValueError(f"Unknown WEBHOOK_DEDUP_BACKEND: {backend}")
+    return WebhookDedup(
+        store,
+        ttl=getattr(settings, 'WEBHOOK_DEDUP_TTL', 3600),
+        claim_ttl=getattr(settings, 'WEBHOOK_DEDUP_CLAIM_TTL', 60),
+        wait=getattr(settings, 'WEBHOOK_DEDUP_WAIT', MAX_WAIT),
+    )
+
+
+_webhook_dedup = None
+_lock = threading.Lock()
+
+
+def get_webhook_dedup():
+    """Return the process-wide dedup layer (None when disabled)"""
+    global _webhook_dedup
+    if _webhook_dedup is None:
+        with _lock:
+            if _webhook_dedup is None:
+                _webhook_dedup = build_webhook_dedup() or False
+    return _webhook_dedup or None
+
+
+def stats() -> dict:
+    messages = counters.get('webhook_dedup.messages')
+    duplicates = counters.get('webhook_dedup.duplicates')
+    return {
+        'messages': messages,
+        'duplicates': duplicates,
+        'duplicate_rate': ratio(duplicates, messages + duplicates),
+        'pending_repeats': counters.get('webhook_dedup.pending_repeats'),
+        'out_of_band_replies': counters.get('webhook_dedup.out_of_band_replies'),
+        'backend_errors': counters.get('webhook_dedup.backend_errors'),
+        'llm_calls_saved': counters.get('webhook_dedup.llm_calls_saved'),
+    }